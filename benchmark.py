@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos caminhos de dados das páginas
+
+Popula um banco em memória (SQLite ou o Firestore falso, que passa pelo
+FirestoreBackend) com dados sintéticos (mesma semente, mesmos dados) e mede as funções que as páginas chamam a cada rerun:
+sincronização do mês, paginação e estatísticas de vendas, fornecedores
+ativos, partições de meses fechados, rollups e o processamento em pandas
+da tabela e do gráfico de custos.
+
+Uso:
+    python benchmark.py                               # 10 mil custos e 5 mil vendas por mês
+    python benchmark.py --custos 1000 --vendas 500 --saida benchmark_antes.json
+    python benchmark.py --saida benchmark_depois.json --comparar benchmark_antes.json
+    python benchmark.py --backend firestore-falso
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+# As escritas invalidam o cache de partições do processo; fora do projeto
+os.environ.setdefault("RST_CACHE_PARTICOES", os.path.join(tempfile.gettempdir(), "rst_benchmark_particoes.db"))
+
+from services.dados_sinteticos import popular
+from services.particoes import CacheParticoes, documentos_mes, documentos_periodo
+from services.repository import FirestoreBackend, SQLiteBackend, criar_repositorios
+from services.rollups import mes_anterior
+from services.sync import SincronizadorMes
+from services.tabelas import (
+    COLUNAS_CUSTOS_PADRAO, dataframe_custos, evolucao_por_tipo, filtrar_custos,
+    resumir_fornecedores_ativos, tabela_exibicao_custos,
+)
+
+
+def medir(funcao, repeticoes, aquecer=True):
+    """
+    Tempos (ms) de repeticoes chamadas; devolve também o último resultado
+
+    Com aquecer, uma chamada extra não medida vem antes (importação do
+    pandas, compilação de consultas), para a mediana refletir um rerun.
+    """
+    tempos = []
+    resultado = funcao() if aquecer else None
+    for _ in range(repeticoes):
+        inicio = time.perf_counter()
+        resultado = funcao()
+        tempos.append((time.perf_counter() - inicio) * 1000)
+    return tempos, resultado
+
+
+def resumir_tempos(tempos):
+    ordenados = sorted(tempos)
+    p95 = ordenados[min(len(ordenados) - 1, int(round(0.95 * (len(ordenados) - 1))))]
+    return {
+        'min_ms': round(ordenados[0], 3),
+        'mediana_ms': round(statistics.median(ordenados), 3),
+        'p95_ms': round(p95, 3),
+        'repeticoes': len(ordenados),
+    }
+
+
+BACKENDS = ('sqlite', 'firestore-falso')
+
+
+def criar_backend(nome):
+    if nome == 'firestore-falso':
+        from services.firebase_falso import FirestoreFalso
+        return FirestoreBackend(FirestoreFalso())
+    return SQLiteBackend(':memory:')
+
+
+def executar(custos=10000, vendas=5000, fornecedores=300, meses=3, semente=42, repeticoes=5, cache_dir=None,
+             backend='sqlite'):
+    """
+    Popula o banco e mede cada caminho de dados
+
+    Args:
+        custos: Custos por mês
+        vendas: Vendas por mês
+        fornecedores: Fornecedores cadastrados
+        meses: Meses populados (o atual e os anteriores, fechados)
+        semente: Semente do gerador
+        repeticoes: Execuções medidas de cada caso
+        cache_dir: Diretório do cache de partições (padrão: temporário)
+        backend: 'sqlite' ou 'firestore-falso'
+
+    Returns:
+        dict: Parâmetros, volume gravado e tempos por caso
+    """
+    repos = criar_repositorios(criar_backend(backend))
+    mes_atual = datetime.now().strftime('%Y-%m')
+    lista_meses = [mes_atual]
+    while len(lista_meses) < meses:
+        lista_meses.insert(0, mes_anterior(lista_meses[0]))
+
+    inicio = time.perf_counter()
+    volume = popular(repos, lista_meses, custos, vendas, fornecedores, semente=semente)
+    carga_ms = (time.perf_counter() - inicio) * 1000
+
+    inicio_mes = f"{mes_atual}-01"
+    mes_fechado = lista_meses[0]
+    cache = CacheParticoes(os.path.join(cache_dir or tempfile.mkdtemp(prefix='rst_bench_'), 'particoes.db'))
+
+    casos = {}
+
+    def caso(nome, funcao, repeticoes_caso=repeticoes, aquecer=True):
+        tempos, resultado = medir(funcao, repeticoes_caso, aquecer)
+        casos[nome] = resumir_tempos(tempos)
+        if isinstance(resultado, list):
+            casos[nome]['documentos'] = len(resultado)
+        return resultado
+
+    # Custos do mês: a carga completa (sincronizador novo a cada vez) e a
+    # incremental, que é o que um rerun normal paga
+    caso('custos_mes.carga_completa',
+         lambda: SincronizadorMes(repos.custos, 'data', 'tabela').documentos(inicio_mes))
+    sincronizador_custos = SincronizadorMes(repos.custos, 'data', 'tabela')
+    custos_mes = sincronizador_custos.documentos(inicio_mes)
+    caso('custos_mes.incremental', lambda: sincronizador_custos.documentos(inicio_mes))
+
+    caso('vendas_mes.carga_completa',
+         lambda: SincronizadorMes(repos.vendas, 'data_venda', 'tabela').documentos(inicio_mes))
+    sincronizador_vendas = SincronizadorMes(repos.vendas, 'data_venda', 'tabela')
+    sincronizador_vendas.documentos(inicio_mes)
+    caso('vendas_mes.incremental', lambda: sincronizador_vendas.documentos(inicio_mes))
+    caso('vendas_mes.primeira_pagina', lambda: repos.vendas.listar_pagina(inicio_mes, 20)[0])
+    caso('vendas_mes.estatisticas', lambda: repos.vendas.estatisticas_mes(inicio_mes))
+
+    caso('fornecedores_ativos',
+         lambda: resumir_fornecedores_ativos(repos.fornecedores.listar_ativos(visao='resumo')))
+
+    # Mês fechado: a primeira leitura vai ao banco, as seguintes ao disco
+    caso('particoes.mes_fechado_frio',
+         lambda: documentos_mes(repos, 'custos_contabeis', mes_fechado, cache=cache), 1, aquecer=False)
+    caso('particoes.mes_fechado_disco',
+         lambda: documentos_mes(repos, 'custos_contabeis', mes_fechado, cache=cache))
+    caso('particoes.periodo',
+         lambda: documentos_periodo(repos, 'custos_contabeis', f"{lista_meses[0]}-01",
+                                    f"{mes_atual}-28", cache=cache))
+    caso('rollups.resumo_custos', lambda: repos.rollups.resumo_custos(mes_atual))
+
+    # Processamento em pandas da página de Custos
+    df_custos = caso('pandas.dataframe_custos', lambda: dataframe_custos(custos_mes))
+    tipos = list(df_custos['tipo_custo'].unique())
+    df_filtrado = caso('pandas.filtrar_custos', lambda: filtrar_custos(df_custos, tipos, 100.0))
+    caso('pandas.tabela_exibicao', lambda: tabela_exibicao_custos(df_filtrado, COLUNAS_CUSTOS_PADRAO))
+    caso('pandas.evolucao_por_tipo', lambda: evolucao_por_tipo(custos_mes, '%d/%m'))
+
+    return {
+        'data': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'parametros': {
+            'custos_por_mes': custos, 'vendas_por_mes': vendas, 'fornecedores': fornecedores,
+            'meses': meses, 'semente': semente, 'repeticoes': repeticoes, 'backend': backend,
+        },
+        'volume': volume,
+        'carga_ms': round(carga_ms, 1),
+        'casos': casos,
+    }
+
+
+def comparar(atual, anterior, metrica='mediana_ms'):
+    """Variação de 'metrica' em cada caso em relação a uma execução anterior"""
+    linhas = []
+    for nome, tempos in atual['casos'].items():
+        antes = anterior.get('casos', {}).get(nome)
+        if not antes or not antes.get(metrica):
+            continue
+        variacao = (tempos[metrica] - antes[metrica]) / antes[metrica] * 100
+        linhas.append((nome, antes[metrica], tempos[metrica], variacao))
+    return linhas
+
+
+def relatorio(resultado, comparacao=None):
+    parametros = resultado['parametros']
+    linhas = [
+        f"📊 {parametros['custos_por_mes']} custos e {parametros['vendas_por_mes']} vendas por mês, "
+        f"{parametros['meses']} meses, {parametros['fornecedores']} fornecedores, {parametros['backend']} "
+        f"(carga: {resultado['carga_ms']/1000:.1f} s)",
+        f"{'caso':36} {'mín':>10} {'mediana':>10} {'p95':>10}",
+    ]
+    for nome, tempos in resultado['casos'].items():
+        linhas.append(
+            f"{nome:36} {tempos['min_ms']:>10.2f} {tempos['mediana_ms']:>10.2f} {tempos['p95_ms']:>10.2f}"
+        )
+    if comparacao:
+        linhas.append("")
+        linhas.append(f"{'comparação (mediana ms)':36} {'antes':>10} {'agora':>10} {'var.':>10}")
+        for nome, antes, agora, variacao in comparacao:
+            linhas.append(f"{nome:36} {antes:>10.2f} {agora:>10.2f} {variacao:>+9.1f}%")
+    return "\n".join(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark dos caminhos de dados das páginas")
+    parser.add_argument('--custos', type=int, default=10000, help="Custos por mês")
+    parser.add_argument('--vendas', type=int, default=5000, help="Vendas por mês")
+    parser.add_argument('--fornecedores', type=int, default=300)
+    parser.add_argument('--meses', type=int, default=3, help="Meses populados (atual e anteriores)")
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--repeticoes', type=int, default=5)
+    parser.add_argument('--backend', choices=BACKENDS, default='sqlite')
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    resultado = executar(
+        custos=args.custos, vendas=args.vendas, fornecedores=args.fornecedores,
+        meses=args.meses, semente=args.semente, repeticoes=args.repeticoes, backend=args.backend
+    )
+
+    comparacao = None
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparacao = comparar(resultado, json.load(arquivo))
+
+    print(relatorio(resultado, comparacao))
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+"""
+Teste de carga com sessões simultâneas (streamlit.testing.v1.AppTest)
+
+Simula N pessoas usando o app ao mesmo tempo, cada uma numa thread com o
+seu AppTest de cada página, no mesmo processo (caches e backend
+compartilhados, como no servidor). Cada sessão repete fluxos sorteados:
+abrir páginas, trocar filtros, paginar, salvar custos, vendas e
+fornecedores e marcar vendas como pagas.
+
+Cada rerun é um passo medido: latência (p50/p95/p99) e, pela
+instrumentação (services/instrumentacao.py), chamadas ao banco e
+documentos lidos/gravados pela sessão naquele rerun. Envios em segundo
+plano (fila de uploads) não entram na conta de nenhum passo.
+
+Uso:
+    python carga.py                                  # 8 sessões, 20 fluxos cada, Firestore falso
+    python carga.py --sessoes 16 --saida carga_antes.json
+    python carga.py --saida carga_depois.json --comparar carga_antes.json
+    python carga.py --backend sqlite
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+PAGINAS = {
+    'inicio': 'main.py',
+    'custos': os.path.join('pages', '01_💰_Custos.py'),
+    'fornecedores': os.path.join('pages', '02_🏪_Fornecedores.py'),
+    'vendas': os.path.join('pages', '03_💰_Vendas.py'),
+}
+BACKENDS = ('firestore-falso', 'sqlite')
+
+
+def configurar_ambiente(backend, diretorio):
+    """Variáveis lidas pelo app; precisam valer antes de criar o backend"""
+    os.environ['RST_INSTRUMENTACAO'] = '1'
+    os.environ['RST_CACHE_PARTICOES'] = os.path.join(diretorio, 'particoes.db')
+    os.environ['RST_FILA_UPLOADS'] = os.path.join(diretorio, 'uploads')
+    if backend == 'sqlite':
+        os.environ['RST_BACKEND'] = 'sqlite'
+        os.environ['RST_SQLITE_PATH'] = os.path.join(diretorio, 'carga.db')
+        os.environ.pop('RST_FIREBASE_FAKE', None)
+    else:
+        os.environ.pop('RST_BACKEND', None)
+        os.environ['RST_FIREBASE_FAKE'] = '1'
+
+
+def preparar_apptest_concorrente():
+    """
+    Deixa vários AppTest rodarem ao mesmo tempo no processo
+
+    O AppTest foi feito para um teste por vez: a cada run cria e depois
+    apaga o Runtime global e compila o script de novo (compilações
+    simultâneas quebram o ast.parse do Python 3.11). Aqui, como no
+    servidor, há um Runtime e uma ScriptCache para todas as sessões.
+    """
+    from unittest.mock import MagicMock
+
+    from streamlit import config
+    from streamlit.runtime import Runtime
+    from streamlit.runtime.caching.storage.dummy_cache_storage import MemoryCacheStorageManager
+    from streamlit.runtime.media_file_manager import MediaFileManager
+    from streamlit.runtime.memory_media_file_storage import MemoryMediaFileStorage
+    from streamlit.runtime.scriptrunner.script_cache import ScriptCache
+    from streamlit.testing.v1 import app_test, local_script_runner
+
+    runtime = MagicMock(spec=Runtime)
+    runtime.media_file_mgr = MediaFileManager(MemoryMediaFileStorage("/mock/media"))
+    runtime.cache_storage_manager = MemoryCacheStorageManager()
+    # Gerenciadores que o AppTest também cria, conforme a versão do Streamlit
+    if hasattr(app_test, 'DataframeSourceManager'):
+        runtime.dataframe_source_mgr = app_test.DataframeSourceManager()
+    if hasattr(app_test, 'BidiComponentManager'):
+        componentes = app_test.BidiComponentManager()
+        componentes.discover_and_register_components(start_file_watching=False)
+        runtime.bidi_component_registry = componentes
+    Runtime._instance = runtime
+
+    class RuntimeDoAppTest(Runtime):
+        """Recebe o Runtime._instance que cada run define e apaga"""
+
+    app_test.Runtime = RuntimeDoAppTest
+    config.set_option('global.appTest', True)
+
+    cache = ScriptCache()
+    app_test.ScriptCache = local_script_runner.ScriptCache = lambda: cache
+
+
+def percentil(valores, p):
+    """Percentil por posição mais próxima (valores não vazios)"""
+    ordenados = sorted(valores)
+    return ordenados[max(0, min(len(ordenados) - 1, int(round(p / 100 * len(ordenados))) - 1))]
+
+
+def _elemento(elementos, rotulo):
+    for elemento in elementos:
+        if elemento.label.startswith(rotulo):
+            return elemento
+    return None
+
+
+def _exigir(elementos, rotulo):
+    elemento = _elemento(elementos, rotulo)
+    if elemento is None:
+        raise LookupError(f"'{rotulo}' não está na página")
+    return elemento
+
+
+class SessaoSimulada:
+    """Uma pessoa usando o app: um AppTest por página, todos com o mesmo nome de sessão"""
+
+    def __init__(self, nome, instrumentacao, semente, timeout=60):
+        from services.instrumentacao import CHAVE_SESSAO
+
+        self.nome = nome
+        self.instrumentacao = instrumentacao
+        self.rng = random.Random(semente)
+        self.timeout = timeout
+        self._chave = CHAVE_SESSAO
+        self._apps = {}
+        self.passos = []  # (passo, ms, chamadas, documentos, erro)
+
+    def app(self, pagina):
+        """AppTest da página; a primeira visita é o passo '<pagina>.abrir'"""
+        if pagina not in self._apps:
+            from streamlit.testing.v1 import AppTest
+
+            at = AppTest.from_file(os.path.join(RAIZ, PAGINAS[pagina]), default_timeout=self.timeout)
+            at.session_state[self._chave] = self.nome
+            self._apps[pagina] = at
+            self.executar(f"{pagina}.abrir", at)
+        return self._apps[pagina]
+
+    def executar(self, passo, at):
+        """Um rerun medido: latência, chamadas e documentos da sessão"""
+        _, sessao = self.instrumentacao.totais(self.nome)
+        chamadas, documentos = sessao.chamadas, sessao.documentos
+        inicio = time.perf_counter()
+        erro = None
+        try:
+            at.run()
+            if at.exception:
+                erro = at.exception[0].value.splitlines()[0][:200]
+        except Exception as e:
+            # Timeout do AppTest ou falha do próprio harness
+            erro = f"{type(e).__name__}: {e}"[:200]
+        ms = (time.perf_counter() - inicio) * 1000
+        _, sessao = self.instrumentacao.totais(self.nome)
+        self.passos.append((passo, ms, sessao.chamadas - chamadas, sessao.documentos - documentos, erro))
+
+    # Fluxos: cada um faz um ou mais reruns (passos)
+
+    def reabrir(self):
+        pagina = self.rng.choice(list(PAGINAS))
+        self.executar(f"{pagina}.rerun", self.app(pagina))
+
+    def filtrar_custos(self):
+        at = self.app('custos')
+        valor_minimo = _elemento(at.number_input, "💰 Valor Mínimo")
+        if valor_minimo is not None:
+            valor_minimo.set_value(float(self.rng.choice([0, 50, 200, 1000])))
+            self.executar('custos.filtrar', at)
+
+    def salvar_custo(self):
+        at = self.app('custos')
+        if _elemento(at.button, "📝 Abrir Formulário"):
+            _elemento(at.button, "📝 Abrir Formulário").click()
+            self.executar('custos.abrir_formulario', at)
+        fornecedor = _elemento(at.selectbox, "Escolha o fornecedor")
+        if fornecedor is None or len(fornecedor.options) < 2:
+            return
+        fornecedor.set_value(self.rng.randrange(1, len(fornecedor.options)))
+        _exigir(at.text_input, "📦 Descrição").input(f"Carga {self.nome} {len(self.passos)}")
+        _exigir(at.number_input, "💰 Valor Unitário").set_value(round(self.rng.uniform(5, 500), 2))
+        _exigir(at.button, "💾 Salvar").click()
+        self.executar('custos.salvar', at)
+
+    def filtrar_vendas(self):
+        at = self.app('vendas')
+        status = _elemento(at.selectbox, "📊 Status")
+        if status is not None:
+            status.set_value(self.rng.choice(status.options))
+            self.executar('vendas.filtrar', at)
+
+    def paginar_vendas(self):
+        at = self.app('vendas')
+        proxima = _elemento(at.button, "Próxima")
+        if proxima is not None and not proxima.disabled:
+            proxima.click()
+            self.executar('vendas.proxima_pagina', at)
+
+    def salvar_venda(self):
+        at = self.app('vendas')
+        if _elemento(at.button, "📝 Abrir Formulário"):
+            _elemento(at.button, "📝 Abrir Formulário").click()
+            self.executar('vendas.abrir_formulario', at)
+        _exigir(at.text_input, "📦 Produto").input(self.rng.choice(['Alface', 'Rúcula', 'Couve']))
+        _exigir(at.number_input, "💰 Valor Unit.").set_value(round(self.rng.uniform(2, 20), 2))
+        _exigir(at.button, "➕ Adicionar Produto").click()
+        self.executar('vendas.adicionar_produto', at)
+        _exigir(at.text_input, "👤 Nome do Cliente").input(f"Cliente {self.nome}")
+        _exigir(at.button, "💾 Finalizar Venda").click()
+        self.executar('vendas.salvar', at)
+
+    def marcar_venda_paga(self):
+        at = self.app('vendas')
+        pagar = next((b for b in at.button if (b.key or '').startswith('pagar_')), None)
+        if pagar is not None:
+            pagar.click()
+            self.executar('vendas.marcar_pago', at)
+
+    def buscar_fornecedor(self):
+        at = self.app('fornecedores')
+        busca = _elemento(at.text_input, "🔍 Buscar por nome")
+        if busca is not None:
+            busca.input(self.rng.choice(['Agro', 'Silva', 'Casa', '']))
+            self.executar('fornecedores.buscar', at)
+
+    def salvar_fornecedor(self):
+        at = self.app('fornecedores')
+        if _elemento(at.button, "📝 Abrir Formulário"):
+            _elemento(at.button, "📝 Abrir Formulário").click()
+            self.executar('fornecedores.abrir_formulario', at)
+        _exigir(at.text_input, "🏪 Nome do Fornecedor").input(f"Fornecedor {self.nome} {len(self.passos)}")
+        _exigir(at.button, "💾 Salvar Fornecedor").click()
+        self.executar('fornecedores.salvar', at)
+
+
+# Fluxo -> peso no sorteio (navegação e filtros são mais comuns que cadastros)
+FLUXOS = {
+    SessaoSimulada.reabrir: 4,
+    SessaoSimulada.filtrar_custos: 3,
+    SessaoSimulada.filtrar_vendas: 3,
+    SessaoSimulada.paginar_vendas: 2,
+    SessaoSimulada.buscar_fornecedor: 2,
+    SessaoSimulada.salvar_custo: 2,
+    SessaoSimulada.salvar_venda: 1,
+    SessaoSimulada.marcar_venda_paga: 1,
+    SessaoSimulada.salvar_fornecedor: 1,
+}
+
+
+def simular(sessao, fluxos):
+    for _ in range(fluxos):
+        fluxo = sessao.rng.choices(list(FLUXOS), weights=list(FLUXOS.values()))[0]
+        try:
+            fluxo(sessao)
+        except Exception as e:
+            # Um widget esperado não apareceu (ex.: a página mostrou um erro)
+            sessao.passos.append((fluxo.__name__, 0.0, 0, 0, f"{type(e).__name__}: {e}"[:200]))
+
+
+def resumir(passos):
+    """Latências e custo no banco por passo e no total"""
+    por_passo = defaultdict(list)
+    for passo in passos:
+        por_passo[passo[0]].append(passo)
+    por_passo['total'] = list(passos)
+
+    casos = {}
+    for nome, lista in sorted(por_passo.items()):
+        tempos = [ms for _, ms, _, _, erro in lista if not erro] or [0.0]
+        casos[nome] = {
+            'passos': len(lista),
+            'erros': sum(1 for *_, erro in lista if erro),
+            'p50_ms': round(percentil(tempos, 50), 1),
+            'p95_ms': round(percentil(tempos, 95), 1),
+            'p99_ms': round(percentil(tempos, 99), 1),
+            'chamadas_por_passo': round(sum(p[2] for p in lista) / len(lista), 2),
+            'documentos_por_passo': round(sum(p[3] for p in lista) / len(lista), 2),
+        }
+    return casos
+
+
+def executar(sessoes=8, fluxos=20, custos=2000, vendas=1000, fornecedores=100, semente=42,
+             backend='firestore-falso', diretorio=None):
+    """
+    Popula o banco, roda as sessões em paralelo e resume os passos
+
+    Args:
+        sessoes: Sessões simultâneas
+        fluxos: Fluxos sorteados por sessão
+        custos: Custos do mês atual no banco
+        vendas: Vendas do mês atual no banco
+        fornecedores: Fornecedores cadastrados
+        semente: Semente dos dados e dos sorteios
+        backend: 'firestore-falso' ou 'sqlite'
+        diretorio: Arquivos temporários (padrão: um diretório novo)
+
+    Returns:
+        dict: Parâmetros, duração, erros de exemplo e métricas por passo
+    """
+    configurar_ambiente(backend, diretorio or tempfile.mkdtemp(prefix='rst_carga_'))
+    preparar_apptest_concorrente()
+
+    import streamlit as st
+    from services.dados_sinteticos import popular
+    from services.instrumentacao import get_instrumentacao
+    from services.repository import get_repositorios
+
+    # Backend, caches e instrumentação novos (o ambiente acabou de mudar)
+    st.cache_resource.clear()
+    popular(get_repositorios(), [datetime.now().strftime('%Y-%m')], custos, vendas, fornecedores, semente=semente)
+    instrumentacao = get_instrumentacao()
+
+    simuladas = [SessaoSimulada(f"carga-{i}", instrumentacao, semente + i) for i in range(sessoes)]
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=sessoes) as executor:
+        list(executor.map(lambda sessao: simular(sessao, fluxos), simuladas))
+    duracao = time.perf_counter() - inicio
+
+    passos = [passo for sessao in simuladas for passo in sessao.passos]
+    return {
+        'data': datetime.now().isoformat(),
+        'parametros': {
+            'sessoes': sessoes, 'fluxos': fluxos, 'custos': custos, 'vendas': vendas,
+            'fornecedores': fornecedores, 'semente': semente, 'backend': backend,
+        },
+        'duracao_s': round(duracao, 1),
+        'erros': sorted({erro for *_, erro in passos if erro})[:10],
+        'casos': resumir(passos),
+    }
+
+
+def relatorio(resultado, comparacao=None):
+    parametros = resultado['parametros']
+    total = resultado['casos']['total']
+    linhas = [
+        f"👥 {parametros['sessoes']} sessões × {parametros['fluxos']} fluxos ({parametros['backend']}): "
+        f"{total['passos']} reruns em {resultado['duracao_s']} s",
+        f"{'passo':30} {'n':>5} {'erros':>5} {'p50':>8} {'p95':>8} {'p99':>8} {'chamadas':>9} {'docs':>8}",
+    ]
+    for nome, caso in resultado['casos'].items():
+        linhas.append(
+            f"{nome:30} {caso['passos']:>5} {caso['erros']:>5} {caso['p50_ms']:>8.1f} {caso['p95_ms']:>8.1f} "
+            f"{caso['p99_ms']:>8.1f} {caso['chamadas_por_passo']:>9.2f} {caso['documentos_por_passo']:>8.2f}"
+        )
+    for erro in resultado['erros']:
+        linhas.append(f"❌ {erro}")
+    if comparacao:
+        linhas.append("")
+        linhas.append(f"{'comparação (p95 ms)':30} {'antes':>10} {'agora':>10} {'var.':>10}")
+        for nome, antes, agora, variacao in comparacao:
+            linhas.append(f"{nome:30} {antes:>10.1f} {agora:>10.1f} {variacao:>+9.1f}%")
+    return "\n".join(linhas)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Teste de carga com sessões simultâneas")
+    parser.add_argument('--sessoes', type=int, default=8, help="Sessões simultâneas")
+    parser.add_argument('--fluxos', type=int, default=20, help="Fluxos por sessão")
+    parser.add_argument('--custos', type=int, default=2000, help="Custos do mês no banco")
+    parser.add_argument('--vendas', type=int, default=1000, help="Vendas do mês no banco")
+    parser.add_argument('--fornecedores', type=int, default=100)
+    parser.add_argument('--semente', type=int, default=42)
+    parser.add_argument('--backend', choices=BACKENDS, default='firestore-falso')
+    parser.add_argument('--saida', help="Arquivo JSON com os resultados")
+    parser.add_argument('--comparar', help="JSON de uma execução anterior")
+    args = parser.parse_args(argv)
+
+    # Avisos do Streamlit repetidos a cada rerun de cada sessão
+    from streamlit.logger import set_log_level
+    set_log_level('error')
+
+    resultado = executar(
+        sessoes=args.sessoes, fluxos=args.fluxos, custos=args.custos, vendas=args.vendas,
+        fornecedores=args.fornecedores, semente=args.semente, backend=args.backend
+    )
+
+    comparacao = None
+    if args.comparar:
+        from benchmark import comparar
+        with open(args.comparar, encoding='utf-8') as arquivo:
+            comparacao = comparar(resultado, json.load(arquivo), metrica='p95_ms')
+
+    print(relatorio(resultado, comparacao))
+    if args.saida:
+        with open(args.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump(resultado, arquivo, ensure_ascii=False, indent=2)
+        print(f"\n💾 Resultados salvos em {args.saida}")
+
+
+if __name__ == "__main__":
+    main()
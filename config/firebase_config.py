@@ -1,80 +1,124 @@
-import firebase_admin
-from firebase_admin import credentials, firestore, storage
+"""
+Inicialização do Firebase e upload de notas fiscais
+
+firebase_admin, Firestore e Storage são importados só quando usados: a
+primeira tela do app não espera por eles. A credencial é montada uma única
+vez por processo (init_firebase) e o bucket do Storage também (get_bucket),
+compartilhado pelos uploads.
+
+Com RST_FIREBASE_FAKE=1 o Firestore e o Storage são os falsos, em memória,
+de services/firebase_falso.py: sem credenciais nem rede.
+"""
+
 import streamlit as st
 import os
 from dotenv import load_dotenv
 import uuid
 from datetime import datetime
 
+from services.imagens import preparar_arquivo
+from services.instrumentacao import medindo
+from services.upload_resumivel import TAMANHO_PARTE, enviar_em_partes
+
 # Carregar variáveis de ambiente
 load_dotenv()
 
+BUCKET_PADRAO = "apprst-baa01.firebasestorage.app"  # Novo formato Firebase
+
+
+def firebase_falso_ativo():
+    return os.getenv("RST_FIREBASE_FAKE", "0") == "1"
+
+
+def _nome_bucket():
+    if hasattr(st, 'secrets') and 'general' in st.secrets and 'storage_bucket' in st.secrets['general']:
+        return st.secrets['general']['storage_bucket']
+    return BUCKET_PADRAO
+
+
+def _config_credencial():
+    """Dados da conta de serviço: secrets do Streamlit Cloud ou .env local"""
+    # Tentar usar secrets do Streamlit Cloud primeiro (para produção)
+    if hasattr(st, 'secrets') and 'firebase' in st.secrets:
+        campos = [
+            "type", "project_id", "private_key_id", "private_key", "client_email", "client_id",
+            "auth_uri", "token_uri", "auth_provider_x509_cert_url", "client_x509_cert_url",
+        ]
+        return {campo: st.secrets["firebase"][campo] for campo in campos}
+    
+    # Para desenvolvimento local usando .env
+    firebase_private_key = os.getenv("FIREBASE_PRIVATE_KEY")
+    if not firebase_private_key:
+        raise ValueError(
+            "FIREBASE_PRIVATE_KEY não encontrada no .env "
+            "(no Streamlit Cloud configure os secrets em Settings > Secrets)"
+        )
+    return {
+        "type": os.getenv("FIREBASE_TYPE"),
+        "project_id": os.getenv("FIREBASE_PROJECT_ID"),
+        "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
+        "private_key": firebase_private_key.replace('\\n', '\n'),
+        "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
+        "client_id": os.getenv("FIREBASE_CLIENT_ID"),
+        "auth_uri": os.getenv("FIREBASE_AUTH_URI"),
+        "token_uri": os.getenv("FIREBASE_TOKEN_URI"),
+    }
+
+
 @st.cache_resource
 def init_firebase():
+    """
+    Inicializa o app Firebase uma vez por processo
+
+    Returns:
+        firestore.Client | None: None se a credencial não puder ser usada
+    """
+    if firebase_falso_ativo():
+        from services.firebase_falso import FirestoreFalso
+        return FirestoreFalso()
+    
+    import firebase_admin
+    from firebase_admin import credentials, firestore
+    
     if not firebase_admin._apps:
         try:
-            # Debug: mostrar secrets disponíveis
-            if hasattr(st, 'secrets'):
-                available_secrets = list(st.secrets.keys()) if st.secrets else []
-                st.info(f"🔍 Secrets disponíveis: {available_secrets}")
-            
-            # Tentar usar secrets do Streamlit Cloud primeiro (para produção)
-            if hasattr(st, 'secrets') and 'firebase' in st.secrets:
-                try:
-                    firebase_config = {
-                        "type": st.secrets["firebase"]["type"],
-                        "project_id": st.secrets["firebase"]["project_id"],
-                        "private_key_id": st.secrets["firebase"]["private_key_id"],
-                        "private_key": st.secrets["firebase"]["private_key"],
-                        "client_email": st.secrets["firebase"]["client_email"],
-                        "client_id": st.secrets["firebase"]["client_id"],
-                        "auth_uri": st.secrets["firebase"]["auth_uri"],
-                        "token_uri": st.secrets["firebase"]["token_uri"],
-                        "auth_provider_x509_cert_url": st.secrets["firebase"]["auth_provider_x509_cert_url"],
-                        "client_x509_cert_url": st.secrets["firebase"]["client_x509_cert_url"]
-                    }
-                    cred = credentials.Certificate(firebase_config)
-                    st.success("🔥 Usando secrets do Streamlit Cloud")
-                except Exception as e:
-                    st.error(f"Erro ao usar secrets: {e}")
-                    raise
-            else:
-                # Para desenvolvimento local usando .env
-                st.warning("⚠️ Secrets do Streamlit não encontrados, usando .env local")
-                firebase_private_key = os.getenv("FIREBASE_PRIVATE_KEY")
-                if not firebase_private_key:
-                    st.error("❌ FIREBASE_PRIVATE_KEY não encontrada no .env")
-                    st.info("💡 Configure os secrets no Streamlit Cloud: Settings > Secrets")
-                    raise ValueError("FIREBASE_PRIVATE_KEY não encontrada no .env")
-                
-                firebase_config = {
-                    "type": os.getenv("FIREBASE_TYPE"),
-                    "project_id": os.getenv("FIREBASE_PROJECT_ID"),
-                    "private_key_id": os.getenv("FIREBASE_PRIVATE_KEY_ID"),
-                    "private_key": firebase_private_key.replace('\\n', '\n'),
-                    "client_email": os.getenv("FIREBASE_CLIENT_EMAIL"),
-                    "client_id": os.getenv("FIREBASE_CLIENT_ID"),
-                    "auth_uri": os.getenv("FIREBASE_AUTH_URI"),
-                    "token_uri": os.getenv("FIREBASE_TOKEN_URI"),
-                }
-                cred = credentials.Certificate(firebase_config)
-            
+            cred = credentials.Certificate(_config_credencial())
             # Inicializar Firebase com storage bucket
-            if hasattr(st, 'secrets') and 'general' in st.secrets and 'storage_bucket' in st.secrets['general']:
-                firebase_admin.initialize_app(cred, {
-                    'storageBucket': st.secrets['general']['storage_bucket']
-                })
-            else:
-                firebase_admin.initialize_app(cred, {
-                    'storageBucket': 'apprst-baa01.firebasestorage.app'
-                })
-            
+            firebase_admin.initialize_app(cred, {'storageBucket': _nome_bucket()})
         except Exception as e:
             st.error(f"Erro ao inicializar Firebase: {e}")
             return None
     
     return firestore.client()
 
+
+@st.cache_resource
+def get_bucket():
+    """Bucket do Storage, criado uma vez com a mesma credencial do Firestore"""
+    if firebase_falso_ativo():
+        from services.firebase_falso import BucketFalso
+        return BucketFalso(BUCKET_PADRAO)
+    
+    from firebase_admin import storage
+    
+    if init_firebase() is None:
+        raise RuntimeError("Firebase não inicializado")
+    return storage.bucket()
+
+
+@st.cache_resource
+def _sessao_http():
+    """Sessão HTTP autenticada com a credencial do app Firebase (uploads em partes)"""
+    if firebase_falso_ativo():
+        from services.firebase_falso import SessaoHttpFalsa
+        return SessaoHttpFalsa(get_bucket())
+    
+    import firebase_admin
+    from google.auth.transport.requests import AuthorizedSession
+    
+    get_bucket()
+    return AuthorizedSession(firebase_admin.get_app().credential.get_credential())
+
 # Função para testar conexão
 def test_firebase_connection():
     try:
@@ -100,51 +144,101 @@ def upload_image_to_storage(uploaded_file, pasta="notas_fiscais"):
     Returns:
         str: URL da imagem ou None se erro
     """
+    resultado = upload_nota_fiscal(uploaded_file, pasta)
+    return resultado['url'] if resultado else None
+
+def upload_nota_fiscal(uploaded_file, pasta="notas_fiscais"):
+    """
+    Prepara (orientação, redução, recompressão) e envia a nota fiscal,
+    com uma miniatura gravada ao lado do arquivo
+    
+    Args:
+        uploaded_file: Arquivo do Streamlit file_uploader
+        pasta: Nome da pasta no Storage
+    
+    Returns:
+        dict: {'url', 'miniatura_url' (None para PDF), 'bytes', 'bytes_original'}
+        ou None se erro
+    """
     try:
         if not uploaded_file:
             return None
         
-        # Gerar nome único para o arquivo
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        file_extension = uploaded_file.name.split('.')[-1].lower()
-        unique_filename = f"{pasta}/{timestamp}_{uuid.uuid4().hex[:8]}.{file_extension}"
+        # Reset file pointer para o início
+        uploaded_file.seek(0)
+        dados = uploaded_file.read()
+        extensao = uploaded_file.name.split('.')[-1].lower()
         
-        # Tentar upload real no Firebase Storage
-        try:
-            # Obter bucket do Firebase Storage
-            if hasattr(st, 'secrets') and 'general' in st.secrets:
-                bucket_name = st.secrets["general"]["storage_bucket"]
-            else:
-                bucket_name = "apprst-baa01.firebasestorage.app"  # Novo formato Firebase
-            
-            bucket = storage.bucket(bucket_name)
-            blob = bucket.blob(unique_filename)
-            
-            # Reset file pointer para o início
-            uploaded_file.seek(0)
-            
-            # Upload do arquivo
-            blob.upload_from_string(
-                uploaded_file.read(), 
-                content_type=uploaded_file.type
-            )
-            
-            # Tornar público para acesso
-            blob.make_public()
-            
-            # Retornar URL pública
-            return blob.public_url
-            
-        except Exception as upload_error:
-            # Se falhar, retornar placeholder para desenvolvimento
-            st.warning(f"⚠️ Upload para Storage falhou (desenvolvimento): {upload_error}")
-            placeholder_url = f"https://storage.firebase.com/placeholder/{unique_filename}"
-            return placeholder_url
+        return enviar_nota_fiscal(dados, uploaded_file.type, extensao, pasta)
         
     except Exception as e:
         st.error(f"Erro ao fazer upload da imagem: {e}")
         return None
 
+def enviar_nota_fiscal(dados, content_type, extensao, pasta="notas_fiscais", nome=None, progresso=None):
+    """
+    Prepara e envia o conteúdo de uma nota fiscal, sem mensagens na tela
+    
+    Usado também pela fila de uploads em segundo plano (services/uploads.py),
+    que precisa da exceção para tentar de novo.
+    
+    Args:
+        dados: Conteúdo original do arquivo
+        content_type: Tipo MIME do arquivo
+        extensao: Extensão original (sem ponto)
+        pasta: Nome da pasta no Storage
+        nome: Nome do arquivo sem extensão (ex.: o hash do conteúdo);
+            padrão é data/hora + sufixo aleatório
+        progresso: Função chamada com (bytes enviados, total) a cada parte
+    
+    Returns:
+        dict: {'url', 'miniatura_url' (None para PDF), 'bytes', 'bytes_original'}
+    
+    Raises:
+        Exception: Qualquer falha de preparação ou de upload
+    """
+    arquivo = preparar_arquivo(dados, content_type, extensao)
+    
+    # Gerar nome único para o arquivo
+    if nome is None:
+        nome = f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+    base_filename = f"{pasta}/{nome}"
+    
+    # Bucket compartilhado pelo processo
+    bucket = get_bucket()
+    blob = bucket.blob(f"{base_filename}.{arquivo.extensao}")
+    
+    # Upload do arquivo já reduzido; PDFs grandes sobem em partes resumíveis
+    with medindo('storage.upload', pasta, tamanho=len(arquivo.dados)):
+        if len(arquivo.dados) > TAMANHO_PARTE:
+            sessao = blob.create_resumable_upload_session(
+                content_type=arquivo.content_type, size=len(arquivo.dados)
+            )
+            enviar_em_partes(_sessao_http(), sessao, arquivo.dados, progresso=progresso)
+        else:
+            blob.upload_from_string(arquivo.dados, content_type=arquivo.content_type)
+            if progresso:
+                progresso(len(arquivo.dados), len(arquivo.dados))
+        
+        # Tornar público para acesso
+        blob.make_public()
+    
+    miniatura_url = None
+    if arquivo.miniatura:
+        with medindo('storage.upload', pasta, tamanho=len(arquivo.miniatura)):
+            miniatura = bucket.blob(f"{base_filename}_miniatura.{arquivo.extensao}")
+            miniatura.upload_from_string(arquivo.miniatura, content_type=arquivo.content_type)
+            miniatura.make_public()
+        miniatura_url = miniatura.public_url
+    
+    # Retornar URL pública
+    return {
+        'url': blob.public_url,
+        'miniatura_url': miniatura_url,
+        'bytes': len(arquivo.dados),
+        'bytes_original': arquivo.tamanho_original,
+    }
+
 # Função para verificar se arquivo é imagem válida
 def is_valid_image(uploaded_file):
     """
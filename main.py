@@ -1,5 +1,17 @@
 import streamlit as st
-from config.firebase_config import init_firebase, test_firebase_connection
+from datetime import datetime
+import os
+from config.firebase_config import test_firebase_connection
+from services.exportacao import exportar
+from services.repository import get_backend
+from services.rollups import (
+    RESUMO_CUSTOS_VAZIO,
+    RESUMO_VENDAS_VAZIO,
+    get_resumo_custos,
+    get_resumo_vendas,
+    mes_anterior,
+)
+from services.instrumentacao import iniciar_rerun, painel_debug
 
 # Configuração da página
 st.set_page_config(
@@ -9,6 +21,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Totais de chamadas ao banco deste rerun (RST_INSTRUMENTACAO=1)
+iniciar_rerun()
+
 # CSS para melhor experiência mobile
 st.markdown("""
 <style>
@@ -42,14 +57,15 @@ with st.sidebar:
             else:
                 st.error(message)
 
-# Inicializar Firebase
+# Inicializar camada de dados
 try:
-    db = init_firebase()
-    if db:
-        st.sidebar.success("✅ Firebase conectado")
+    backend = get_backend()
+    if backend:
+        st.sidebar.success("✅ Banco de dados conectado")
     else:
-        st.sidebar.error("❌ Erro na conexão Firebase")
+        st.sidebar.error("❌ Erro na conexão com o banco de dados")
 except Exception as e:
+    backend = None
     st.sidebar.error(f"❌ Erro: {e}")
 
 # Interface principal
@@ -59,6 +75,23 @@ st.write("Use o menu lateral para navegar entre as funcionalidades.")
 # Dashboard rápido
 st.subheader("📊 Dashboard Resumo")
 
+# Totais do mês e do mês anterior vêm dos rollups (um documento cada)
+mes = datetime.now().strftime("%Y-%m")
+if backend:
+    resumo_custos = get_resumo_custos(mes)
+    resumo_custos_anterior = get_resumo_custos(mes_anterior(mes))
+    resumo_vendas = get_resumo_vendas(mes)
+    resumo_vendas_anterior = get_resumo_vendas(mes_anterior(mes))
+else:
+    resumo_custos = resumo_custos_anterior = dict(RESUMO_CUSTOS_VAZIO)
+    resumo_vendas = resumo_vendas_anterior = dict(RESUMO_VENDAS_VAZIO)
+
+def total_custos(resumo):
+    return resumo['custos_fixos'] + resumo['custos_variaveis'] + resumo['investimentos']
+
+custos_mes = total_custos(resumo_custos)
+vendas_mes = resumo_vendas['total_vendas']
+
 col1, col2, col3 = st.columns(3)
 
 with col1:
@@ -71,29 +104,86 @@ with col1:
 
 with col2:
     st.metric(
-        label="💰 Custos Hoje", 
-        value="R$ 127,50", 
-        delta="↗️ R$ 23,00",
-        help="Gastos registrados hoje"
+        label="💰 Custos Mês", 
+        value=f"R$ {custos_mes:.2f}", 
+        delta=round(custos_mes - total_custos(resumo_custos_anterior), 2),
+        delta_color="inverse",
+        help="Gastos registrados no mês (variação em relação ao mês anterior)"
     )
 
 with col3:
     st.metric(
         label="💵 Vendas Mês", 
-        value="R$ 3.450,00", 
-        delta="↗️ R$ 890,00",
-        help="Vendas acumuladas no mês"
+        value=f"R$ {vendas_mes:.2f}", 
+        delta=round(vendas_mes - resumo_vendas_anterior['total_vendas'], 2),
+        help="Vendas acumuladas no mês (variação em relação ao mês anterior)"
     )
 
+# Exportação do histórico completo (lida em páginas, gravada em arquivo temporário)
+st.subheader("📦 Exportar Histórico Completo")
+
+COLECOES_EXPORTACAO = {
+    'custos_contabeis': '💰 Custos',
+    'vendas': '💵 Vendas (um produto por linha)',
+    'fornecedores': '🏪 Fornecedores',
+}
+
+col_exp1, col_exp2, col_exp3 = st.columns([2, 1, 1])
+with col_exp1:
+    colecao_exportacao = st.selectbox(
+        "Dados",
+        list(COLECOES_EXPORTACAO.keys()),
+        format_func=lambda x: COLECOES_EXPORTACAO[x]
+    )
+with col_exp2:
+    formato_exportacao = st.selectbox("Formato", ['csv', 'parquet'], format_func=str.upper)
+with col_exp3:
+    st.write("")
+    gerar_exportacao = st.button("📦 Gerar arquivo", use_container_width=True, disabled=not backend)
+
+if gerar_exportacao:
+    try:
+        total_docs = backend.agregar(colecao_exportacao, {'total': ('count', None)})['total']
+        barra = st.progress(0.0, text="Lendo documentos...")
+
+        def mostrar_progresso(lidos, linhas):
+            barra.progress(min(1.0, lidos / total_docs) if total_docs else 1.0,
+                           text=f"{lidos} de {total_docs} documentos ({linhas} linhas)")
+
+        # Apaga o arquivo anterior desta sessão antes de gerar outro
+        anterior = st.session_state.pop('exportacao', None)
+        if anterior and os.path.exists(anterior['caminho']):
+            os.remove(anterior['caminho'])
+
+        caminho, linhas = exportar(backend, colecao_exportacao, formato_exportacao, progresso=mostrar_progresso)
+        barra.progress(1.0, text=f"✅ {linhas} linhas exportadas")
+        st.session_state['exportacao'] = {
+            'caminho': caminho,
+            'nome': f"{colecao_exportacao}_RST_{datetime.now().strftime('%Y%m%d')}.{formato_exportacao}",
+            'formato': formato_exportacao,
+        }
+    except Exception as e:
+        st.error(f"❌ Erro ao exportar: {e}")
+
+exportacao = st.session_state.get('exportacao')
+if exportacao and os.path.exists(exportacao['caminho']):
+    with open(exportacao['caminho'], 'rb') as arquivo_exportado:
+        st.download_button(
+            label=f"📥 Baixar {exportacao['nome']}",
+            data=arquivo_exportado,
+            file_name=exportacao['nome'],
+            mime="text/csv" if exportacao['formato'] == 'csv' else "application/octet-stream",
+            use_container_width=True
+        )
+
 # Seção de testes
 st.subheader("🧪 Área de Testes")
 
 # Teste básico de escrita no Firebase
-if st.button("🔥 Teste: Adicionar dados ao Firebase"):
-    if db:
+if st.button("🔥 Teste: Adicionar dados ao banco"):
+    if backend:
         try:
             # Adicionar documento de teste
-            from datetime import datetime
             test_data = {
                 'timestamp': datetime.now().isoformat(),
                 'app': 'RST',
@@ -101,26 +191,27 @@ if st.button("🔥 Teste: Adicionar dados ao Firebase"):
                 'versao': '1.0.0'
             }
             
-            doc_ref = db.collection('testes').add(test_data)
-            st.success(f"✅ Dados adicionados com sucesso! ID: {doc_ref[1].id}")
+            doc_id = backend.adicionar('testes', test_data)
+            st.success(f"✅ Dados adicionados com sucesso! ID: {doc_id}")
             
         except Exception as e:
             st.error(f"❌ Erro ao adicionar dados: {e}")
     else:
-        st.error("❌ Firebase não conectado")
+        st.error("❌ Banco de dados não conectado")
 
 # Teste de leitura do Firebase
-if st.button("📖 Teste: Ler dados do Firebase"):
-    if db:
+if st.button("📖 Teste: Ler dados do banco"):
+    if backend:
         try:
             # Ler últimos 5 documentos de teste
-            docs = db.collection('testes').order_by('timestamp', direction='DESCENDING').limit(5).stream()
+            docs = backend.listar('testes', ordem='timestamp', direcao='DESCENDING', limite=5)
             
             dados = []
             for doc in docs:
+                doc_id = doc.pop('id')
                 dados.append({
-                    'ID': doc.id,
-                    **doc.to_dict()
+                    'ID': doc_id,
+                    **doc
                 })
             
             if dados:
@@ -132,7 +223,7 @@ if st.button("📖 Teste: Ler dados do Firebase"):
         except Exception as e:
             st.error(f"❌ Erro ao ler dados: {e}")
     else:
-        st.error("❌ Firebase não conectado")
+        st.error("❌ Banco de dados não conectado")
 
 # Roadmap e próximos passos
 st.subheader("🗺️ Roadmap de Desenvolvimento")
@@ -260,4 +351,7 @@ st.info("💬 **Feedback e Sugestões:** Sua opinião é fundamental para priori
 
 # Footer
 st.markdown("---")
-st.markdown("🚜 **RST Fazenda Control** - Sistema de gestão agrícola v1.0")
\ No newline at end of file
+st.markdown("🚜 **RST Fazenda Control** - Sistema de gestão agrícola v1.0")
+
+# Painel de chamadas ao banco (RST_PAINEL_DEBUG=1 ou ?debug=1)
+painel_debug()
@@ -1,12 +1,32 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
 import sys
 import os
 
 # Adicionar o diretório raiz ao path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.firebase_config import init_firebase, upload_image_to_storage, is_valid_image
+from config.firebase_config import is_valid_image
+from services.repository import get_repositorios
+from services.sync import get_sincronizador
+from services.cache import cache_com_tags, invalidar, tag
+from services.live_cache import ler_ao_vivo
+from services.particoes import documentos_periodo, meses_do_intervalo
+from services.busca import IndiceFornecedores
+from services.rollups import get_resumo_custos
+from services.categorias import CATEGORIAS_POR_TIPO, CUSTOS_FIXOS, CUSTOS_VARIAVEIS, INVESTIMENTOS, UNIDADES_MEDIDA
+from services.importacao import importar_custos_planilha
+from services.nfe import importar_nfe
+from services.uploads import get_fila_uploads, hash_conteudo
+from services.tabelas import (
+    COLUNAS_CUSTOS,
+    COLUNAS_CUSTOS_PADRAO,
+    dataframe_custos,
+    evolucao_por_tipo,
+    filtrar_custos,
+    resumir_fornecedores_ativos,
+    tabela_exibicao_custos,
+)
+from services.instrumentacao import iniciar_rerun, painel_debug
 
 # Configuração da página
 st.set_page_config(
@@ -15,6 +35,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Totais de chamadas ao banco deste rerun (RST_INSTRUMENTACAO=1)
+iniciar_rerun()
+
 # CSS para melhor experiência mobile
 st.markdown("""
 <style>
@@ -40,140 +63,94 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Definir categorias contábeis
-CUSTOS_FIXOS = {
-    'salarios': 'Salários',
-    'internet': 'Internet',
-    'telefone': 'Telefone',
-    'manutencao_geral': 'Manutenção em Geral',
-    'sistema': 'Sistema',
-    'imposto': 'Imposto',
-    'consultoria': 'Consultoria',
-    'marketing': 'Marketing'
-}
-
-CUSTOS_VARIAVEIS = {
-    'sementes': 'Sementes',
-    'fertilizantes': 'Fertilizantes',
-    'espuma_fenolica': 'Espuma Fenólica',
-    'produtos_limpeza': 'Produtos de Limpeza',
-    'equipamentos_descartaveis': 'Equipamentos Descartáveis',
-    'frete': 'Frete',
-    'nutrientes': 'Nutrientes',
-    'embalagens': 'Embalagens',
-    'defensivos': 'Defensivos',
-    'aluguel_maquina': 'Aluguel de Máquina',
-    'diesel_trator': 'Diesel para Trator',
-    'mao_obra_temporaria': 'Mão de Obra Temporária',
-    'outros_variaveis': 'Outros Variáveis'
-}
-
-INVESTIMENTOS = {
-    'equipamentos': 'Equipamentos',
-    'tecnologia': 'Tecnologia',
-    'veiculos': 'Veículos',
-    'bens_moveis': 'Bens Móveis',
-    'irrigacao': 'Sistema de Irrigação',
-    'construcao': 'Construção',
-    'melhorias_terreno': 'Melhorias no Terreno',
-    'expansao_area': 'Expansão de Área',
-    'infraestrutura': 'Infraestrutura',
-    'outros_investimentos': 'Outros Investimentos'
-}
-
-# Inicializar Firebase
-db = init_firebase()
+# Inicializar camada de dados
+repos = get_repositorios()
 
 # Título
 st.title("💰 Gestão de Custos - Classificação Contábil")
 st.markdown("Controle financeiro com classificação contábil: **Fixos**, **Variáveis** e **Investimentos**")
 
-if not db:
-    st.error("❌ Erro na conexão com Firebase. Verifique as configurações.")
+if not repos:
+    st.error("❌ Erro na conexão com o banco de dados. Verifique as configurações.")
     st.stop()
 
 # Função para buscar custos do mês atual
-@st.cache_data(ttl=60)
 def get_custos_mes_atual():
-    try:
-        hoje = datetime.now()
-        inicio_mes = f"{hoje.year}-{hoje.month:02d}-01"
-        
-        docs = db.collection('custos_contabeis').where(
-            'data', '>=', inicio_mes
-        ).order_by('data', direction='DESCENDING').stream()
-        
-        custos = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            custos.append(data)
-        
+    hoje = datetime.now()
+    inicio_mes = f"{hoje.year}-{hoje.month:02d}-01"
+    
+    # Com os listeners ativos a leitura vem da memória, sem ir ao Firestore
+    custos = ler_ao_vivo('custos_contabeis', inicio_mes)
+    if custos is not None:
         return custos
+    return get_custos_mes_sincronizado(inicio_mes)
+
+@cache_com_tags(ttl=60, tags=lambda inicio_mes: [tag('custos_contabeis', inicio_mes[:7])])
+def get_custos_mes_sincronizado(inicio_mes):
+    try:
+        # Só busca o que mudou desde a última leitura
+        sincronizador = get_sincronizador('custos_contabeis', 'data', repos.custos, visao='tabela')
+        return sincronizador.documentos(inicio_mes)
     except Exception as e:
         st.error(f"Erro ao buscar custos: {e}")
         return []
 
+# Custos de um período qualquer: meses fechados vêm do cache em disco e os
+# que faltam são lidos em paralelo
+@cache_com_tags(ttl=60, tags=lambda inicio, fim: [tag('custos_contabeis', m) for m in meses_do_intervalo(inicio, fim)])
+def get_custos_periodo(inicio, fim):
+    try:
+        return documentos_periodo(repos, 'custos_contabeis', inicio, fim, visao='tabela')
+    except Exception as e:
+        st.error(f"Erro ao buscar custos do período: {e}")
+        return []
+
 # Função para buscar fornecedores ativos
-@st.cache_data(ttl=30)  # Cache menor para atualizar mais rápido
 def get_fornecedores_ativos():
+    fornecedores = ler_ao_vivo('fornecedores')
+    if fornecedores is not None:
+        return resumir_fornecedores_ativos(fornecedores)
+    return get_fornecedores_ativos_cache()
+
+@cache_com_tags(ttl=30, tags=[tag('fornecedores')])  # Cache menor para atualizar mais rápido
+def get_fornecedores_ativos_cache():
     try:
-        # Buscar todos os fornecedores primeiro
-        docs = db.collection('fornecedores').stream()
-        
-        fornecedores = []
-        for doc in docs:
-            data = doc.to_dict()
-            # Considerar ativo se o campo não existir ou for True
-            ativo = data.get('ativo', True)  
-            
-            if ativo:  # Só adicionar se ativo
-                fornecedores.append({
-                    'nome': data.get('nome', ''),
-                    'tipo': data.get('tipo_fornecedor', ''),
-                    'telefone': data.get('telefone', ''),
-                    'id': doc.id
-                })
-        
-        # Ordenar por nome
-        fornecedores.sort(key=lambda x: x['nome'].lower())
-        return fornecedores
-        
+        return resumir_fornecedores_ativos(repos.fornecedores.listar_ativos(visao='resumo'))
     except Exception as e:
         st.error(f"Erro ao buscar fornecedores: {e}")
         return []
 
-# Função para buscar fornecedor por nome (busca inteligente)
-def buscar_fornecedores(termo_busca):
-    fornecedores = get_fornecedores_ativos()
+# Índice de busca montado uma vez e compartilhado (somente leitura, sem cópia)
+@cache_com_tags(ttl=30, tags=[tag('fornecedores')], copiar=False)
+def get_indice_fornecedores():
+    return IndiceFornecedores(get_fornecedores_ativos())
+
+# Função para buscar fornecedor por nome, CNPJ/CPF ou telefone (busca inteligente)
+def buscar_fornecedores(termo_busca, limite=10):
+    indice = get_indice_fornecedores()
     
     # Debug: mostrar quantos fornecedores foram encontrados
-    if not fornecedores:
+    if not indice.fornecedores:
         st.warning("⚠️ Nenhum fornecedor encontrado no banco de dados")
         return []
     
-    if not termo_busca or termo_busca.strip() == "":
-        return fornecedores[:10]  # Limitar a 10 para não sobrecarregar
-    
-    termo = termo_busca.lower().strip()
-    # Busca mais flexível: busca por qualquer parte do nome
-    resultados = [f for f in fornecedores if termo in f['nome'].lower()]
-    
-    return resultados
+    # Sem acentos, por prefixo e por trigramas, já ordenado por relevância
+    return indice.buscar(termo_busca, k=limite)
 
 # Buscar custos do mês
 custos_mes = get_custos_mes_atual()
 
-# Calcular totais por tipo
-custos_fixos_mes = sum([float(c.get('valor', 0)) for c in custos_mes if c.get('tipo_custo') == 'Custos Fixos'])
-custos_variaveis_mes = sum([float(c.get('valor', 0)) for c in custos_mes if c.get('tipo_custo') == 'Custos Variáveis'])
-investimentos_mes = sum([float(c.get('valor', 0)) for c in custos_mes if c.get('tipo_custo') == 'Investimentos'])
-depreciacao_mes = sum([float(c.get('depreciacao_mensal', 0)) for c in custos_mes if c.get('tipo_custo') == 'Investimentos'])
+# Totais por tipo vêm do rollup do mês (um único documento)
+hoje = datetime.now()
+resumo_mes = get_resumo_custos(hoje.strftime("%Y-%m"))
+custos_fixos_mes = resumo_mes['custos_fixos']
+custos_variaveis_mes = resumo_mes['custos_variaveis']
+investimentos_mes = resumo_mes['investimentos']
+depreciacao_mes = resumo_mes['depreciacao']
 
 total_mes = custos_fixos_mes + custos_variaveis_mes + investimentos_mes
 
 # Sidebar com resumo contábil
-hoje = datetime.now()
 mes_atual = hoje.strftime("%m/%y")
 st.sidebar.header("💰 Resumo Contábil")
 st.sidebar.markdown(f"**📅 Mês: {mes_atual}**")
@@ -183,7 +160,7 @@ st.sidebar.metric("💎 Investimentos", f"R$ {investimentos_mes:.2f}")
 if depreciacao_mes > 0:
     st.sidebar.metric("📉 Depreciação/Mês", f"R$ {depreciacao_mes:.2f}")
 st.sidebar.metric("💰 Total Mês", f"R$ {total_mes:.2f}")
-st.sidebar.metric("📅 Registros", len(custos_mes))
+st.sidebar.metric("📅 Registros", resumo_mes['registros'])
 
 # Toggle para mostrar/ocultar formulário
 st.subheader("📝 Novo Registro de Custo")
@@ -217,7 +194,7 @@ if st.session_state.get('show_form', False):
     
     with col_debug2:
         if st.button("🔄 Limpar Cache", help="Atualizar lista de fornecedores"):
-            st.cache_data.clear()
+            invalidar('fornecedores')
             st.success("✅ Cache limpo! Tente buscar novamente.")
             st.rerun()
     
@@ -282,7 +259,7 @@ if st.session_state.show_form:
                 
                 unidade_medida = st.selectbox(
                     "📏 Unidade",
-                    ["UN", "KG", "L", "M", "M²", "M³", "T", "SC", "CX", "PC", "HR", "DIA"],
+                    UNIDADES_MEDIDA,
                     help="Unidade de medida"
                 )
             
@@ -389,14 +366,14 @@ if st.session_state.show_form:
                 st.markdown("**🔍 Busca Rápida (opcional):**")
                 termo_busca = st.text_input(
                     "Digite para filtrar fornecedores:",
-                    placeholder="Digite parte do nome para filtrar...",
+                    placeholder="Nome, CNPJ/CPF ou telefone...",
                     help="Filtra a lista de fornecedores",
                     label_visibility="collapsed"
                 )
                 
                 # Filtrar fornecedores se houver termo de busca
                 if termo_busca:
-                    fornecedores_filtrados = [f for f in todos_fornecedores if termo_busca.lower() in f['nome'].lower()]
+                    fornecedores_filtrados = buscar_fornecedores(termo_busca, limite=5)
                     if fornecedores_filtrados:
                         st.markdown("**📋 Fornecedores encontrados:**")
                         for i, forn in enumerate(fornecedores_filtrados[:5]):
@@ -432,7 +409,6 @@ if st.session_state.show_form:
         )
         
         # Validação da imagem
-        imagem_url = None
         if uploaded_file:
             if is_valid_image(uploaded_file):
                 st.success(f"✅ Arquivo válido: {uploaded_file.name} ({uploaded_file.size/1024:.1f} KB)")
@@ -454,15 +430,13 @@ if st.session_state.show_form:
         if submitted:
             if valor > 0 and descricao_item.strip() and quantidade > 0 and valor_unitario > 0 and fornecedor.strip():
                 try:
-                    # Upload da imagem se fornecida
+                    # O arquivo é lido agora: o envio acontece em segundo plano,
+                    # depois que o custo já foi salvo
+                    anexo = None
                     if uploaded_file:
-                        with st.spinner("📤 Fazendo upload da imagem..."):
-                            imagem_url = upload_image_to_storage(uploaded_file)
-                        
-                        if imagem_url:
-                            st.success("✅ Imagem salva com sucesso!")
-                        else:
-                            st.warning("⚠️ Falha no upload da imagem, mas o custo será salvo mesmo assim.")
+                        uploaded_file.seek(0)
+                        anexo = (uploaded_file.read(), uploaded_file.type,
+                                 uploaded_file.name.split('.')[-1].lower())
                     
                     # Preparar dados
                     custo_data = {
@@ -478,7 +452,8 @@ if st.session_state.show_form:
                         'fornecedor': fornecedor.strip(),
                         'fornecedor_id': fornecedor_selecionado_id if 'fornecedor_selecionado_id' in locals() else '',
                         'numero_nf': numero_nf.strip() if numero_nf else '',
-                        'imagem_nf_url': imagem_url or '',
+                        'imagem_nf_url': '',
+                        'imagem_nf_miniatura_url': '',
                         'tem_nota_fiscal': bool(uploaded_file),
                         'observacoes': observacoes.strip(),
                         'timestamp': datetime.now().isoformat(),
@@ -497,8 +472,21 @@ if st.session_state.show_form:
                     if tipo_custo == "Custos Variáveis" and lote_producao.strip():
                         custo_data['lote_producao'] = lote_producao.strip()
                     
+                    # Nota já enviada (ex.: outro item da mesma NF): só reaproveita as URLs
+                    enviado = repos.arquivos_nf.obter(hash_conteudo(anexo[0])) if anexo else None
+                    if enviado:
+                        custo_data.update({
+                            'imagem_nf_url': enviado['url'],
+                            'imagem_nf_miniatura_url': enviado.get('miniatura_url', ''),
+                            'imagem_nf_status': 'ok',
+                        })
+                    elif anexo:
+                        custo_data['imagem_nf_status'] = 'pending'
+                    
                     # Salvar no Firebase
-                    doc_ref = db.collection('custos_contabeis').add(custo_data)
+                    custo_id = repos.custos.adicionar(custo_data)
+                    if anexo and not enviado:
+                        get_fila_uploads().enfileirar(custo_id, custo_data['data'], *anexo)
                     
                     # Mensagem de sucesso com detalhes
                     success_msg = f"✅ {tipo_custo} de {data_custo.strftime('%d/%m/%Y')} salvo com sucesso!"
@@ -506,13 +494,14 @@ if st.session_state.show_form:
                         success_msg += f" | Fornecedor: {fornecedor}"
                     if numero_nf:
                         success_msg += f" | NF: {numero_nf}"
-                    if uploaded_file:
-                        success_msg += f" | 📷 Com anexo"
+                    if enviado:
+                        success_msg += f" | 📷 Anexo já enviado antes, reaproveitado"
+                    elif uploaded_file:
+                        success_msg += f" | 📷 Anexo sendo enviado em segundo plano"
                     
                     st.success(success_msg)
                     
-                    # Limpar cache para atualizar resumo
-                    st.cache_data.clear()
+                    # O repositório já invalidou o cache do mês deste custo
                     st.rerun()
                     
                 except Exception as e:
@@ -529,39 +518,168 @@ if st.session_state.show_form:
                 if not fornecedor.strip():
                     st.warning("⚠️ Selecione um fornecedor cadastrado no sistema!")
 
+# Notas fiscais ainda subindo em segundo plano
+andamento_uploads = get_fila_uploads().andamento()
+if andamento_uploads:
+    with st.expander(f"📤 {len(andamento_uploads)} nota(s) fiscal(is) sendo enviada(s)"):
+        for enviados, total in andamento_uploads.values():
+            if total:
+                st.progress(enviados / total, text=f"{enviados/1024:.0f} de {total/1024:.0f} KB")
+            else:
+                st.progress(0.0, text="Aguardando envio...")
+        st.caption("Os custos já estão salvos; o link da nota aparece quando o envio termina.")
+
+# Resumo de uma importação em lote (planilha ou NF-e)
+def mostrar_resultado_importacao(resultado):
+    if resultado.falha:
+        st.error(
+            f"❌ Importação interrompida: {resultado.falha}. "
+            f"{resultado.gravadas} custos foram gravados; envie o mesmo arquivo para continuar."
+        )
+    elif resultado.concluida and not resultado.lidas and resultado.puladas:
+        st.info("ℹ️ Este arquivo já foi importado.")
+    else:
+        st.success(f"✅ {resultado.gravadas} custos importados!")
+    if resultado.puladas and resultado.lidas:
+        st.caption(f"{resultado.puladas} linhas já importadas anteriormente foram puladas.")
+
+    if resultado.erros:
+        st.warning(f"⚠️ {len(resultado.erros)} linhas não foram importadas:")
+        import pandas as pd
+        df_erros = pd.DataFrame([
+            {'Linha': e['linha'], 'Erros': '; '.join(e['erros']), **{k: v for k, v in e['dados'].items() if k}}
+            for e in resultado.erros
+        ])
+        st.dataframe(df_erros, use_container_width=True, hide_index=True)
+        st.download_button(
+            "📥 Baixar relatório de erros",
+            data=df_erros.to_csv(index=False).encode('utf-8'),
+            file_name=f"erros_importacao_{datetime.now().strftime('%Y%m%d_%H%M')}.csv",
+            mime="text/csv"
+        )
+
+def barra_de_progresso(barra):
+    def mostrar_progresso(resultado):
+        if resultado.total:
+            fracao = min(1.0, (resultado.lidas + resultado.puladas) / resultado.total)
+        else:
+            fracao = 0.0
+        barra.progress(
+            fracao,
+            text=f"{resultado.gravadas} custos gravados, {len(resultado.erros)} linhas com erro"
+        )
+    return mostrar_progresso
+
+# Importação em lote de planilhas (migração de registros em papel)
+with st.expander("📥 Importar custos em lote (CSV/XLSX)"):
+    st.markdown(
+        "Uma linha por custo, com as colunas: `data`, `tipo_custo`, `categoria`, `descricao_item`, "
+        "`quantidade`, `unidade_medida`, `valor_unitario`, `fornecedor` (nome ou CNPJ/CPF cadastrado), "
+        "`numero_nf`, `observacoes`, `vida_util_meses` (investimentos) e `lote_producao` (variáveis)."
+    )
+    modelo = (
+        "data;tipo_custo;categoria;descricao_item;quantidade;unidade_medida;valor_unitario;fornecedor;numero_nf;observacoes;vida_util_meses;lote_producao\n"
+        "05/08/2024;Custos Variáveis;sementes;Semente de alface;2;CX;45,90;Agropecuária São João;123456;;;ALFACE_001\n"
+    )
+    st.download_button(
+        "📄 Baixar planilha modelo",
+        data=modelo.encode('utf-8-sig'),
+        file_name="modelo_importacao_custos.csv",
+        mime="text/csv"
+    )
+
+    arquivo_importacao = st.file_uploader(
+        "Planilha de custos",
+        type=['csv', 'xlsx'],
+        key="arquivo_importacao_custos",
+        help="Se a importação for interrompida, envie o mesmo arquivo de novo para continuar de onde parou"
+    )
+
+    if arquivo_importacao and st.button("📥 Importar custos", type="primary", use_container_width=True):
+        barra = st.progress(0.0, text="Lendo planilha...")
+        resultado = importar_custos_planilha(
+            repos, arquivo_importacao, arquivo_importacao.name,
+            get_fornecedores_ativos(), progresso=barra_de_progresso(barra)
+        )
+        if resultado.concluida:
+            barra.progress(1.0, text="Importação concluída")
+
+        mostrar_resultado_importacao(resultado)
+
+# Importação de notas fiscais eletrônicas enviadas pelos fornecedores
+with st.expander("🧾 Importar NF-e (XML ou ZIP)"):
+    st.markdown(
+        "Cada item da nota vira um custo com quantidade, unidade e valor unitário da NF-e. "
+        "O fornecedor é encontrado pelo CNPJ/CPF do emitente."
+    )
+    col_nfe1, col_nfe2 = st.columns(2)
+    with col_nfe1:
+        tipo_custo_nfe = st.selectbox(
+            "🏷️ Classificação dos itens",
+            list(CATEGORIAS_POR_TIPO.keys()),
+            index=1,
+            key="tipo_custo_nfe"
+        )
+    with col_nfe2:
+        categorias_nfe = CATEGORIAS_POR_TIPO[tipo_custo_nfe]
+        categoria_nfe = st.selectbox(
+            "Categoria",
+            list(categorias_nfe.keys()),
+            format_func=lambda x: categorias_nfe[x],
+            key="categoria_nfe"
+        )
+    cadastrar_emitentes = st.checkbox(
+        "Cadastrar emitentes que ainda não são fornecedores",
+        value=True,
+        key="cadastrar_emitentes_nfe"
+    )
+    arquivo_nfe = st.file_uploader(
+        "XML da NF-e ou .zip com várias notas",
+        type=['xml', 'zip'],
+        key="arquivo_nfe",
+        help="Se a importação for interrompida, envie o mesmo arquivo de novo para continuar de onde parou"
+    )
+
+    if arquivo_nfe and st.button("🧾 Importar NF-e", type="primary", use_container_width=True):
+        barra = st.progress(0.0, text="Lendo notas...")
+        resultado = importar_nfe(
+            repos, arquivo_nfe, arquivo_nfe.name, tipo_custo_nfe, categoria_nfe,
+            cadastrar_fornecedores=cadastrar_emitentes, progresso=barra_de_progresso(barra)
+        )
+        if resultado.concluida:
+            barra.progress(1.0, text="Importação concluída")
+        mostrar_resultado_importacao(resultado)
+
+# Período exibido na tabela, no histórico e no gráfico
+inicio_mes_atual = hoje.date().replace(day=1)
+periodo = st.date_input(
+    "📅 Período",
+    value=(inicio_mes_atual, hoje.date()),
+    format="DD/MM/YYYY",
+    help="Escolha o intervalo de datas (ex.: trimestre ou ano)"
+)
+# Enquanto só a data inicial foi escolhida, o período vai até hoje
+inicio_periodo = periodo[0] if periodo else inicio_mes_atual
+fim_periodo = periodo[1] if len(periodo) > 1 else hoje.date()
+
+if inicio_periodo >= inicio_mes_atual:
+    # Dentro do mês corrente: usa os dados já sincronizados do mês
+    custos_periodo = [
+        c for c in custos_mes
+        if inicio_periodo.isoformat() <= c.get('data', '')[:10] <= fim_periodo.isoformat()
+    ]
+else:
+    custos_periodo = get_custos_periodo(inicio_periodo.isoformat(), fim_periodo.isoformat())
+
 # Tabela filtrada com dados dos custos
 st.subheader("📊 Dados dos Custos - Tabela Filtrável")
 
-if custos_mes:
-    # Converter lista para DataFrame
-    df_custos = pd.DataFrame(custos_mes)
-    
-    # Adicionar coluna de data formatada
-    df_custos['data_formatada'] = pd.to_datetime(df_custos['data']).dt.strftime('%d/%m/%Y')
+if custos_periodo:
+    # Converter lista para DataFrame (pandas só é carregado quando há dados)
+    df_custos = dataframe_custos(custos_periodo)
     
-    # Garantir que colunas novas existam (para compatibilidade com dados antigos)
-    if 'quantidade' not in df_custos.columns:
-        df_custos['quantidade'] = 1.0
-    if 'unidade_medida' not in df_custos.columns:
-        df_custos['unidade_medida'] = 'UN'
-    if 'valor_unitario' not in df_custos.columns:
-        df_custos['valor_unitario'] = df_custos['valor']
-    
-    # Selector de colunas para exibir
-    colunas_disponiveis = {
-        'data_formatada': 'Data',
-        'tipo_custo': 'Tipo',
-        'categoria_nome': 'Categoria',
-        'descricao_item': 'Produto/Serviço',
-        'quantidade': 'Qtd',
-        'unidade_medida': 'Un.',
-        'valor_unitario': 'Valor Unit. (R$)',
-        'valor': 'Valor Total (R$)',
-        'fornecedor': 'Fornecedor',
-        'numero_nf': 'Nº NF',
-        'tem_nota_fiscal': 'Com NF',
-        'observacoes': 'Observações'
-    }
+    # Colunas para exibir: COLUNAS_CUSTOS (services/tabelas.py)
+    colunas_disponiveis = COLUNAS_CUSTOS
     
     # Filtros
     col_filtro1, col_filtro2, col_filtro3 = st.columns(3)
@@ -578,7 +696,7 @@ if custos_mes:
         colunas_selecionadas = st.multiselect(
             "📋 Colunas para Exibir",
             options=list(colunas_disponiveis.keys()),
-            default=['data_formatada', 'tipo_custo', 'categoria_nome', 'descricao_item', 'quantidade', 'unidade_medida', 'valor_unitario', 'valor', 'fornecedor'],
+            default=COLUNAS_CUSTOS_PADRAO,
             format_func=lambda x: colunas_disponiveis[x],
             help="Escolha quais colunas mostrar na tabela"
         )
@@ -593,25 +711,11 @@ if custos_mes:
         )
     
     # Aplicar filtros
-    df_filtrado = df_custos[
-        (df_custos['tipo_custo'].isin(tipos_selecionados)) &
-        (df_custos['valor'] >= valor_minimo)
-    ]
+    df_filtrado = filtrar_custos(df_custos, tipos_selecionados, valor_minimo)
     
     if not df_filtrado.empty and colunas_selecionadas:
-        # Preparar DataFrame para exibição
-        df_exibicao = df_filtrado[colunas_selecionadas].copy()
-        
-        # Renomear colunas para nomes mais amigáveis
-        df_exibicao = df_exibicao.rename(columns=colunas_disponiveis)
-        
-        # Formatar valores monetários e quantidade
-        if 'Valor Total (R$)' in df_exibicao.columns:
-            df_exibicao['Valor Total (R$)'] = df_exibicao['Valor Total (R$)'].apply(lambda x: f"R$ {x:.2f}")
-        if 'Valor Unit. (R$)' in df_exibicao.columns:
-            df_exibicao['Valor Unit. (R$)'] = df_exibicao['Valor Unit. (R$)'].apply(lambda x: f"R$ {x:.2f}")
-        if 'Qtd' in df_exibicao.columns:
-            df_exibicao['Qtd'] = df_exibicao['Qtd'].apply(lambda x: f"{x:.2f}".rstrip('0').rstrip('.'))
+        # Preparar DataFrame para exibição (nomes amigáveis e valores formatados)
+        df_exibicao = tabela_exibicao_custos(df_filtrado, colunas_selecionadas)
         
         # Exibir tabela
         st.dataframe(
@@ -651,7 +755,7 @@ else:
 # Histórico de custos em cards
 st.subheader("📆 Histórico de Custos por Classificação")
 
-if custos_mes:
+if custos_periodo:
     # Criar abas por tipo de custo
     tab1, tab2, tab3 = st.tabs(["🔒 Custos Fixos", "📈 Custos Variáveis", "💎 Investimentos"])
     
@@ -702,15 +806,15 @@ if custos_mes:
             st.info(f"Nenhum registro de {tipo.lower()} ainda.")
     
     with tab1:
-        custos_fixos = [c for c in custos_mes if c.get('tipo_custo') == 'Custos Fixos']
+        custos_fixos = [c for c in custos_periodo if c.get('tipo_custo') == 'Custos Fixos']
         mostrar_custos_por_tipo(custos_fixos, 'Custos Fixos')
     
     with tab2:
-        custos_vars = [c for c in custos_mes if c.get('tipo_custo') == 'Custos Variáveis']
+        custos_vars = [c for c in custos_periodo if c.get('tipo_custo') == 'Custos Variáveis']
         mostrar_custos_por_tipo(custos_vars, 'Custos Variáveis')
     
     with tab3:
-        investimentos = [c for c in custos_mes if c.get('tipo_custo') == 'Investimentos']
+        investimentos = [c for c in custos_periodo if c.get('tipo_custo') == 'Investimentos']
         mostrar_custos_por_tipo(investimentos, 'Investimentos')
         
         # Mostrar resumo de ROI (placeholder para implementação futura)
@@ -722,17 +826,11 @@ if custos_mes:
             st.markdown("*Cálculo de ROI será implementado quando houver dados de receita.*")
     
     # Gráfico comparativo
-    if len(custos_mes) > 1:
+    if len(custos_periodo) > 1:
         st.subheader("📈 Evolução por Tipo de Custo")
-        df_grafico = pd.DataFrame(custos_mes)
-        df_grafico['data'] = pd.to_datetime(df_grafico['data'])
-        
-        # Agrupar por data e tipo
-        pivot_data = df_grafico.groupby(['data', 'tipo_custo'])['valor'].sum().unstack(fill_value=0)
-        
         # Formatá índice do gráfico para formato brasileiro compacto
-        pivot_data.index = pivot_data.index.strftime('%d/%m')
-        st.area_chart(pivot_data)
+        formato = '%d/%m' if inicio_periodo >= inicio_mes_atual else '%d/%m/%y'
+        st.area_chart(evolucao_por_tipo(custos_periodo, formato))
 
 else:
     st.info("📝 Nenhum custo registrado ainda. Adicione o primeiro registro acima!")
@@ -773,4 +871,7 @@ with st.expander("📊 Entenda as Classificações Contábeis"):
         - Cálculo de ROI
         """)
 
-st.markdown("💰 **Gestão Contábil RST** - Controle financeiro profissional!")
\ No newline at end of file
+st.markdown("💰 **Gestão Contábil RST** - Controle financeiro profissional!")
+
+# Painel de chamadas ao banco (RST_PAINEL_DEBUG=1 ou ?debug=1)
+painel_debug()
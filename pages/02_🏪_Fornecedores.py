@@ -1,12 +1,15 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
 import sys
 import os
 
 # Adicionar o diretório raiz ao path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.firebase_config import init_firebase
+from services.repository import FornecedorDuplicado, get_repositorios
+from services.cache import cache_com_tags, tag
+from services.live_cache import ler_ao_vivo
+from services.busca import normalizar
+from services.instrumentacao import iniciar_rerun, painel_debug
 
 # Configuração da página
 st.set_page_config(
@@ -15,6 +18,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Totais de chamadas ao banco deste rerun (RST_INSTRUMENTACAO=1)
+iniciar_rerun()
+
 # CSS para melhor experiência
 st.markdown("""
 <style>
@@ -39,28 +45,39 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicializar Firebase
-db = init_firebase()
+# Inicializar camada de dados
+repos = get_repositorios()
 
 # Título
 st.title("🏪 Cadastro de Fornecedores")
 st.markdown("Gerencie sua base de fornecedores para facilitar o registro de custos")
 
-if not db:
-    st.error("❌ Erro na conexão com Firebase. Verifique as configurações.")
+if not repos:
+    st.error("❌ Erro na conexão com o banco de dados. Verifique as configurações.")
     st.stop()
 
+# Chaves únicas (nome/CNPJ) dos fornecedores antigos: uma vez por processo
+@st.cache_resource
+def preparar_chaves_fornecedores():
+    try:
+        repos.fornecedores.garantir_chaves()
+    except Exception as e:
+        st.warning(f"⚠️ Não foi possível indexar os fornecedores existentes: {e}")
+
+preparar_chaves_fornecedores()
+
 # Função para buscar fornecedores
-@st.cache_data(ttl=60)
 def get_fornecedores():
-    try:
-        docs = db.collection('fornecedores').order_by('nome').stream()
-        fornecedores = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            fornecedores.append(data)
+    # Com os listeners ativos a leitura vem da memória, sem ir ao Firestore
+    fornecedores = ler_ao_vivo('fornecedores')
+    if fornecedores is not None:
         return fornecedores
+    return get_fornecedores_cache()
+
+@cache_com_tags(ttl=60, tags=[tag('fornecedores')])
+def get_fornecedores_cache():
+    try:
+        return repos.fornecedores.listar(visao='tabela')
     except Exception as e:
         st.error(f"Erro ao buscar fornecedores: {e}")
         return []
@@ -68,31 +85,29 @@ def get_fornecedores():
 # Função para buscar custos de um fornecedor
 def get_custos_fornecedor(nome_fornecedor):
     try:
-        docs = db.collection('custos_contabeis').where(
-            'fornecedor', '==', nome_fornecedor
-        ).order_by('data', direction='DESCENDING').limit(10).stream()
-        
-        custos = []
-        for doc in docs:
-            data = doc.to_dict()
-            custos.append(data)
-        
-        return custos
+        return repos.custos.listar_por_fornecedor(nome_fornecedor, limite=10)
     except Exception as e:
         return []
 
+# Contagens via count() no servidor, sem baixar os documentos
+@cache_com_tags(ttl=60, tags=[tag('fornecedores')])
+def get_contagens_fornecedores():
+    try:
+        return repos.fornecedores.contagens()
+    except Exception as e:
+        st.error(f"Erro ao contar fornecedores: {e}")
+        return {'total': 0, 'ativos': 0, 'inativos': 0}
+
 # Buscar fornecedores existentes
 fornecedores = get_fornecedores()
 
 # Sidebar com estatísticas
 st.sidebar.header("📊 Estatísticas")
-total_fornecedores = len(fornecedores)
-ativos = len([f for f in fornecedores if f.get('ativo', True)])
-inativos = total_fornecedores - ativos
+contagens = get_contagens_fornecedores()
 
-st.sidebar.metric("🏪 Total de Fornecedores", total_fornecedores)
-st.sidebar.metric("✅ Ativos", ativos)
-st.sidebar.metric("⏸️ Inativos", inativos)
+st.sidebar.metric("🏪 Total de Fornecedores", contagens['total'])
+st.sidebar.metric("✅ Ativos", contagens['ativos'])
+st.sidebar.metric("⏸️ Inativos", contagens['inativos'])
 
 # Formulário de cadastro
 st.subheader("📝 Novo Fornecedor")
@@ -167,38 +182,32 @@ if st.session_state.show_form_fornecedor:
         if submitted:
             if nome_fornecedor.strip():
                 try:
-                    # Verificar se fornecedor já existe
-                    fornecedor_existente = db.collection('fornecedores').where(
-                        'nome', '==', nome_fornecedor.strip()
-                    ).limit(1).stream()
+                    # Preparar dados do fornecedor
+                    fornecedor_data = {
+                        'nome': nome_fornecedor.strip(),
+                        'cnpj_cpf': cnpj_cpf.strip() if cnpj_cpf else '',
+                        'telefone': telefone.strip() if telefone else '',
+                        'email': email.strip() if email else '',
+                        'endereco': endereco.strip() if endereco else '',
+                        'tipo_fornecedor': tipo_fornecedor,
+                        'observacoes': observacoes.strip() if observacoes else '',
+                        'ativo': ativo,
+                        'data_cadastro': datetime.now().isoformat(),
+                        'ultima_atualizacao': datetime.now().isoformat(),
+                        'app_version': 'RST_v2.1'
+                    }
                     
-                    if list(fornecedor_existente):
-                        st.warning("⚠️ Fornecedor já cadastrado com este nome!")
-                    else:
-                        # Preparar dados do fornecedor
-                        fornecedor_data = {
-                            'nome': nome_fornecedor.strip(),
-                            'cnpj_cpf': cnpj_cpf.strip() if cnpj_cpf else '',
-                            'telefone': telefone.strip() if telefone else '',
-                            'email': email.strip() if email else '',
-                            'endereco': endereco.strip() if endereco else '',
-                            'tipo_fornecedor': tipo_fornecedor,
-                            'observacoes': observacoes.strip() if observacoes else '',
-                            'ativo': ativo,
-                            'data_cadastro': datetime.now().isoformat(),
-                            'ultima_atualizacao': datetime.now().isoformat(),
-                            'app_version': 'RST_v2.1'
-                        }
-                        
-                        # Salvar no Firebase
-                        doc_ref = db.collection('fornecedores').add(fornecedor_data)
-                        
-                        st.success(f"✅ Fornecedor '{nome_fornecedor}' cadastrado com sucesso!")
-                        
-                        # Limpar cache para atualizar lista
-                        st.cache_data.clear()
-                        st.rerun()
-                        
+                    # Salvar no Firebase; o nome (sem acentos/maiúsculas) e o
+                    # CNPJ/CPF são únicos e conferidos no mesmo lote da gravação
+                    repos.fornecedores.adicionar(fornecedor_data)
+                    
+                    st.success(f"✅ Fornecedor '{nome_fornecedor}' cadastrado com sucesso!")
+                    
+                    # O repositório já invalidou o cache de fornecedores
+                    st.rerun()
+                    
+                except FornecedorDuplicado as e:
+                    st.warning(f"⚠️ {e}!")
                 except Exception as e:
                     st.error(f"❌ Erro ao salvar fornecedor: {e}")
             else:
@@ -238,8 +247,10 @@ if fornecedores:
     fornecedores_filtrados = fornecedores
     
     if filtro_nome:
+        # Sem diferenciar acentos ("Agropecuaria" encontra "Agropecuária")
+        termo_nome = normalizar(filtro_nome)
         fornecedores_filtrados = [f for f in fornecedores_filtrados 
-                                if filtro_nome.lower() in f.get('nome', '').lower()]
+                                if termo_nome in normalizar(f.get('nome', ''))]
     
     if filtro_tipo:
         fornecedores_filtrados = [f for f in fornecedores_filtrados 
@@ -297,6 +308,7 @@ if fornecedores:
                         custos = get_custos_fornecedor(nome)
                         if custos:
                             st.subheader(f"📊 Histórico de Compras - {nome}")
+                            import pandas as pd
                             df_custos = pd.DataFrame(custos)
                             df_custos['data_formatada'] = pd.to_datetime(df_custos['data']).dt.strftime('%d/%m/%Y')
                             df_custos['valor_formatado'] = df_custos['valor'].apply(lambda x: f"R$ {x:.2f}")
@@ -327,7 +339,7 @@ if fornecedores:
                     if st.button(f"🔄 {status_text}", key=f"toggle_{fornecedor['id']}", use_container_width=True):
                         try:
                             # Atualizar status do fornecedor
-                            db.collection('fornecedores').document(fornecedor['id']).update({
+                            repos.fornecedores.atualizar(fornecedor['id'], {
                                 'ativo': not ativo,
                                 'ultima_atualizacao': datetime.now().isoformat()
                             })
@@ -335,8 +347,7 @@ if fornecedores:
                             action = "ativado" if not ativo else "desativado"
                             st.success(f"✅ Fornecedor {nome} foi {action}!")
                             
-                            # Limpar cache e recarregar
-                            st.cache_data.clear()
+                            # O repositório já invalidou o cache de fornecedores
                             st.rerun()
                             
                         except Exception as e:
@@ -350,7 +361,8 @@ if fornecedores:
     if len(fornecedores_filtrados) > 0:
         st.subheader("📊 Resumo em Tabela")
         
-        # Converter para DataFrame
+        # Converter para DataFrame (pandas só é carregado aqui)
+        import pandas as pd
         df_fornecedores = pd.DataFrame(fornecedores_filtrados)
         
         # Preparar DataFrame para exibição
@@ -400,4 +412,7 @@ with st.expander("💡 Dicas de Uso"):
     - Controle de fornecedores ativos/inativos
     """)
 
-st.markdown("🏪 **Cadastro de Fornecedores RST** - Organize sua base de fornecedores!")
\ No newline at end of file
+st.markdown("🏪 **Cadastro de Fornecedores RST** - Organize sua base de fornecedores!")
+
+# Painel de chamadas ao banco (RST_PAINEL_DEBUG=1 ou ?debug=1)
+painel_debug()
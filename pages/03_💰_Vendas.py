@@ -1,5 +1,4 @@
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
 import sys
 import os
@@ -7,7 +6,12 @@ import uuid
 
 # Adicionar o diretório raiz ao path para importar config
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config.firebase_config import init_firebase
+from services.repository import get_repositorios, paginar_documentos
+from services.sync import get_sincronizador
+from services.cache import cache_com_tags, tag
+from services.live_cache import ler_ao_vivo
+from services.rollups import get_resumo_vendas
+from services.instrumentacao import iniciar_rerun, painel_debug
 
 # Configuração da página
 st.set_page_config(
@@ -16,6 +20,9 @@ st.set_page_config(
     layout="wide"
 )
 
+# Totais de chamadas ao banco deste rerun (RST_INSTRUMENTACAO=1)
+iniciar_rerun()
+
 # CSS para melhor experiência
 st.markdown("""
 <style>
@@ -49,53 +56,92 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Inicializar Firebase
-db = init_firebase()
+# Inicializar camada de dados
+repos = get_repositorios()
 
 # Título
+TIPOS_PAGAMENTO = ["Dinheiro", "PIX", "Cartão", "Boleto", "Prazo"]
+
+STATUS_FILTRO = {
+    "Todos": None,
+    "Apenas Pagas": "Pago",
+    "Apenas Pendentes": "Pendente",
+    "Apenas Consignadas": "Consignado",
+    "Apenas Acertadas": "Acertado",
+}
+
 st.title("💰 Gestão de Vendas")
 st.markdown("Sistema completo de vendas com múltiplos produtos e controle de recebimentos")
 
-if not db:
-    st.error("❌ Erro na conexão com Firebase. Verifique as configurações.")
+if not repos:
+    st.error("❌ Erro na conexão com o banco de dados. Verifique as configurações.")
     st.stop()
 
-# Função para buscar vendas do mês atual
-@st.cache_data(ttl=30)
-def get_vendas_mes_atual():
+# Vendas do mês sincronizadas incrementalmente (busca por nome do cliente)
+@cache_com_tags(ttl=30, tags=lambda inicio_mes: [tag('vendas', inicio_mes[:7])])
+def get_vendas_mes_sincronizado(inicio_mes):
     try:
-        hoje = datetime.now()
-        inicio_mes = f"{hoje.year}-{hoje.month:02d}-01"
-        
-        docs = db.collection('vendas').where(
-            'data_venda', '>=', inicio_mes
-        ).order_by('data_venda', direction='DESCENDING').stream()
-        
-        vendas = []
-        for doc in docs:
-            data = doc.to_dict()
-            data['id'] = doc.id
-            vendas.append(data)
-        
-        return vendas
+        # Só busca o que mudou desde a última leitura
+        sincronizador = get_sincronizador('vendas', 'data_venda', repos.vendas, visao='tabela')
+        return sincronizador.documentos(inicio_mes)
     except Exception as e:
         st.error(f"Erro ao buscar vendas: {e}")
         return []
 
-# Buscar vendas do mês
-vendas_mes = get_vendas_mes_atual()
+# Estatísticas do mês via agregações no servidor (count/sum/avg)
+@cache_com_tags(ttl=30, tags=lambda inicio_mes: [tag('vendas', inicio_mes[:7])])
+def get_estatisticas_vendas(inicio_mes):
+    try:
+        return repos.vendas.estatisticas_mes(inicio_mes)
+    except Exception as e:
+        st.error(f"Erro ao calcular estatísticas: {e}")
+        return {'total_vendas': 0, 'faturamento': 0.0, 'ticket_medio': 0.0}
 
-# Calcular totais
-total_vendas_mes = sum([float(v.get('valor_total', 0)) for v in vendas_mes])
-vendas_pagas = [v for v in vendas_mes if v.get('status_recebimento') == 'Pago']
-vendas_pendentes = [v for v in vendas_mes if v.get('status_recebimento') == 'Pendente']
-vendas_consignadas = [v for v in vendas_mes if v.get('status_recebimento') == 'Consignado']
-total_recebido = sum([float(v.get('valor_total', 0)) for v in vendas_pagas])
-total_pendente = sum([float(v.get('valor_total', 0)) for v in vendas_pendentes])
-total_consignado = sum([float(v.get('valor_total', 0)) for v in vendas_consignadas])
+# Página da listagem de vendas: o custo de cada rerun é limitado ao
+# tamanho da página, não ao volume do mês
+def get_pagina_vendas(inicio_mes, tamanho, apos, status, tipos_pagamento, cliente):
+    vendas = ler_ao_vivo('vendas', inicio_mes)
+    if vendas is None and cliente:
+        # Busca por parte do nome não tem índice no servidor: usa o mês sincronizado
+        vendas = get_vendas_mes_sincronizado(inicio_mes)
+    if vendas is not None:
+        if status:
+            vendas = [v for v in vendas if v.get('status_recebimento') == status]
+        if tipos_pagamento is not None:
+            vendas = [v for v in vendas if v.get('tipo_pagamento', 'N/A') in tipos_pagamento]
+        if cliente:
+            vendas = [v for v in vendas if cliente in v.get('nome_cliente', '').lower()]
+        pagina, proximo = paginar_documentos(vendas, 'data_venda', tamanho, apos)
+        return pagina, proximo, len(vendas)
 
-# Sidebar com resumo
+    pagina, proximo = get_pagina_vendas_servidor(inicio_mes, tamanho, apos, status, tipos_pagamento)
+    return pagina, proximo, get_total_vendas_filtradas(inicio_mes, status, tipos_pagamento)
+
+@cache_com_tags(ttl=30, tags=lambda inicio_mes, *args: [tag('vendas', inicio_mes[:7])])
+def get_pagina_vendas_servidor(inicio_mes, tamanho, apos, status, tipos_pagamento):
+    try:
+        # Cursor (data_venda, id): start_after no Firestore, sem offset
+        return repos.vendas.listar_pagina(inicio_mes, tamanho, apos, status, tipos_pagamento)
+    except Exception as e:
+        st.error(f"Erro ao buscar vendas: {e}")
+        return [], None
+
+@cache_com_tags(ttl=30, tags=lambda inicio_mes, *args: [tag('vendas', inicio_mes[:7])])
+def get_total_vendas_filtradas(inicio_mes, status, tipos_pagamento):
+    try:
+        return repos.vendas.contar(inicio_mes, status, tipos_pagamento)
+    except Exception:
+        return 0
+
+# Totais vêm do rollup do mês (um único documento)
 hoje = datetime.now()
+resumo_mes = get_resumo_vendas(hoje.strftime("%Y-%m"))
+total_vendas_mes = resumo_mes['total_vendas']
+total_recebido = resumo_mes['total_recebido']
+total_pendente = resumo_mes['total_pendente']
+total_consignado = resumo_mes['total_consignado']
+
+# Sidebar com resumo
 mes_atual = hoje.strftime("%m/%y")
 st.sidebar.header("💰 Resumo de Vendas")
 st.sidebar.markdown(f"**📅 Mês: {mes_atual}**")
@@ -103,7 +149,7 @@ st.sidebar.metric("💰 Total Vendas", f"R$ {total_vendas_mes:.2f}")
 st.sidebar.metric("✅ Recebido", f"R$ {total_recebido:.2f}")
 st.sidebar.metric("⏳ Pendente", f"R$ {total_pendente:.2f}")
 st.sidebar.metric("🚚 Consignado", f"R$ {total_consignado:.2f}")
-st.sidebar.metric("📄 Total Vendas", len(vendas_mes))
+st.sidebar.metric("📄 Total Vendas", resumo_mes['registros'])
 
 # Toggle para mostrar/ocultar formulário
 st.subheader("📝 Nova Venda")
@@ -155,7 +201,7 @@ if st.session_state.show_form_venda:
             
             tipo_pagamento = st.selectbox(
                 "💳 Tipo de Pagamento",
-                ["Dinheiro", "PIX", "Cartão", "Boleto", "Prazo"],
+                TIPOS_PAGAMENTO,
                 help="Forma de pagamento escolhida"
             )
         
@@ -293,7 +339,7 @@ if st.session_state.show_form_venda:
                     try:
                         # Preparar dados da venda
                         venda_data = {
-                            'numero_venda': f"V{datetime.now().strftime('%Y%m%d')}-{len(vendas_mes) + 1:03d}",
+                            'numero_venda': repos.vendas.proximo_numero(),
                             'data_venda': str(data_venda),
                             'nome_cliente': nome_cliente.strip(),
                             'telefone_cliente': telefone_cliente.strip() if telefone_cliente else '',
@@ -309,7 +355,7 @@ if st.session_state.show_form_venda:
                         }
                         
                         # Salvar no Firebase
-                        doc_ref = db.collection('vendas').add(venda_data)
+                        repos.vendas.adicionar(venda_data)
                         
                         st.success(f"✅ Venda {venda_data['numero_venda']} registrada com sucesso!")
                         st.success(f"💰 Valor total: R$ {total_venda:.2f}")
@@ -318,8 +364,7 @@ if st.session_state.show_form_venda:
                         # Limpar formulário
                         st.session_state.produtos_venda = []
                         
-                        # Limpar cache para atualizar resumo
-                        st.cache_data.clear()
+                        # O repositório já invalidou o cache do mês desta venda
                         st.rerun()
                         
                     except Exception as e:
@@ -335,9 +380,9 @@ if st.session_state.show_form_venda:
 # Tabela de vendas
 st.subheader("📊 Vendas do Mês - Filtros")
 
-if vendas_mes:
+if resumo_mes['registros']:
     # Filtros
-    col_filtro1, col_filtro2, col_filtro3 = st.columns(3)
+    col_filtro1, col_filtro2, col_filtro3, col_filtro4 = st.columns([3, 3, 2, 1])
     
     with col_filtro1:
         filtro_cliente = st.text_input(
@@ -347,43 +392,47 @@ if vendas_mes:
         )
     
     with col_filtro2:
-        tipos_pagamento = list(set([v.get('tipo_pagamento', 'N/A') for v in vendas_mes]))
         filtro_pagamento = st.multiselect(
             "💳 Tipo de Pagamento",
-            options=tipos_pagamento,
-            default=tipos_pagamento,
+            options=TIPOS_PAGAMENTO,
+            default=TIPOS_PAGAMENTO,
             help="Filtrar por tipo de pagamento"
         )
     
     with col_filtro3:
         filtro_status = st.selectbox(
             "📊 Status",
-            ["Todos", "Apenas Pagas", "Apenas Pendentes", "Apenas Consignadas", "Apenas Acertadas"],
+            list(STATUS_FILTRO),
             help="Filtrar por status de recebimento"
         )
     
-    # Aplicar filtros
-    vendas_filtradas = vendas_mes
+    with col_filtro4:
+        tamanho_pagina = st.selectbox("📄 Por página", [10, 20, 50], help="Vendas exibidas por página")
     
-    if filtro_cliente:
-        vendas_filtradas = [v for v in vendas_filtradas 
-                           if filtro_cliente.lower() in v.get('nome_cliente', '').lower()]
+    # Aplicar filtros (todos os tipos marcados = sem filtro no servidor)
+    filtro_status_valor = STATUS_FILTRO[filtro_status]
+    tipos_filtro = None if set(filtro_pagamento) == set(TIPOS_PAGAMENTO) else tuple(filtro_pagamento)
+    cliente_filtro = filtro_cliente.strip().lower()
     
-    if filtro_pagamento:
-        vendas_filtradas = [v for v in vendas_filtradas 
-                           if v.get('tipo_pagamento', 'N/A') in filtro_pagamento]
+    # Pilha com o cursor inicial de cada página visitada; filtros novos voltam à primeira
+    assinatura_filtros = (cliente_filtro, tipos_filtro, filtro_status_valor, tamanho_pagina)
+    if st.session_state.get('vendas_filtros_pagina') != assinatura_filtros:
+        st.session_state.vendas_filtros_pagina = assinatura_filtros
+        st.session_state.vendas_cursores = [None]
+    cursores = st.session_state.vendas_cursores
     
-    if filtro_status == "Apenas Pagas":
-        vendas_filtradas = [v for v in vendas_filtradas if v.get('status_recebimento') == 'Pago']
-    elif filtro_status == "Apenas Pendentes":
-        vendas_filtradas = [v for v in vendas_filtradas if v.get('status_recebimento') == 'Pendente']
-    elif filtro_status == "Apenas Consignadas":
-        vendas_filtradas = [v for v in vendas_filtradas if v.get('status_recebimento') == 'Consignado']
-    elif filtro_status == "Apenas Acertadas":
-        vendas_filtradas = [v for v in vendas_filtradas if v.get('status_recebimento') == 'Acertado']
+    vendas_filtradas, proximo_cursor, total_filtrado = get_pagina_vendas(
+        f"{hoje.year}-{hoje.month:02d}-01", tamanho_pagina, cursores[-1],
+        filtro_status_valor, tipos_filtro, cliente_filtro
+    )
+    
+    # A página atual pode ter esvaziado depois de uma alteração
+    if not vendas_filtradas and len(cursores) > 1:
+        st.session_state.vendas_cursores = [None]
+        st.rerun()
     
     if vendas_filtradas:
-        st.markdown(f"**Encontradas: {len(vendas_filtradas)} vendas**")
+        st.markdown(f"**Encontradas: {total_filtrado} vendas** | Página {len(cursores)}")
         
         # Exibir vendas em cards
         for venda in vendas_filtradas:
@@ -459,12 +508,11 @@ if vendas_mes:
                     if status == "Pendente":
                         if st.button(f"✅ Marcar como Pago", key=f"pagar_{venda['id']}", use_container_width=True):
                             try:
-                                db.collection('vendas').document(venda['id']).update({
+                                repos.vendas.atualizar(venda, {
                                     'status_recebimento': 'Pago',
                                     'data_recebimento': datetime.now().isoformat()
                                 })
                                 st.success(f"✅ Venda {numero} marcada como paga!")
-                                st.cache_data.clear()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Erro ao atualizar: {e}")
@@ -480,12 +528,11 @@ if vendas_mes:
                     if status == "Consignado":
                         if st.button(f"❌ Cancelar Consignação", key=f"cancel_{venda['id']}", use_container_width=True):
                             try:
-                                db.collection('vendas').document(venda['id']).update({
+                                repos.vendas.atualizar(venda, {
                                     'status_recebimento': 'Cancelado',
                                     'data_cancelamento': datetime.now().isoformat()
                                 })
                                 st.success(f"❌ Consignação {numero} cancelada!")
-                                st.cache_data.clear()
                                 st.rerun()
                             except Exception as e:
                                 st.error(f"❌ Erro ao cancelar: {e}")
@@ -615,7 +662,7 @@ if vendas_mes:
                                     }
                                     
                                     # Atualizar venda no Firebase
-                                    db.collection('vendas').document(venda['id']).update({
+                                    repos.vendas.atualizar(venda, {
                                         'status_recebimento': 'Acertado',
                                         'acerto_consumo': acerto_data,
                                         'valor_final': float(total_a_receber)  # Valor real a receber
@@ -628,13 +675,29 @@ if vendas_mes:
                                     
                                     # Limpar estado e atualizar
                                     st.session_state[f'show_acerto_{venda["id"]}'] = False
-                                    st.cache_data.clear()
                                     st.rerun()
                                     
                             except Exception as e:
                                 st.error(f"❌ Erro ao finalizar acerto: {e}")
                 
                 st.markdown("---")
+        
+        # Navegação entre páginas
+        col_nav1, col_nav2, col_nav3 = st.columns([1, 2, 1])
+        
+        with col_nav1:
+            if st.button("⬅️ Anterior", disabled=len(cursores) == 1, use_container_width=True):
+                cursores.pop()
+                st.rerun()
+        
+        with col_nav2:
+            primeira = (len(cursores) - 1) * tamanho_pagina + 1
+            st.caption(f"Vendas {primeira}–{primeira + len(vendas_filtradas) - 1} de {total_filtrado}")
+        
+        with col_nav3:
+            if st.button("Próxima ➡️", disabled=proximo_cursor is None, use_container_width=True):
+                cursores.append(proximo_cursor)
+                st.rerun()
     else:
         st.info("🔍 Nenhuma venda encontrada com os filtros aplicados.")
 else:
@@ -644,23 +707,23 @@ else:
 st.markdown("---")
 st.subheader("📈 Estatísticas do Mês")
 
-if vendas_mes:
+if resumo_mes['registros']:
+    estatisticas = get_estatisticas_vendas(f"{hoje.year}-{hoje.month:02d}-01")
     col_stat1, col_stat2, col_stat3, col_stat4 = st.columns(4)
     
     with col_stat1:
-        st.metric("🛒 Total de Vendas", len(vendas_mes))
+        st.metric("🛒 Total de Vendas", estatisticas['total_vendas'])
     
     with col_stat2:
-        st.metric("💰 Faturamento", f"R$ {total_vendas_mes:.2f}")
+        st.metric("💰 Faturamento", f"R$ {estatisticas['faturamento']:.2f}")
     
     with col_stat3:
-        if vendas_mes:
-            ticket_medio = total_vendas_mes / len(vendas_mes)
-            st.metric("🎯 Ticket Médio", f"R$ {ticket_medio:.2f}")
+        if estatisticas['total_vendas']:
+            st.metric("🎯 Ticket Médio", f"R$ {estatisticas['ticket_medio']:.2f}")
     
     with col_stat4:
-        produtos_vendidos = sum([len(v.get('produtos', [])) for v in vendas_mes])
-        st.metric("📦 Produtos Vendidos", produtos_vendidos)
+        # Mantido no rollup do mês
+        st.metric("📦 Produtos Vendidos", resumo_mes['produtos_vendidos'])
 
 # Informações sobre modalidades
 st.markdown("---")
@@ -693,4 +756,7 @@ with st.expander("📚 Entenda as Modalidades de Venda"):
     - Dashboard específico para consignações
     """)
 
-st.markdown("💰 **Sistema de Vendas RST** - Controle completo de vendas, consignações e recebimentos!")
\ No newline at end of file
+st.markdown("💰 **Sistema de Vendas RST** - Controle completo de vendas, consignações e recebimentos!")
+
+# Painel de chamadas ao banco (RST_PAINEL_DEBUG=1 ou ?debug=1)
+painel_debug()
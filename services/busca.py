@@ -0,0 +1,195 @@
+"""
+Índice de busca de fornecedores
+
+Substitui a varredura linear com 'termo in nome.lower()' por um índice
+montado uma vez e compartilhado entre os reruns:
+
+- nomes sem acento e em minúsculas ("Agropecuaria" encontra "Agropecuária");
+- prefixo de palavras do nome por busca binária em uma lista ordenada;
+- trigramas para trechos no meio do nome e pequenos erros de digitação;
+- prefixo e trecho dos dígitos de CNPJ/CPF e telefone.
+
+Os resultados vêm ordenados por relevância e limitados aos k melhores.
+"""
+
+import bisect
+import heapq
+import itertools
+import re
+import unicodedata
+
+# Semelhança mínima para aceitar um nome só por trigramas
+SEMELHANCA_MINIMA = 0.3
+
+# Teto de nomes comparados na busca por nomes parecidos
+MAXIMO_CANDIDATOS = 500
+
+# Mínimo de dígitos para buscar em CNPJ/CPF e telefone
+MINIMO_DIGITOS = 3
+
+
+def normalizar(texto):
+    """Minúsculas, sem acentos e com espaços simples"""
+    texto = unicodedata.normalize('NFKD', str(texto or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.lower().split())
+
+
+def so_digitos(texto):
+    return re.sub(r'\D', '', str(texto or ''))
+
+
+def trigramas(texto):
+    """Trigramas do texto com bordas marcadas por espaço"""
+    texto = f"  {texto} "
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+def trigramas_internos(texto):
+    """Trigramas sem as bordas, para achar o texto no meio de um nome"""
+    return {texto[i:i + 3] for i in range(len(texto) - 2)}
+
+
+class IndiceFornecedores:
+    """
+    Índice em memória, somente leitura depois de montado
+
+    A relevância segue faixas: nome igual ou começando pelo termo, CNPJ/CPF
+    ou telefone começando pelos dígitos, palavra do nome começando pelo
+    termo, trecho no meio do nome ou dos dígitos e, por fim, nomes
+    parecidos (trigramas). Cada faixa só é consultada se as anteriores não
+    completaram os k resultados.
+
+    Args:
+        fornecedores: Dicts com 'id', 'nome' e opcionalmente 'cnpj_cpf' e 'telefone'
+    """
+
+    def __init__(self, fornecedores):
+        self.fornecedores = list(fornecedores)
+        self._nomes = [normalizar(f.get('nome', '')) for f in self.fornecedores]
+        # Listas ordenadas de (chave, nome, posição) para buscas por prefixo
+        self._por_nome = sorted((nome, nome, p) for p, nome in enumerate(self._nomes))
+        self._por_palavra = []
+        self._por_digitos = []
+        self._trigramas = {}          # trigrama -> set(posições), nomes
+        self._trigramas_digitos = {}  # trigrama -> set(posições), CNPJ/CPF e telefone
+        self._trigramas_nome = []
+        self._digitos = []
+
+        for posicao, (fornecedor, nome) in enumerate(zip(self.fornecedores, self._nomes)):
+            for palavra in set(nome.split()):
+                self._por_palavra.append((palavra, nome, posicao))
+            trigramas_nome = trigramas(nome)
+            self._trigramas_nome.append(trigramas_nome)
+            for trigrama in trigramas_nome:
+                self._trigramas.setdefault(trigrama, set()).add(posicao)
+
+            digitos = [so_digitos(fornecedor.get(campo)) for campo in ('cnpj_cpf', 'telefone')]
+            digitos = [d for d in digitos if d]
+            self._digitos.append(digitos)
+            for numero in digitos:
+                self._por_digitos.append((numero, nome, posicao))
+                for i in range(len(numero) - 2):
+                    self._trigramas_digitos.setdefault(numero[i:i + 3], set()).add(posicao)
+
+        self._por_palavra.sort()
+        self._por_digitos.sort()
+
+    def buscar(self, termo, k=10):
+        """
+        Fornecedores mais relevantes para o termo
+
+        Args:
+            termo: Parte do nome, CNPJ/CPF ou telefone (com ou sem pontuação)
+            k: Máximo de resultados
+
+        Returns:
+            list: Até k fornecedores, mais relevantes primeiro
+        """
+        texto = normalizar(termo)
+        if not texto:
+            return self.fornecedores[:k]
+
+        # Dígitos só contam como CNPJ/CPF ou telefone se o termo não tem letras
+        digitos = so_digitos(termo)
+        if len(digitos) < MINIMO_DIGITOS or re.search(r'[a-z]', texto):
+            digitos = ''
+
+        resultado = []
+        vistos = set()
+
+        def incluir(posicoes):
+            for posicao in posicoes:
+                if len(resultado) >= k:
+                    return
+                if posicao not in vistos:
+                    vistos.add(posicao)
+                    resultado.append(posicao)
+
+        incluir(self._com_prefixo(self._por_nome, texto, k))
+        if digitos:
+            incluir(self._com_prefixo(self._por_digitos, digitos, k))
+        if len(resultado) < k and ' ' not in texto:
+            incluir(self._com_prefixo(self._por_palavra, texto, 2 * k + len(resultado)))
+        if len(resultado) < k and len(texto) >= 3:
+            incluir(self._com_trecho(texto, vistos, k - len(resultado)))
+        if len(resultado) < k and digitos:
+            incluir(self._com_trecho_digitos(digitos, vistos, k - len(resultado)))
+        if len(resultado) < k and len(texto) >= 3:
+            incluir(self._parecidos(texto, vistos, k - len(resultado)))
+
+        return [self.fornecedores[p] for p in resultado]
+
+    def _com_prefixo(self, chaves, prefixo, limite):
+        """Até 'limite' posições cujas chaves começam com o prefixo, em ordem"""
+        inicio = bisect.bisect_left(chaves, (prefixo,))
+        posicoes = []
+        for chave, _, posicao in chaves[inicio:inicio + limite]:
+            if not chave.startswith(prefixo):
+                break
+            posicoes.append(posicao)
+        return posicoes
+
+    def _com_trecho(self, texto, ignorar, limite):
+        """Nomes que contêm o texto, partindo do trigrama mais raro"""
+        conjuntos = sorted(
+            (self._trigramas.get(t, set()) for t in trigramas_internos(texto)),
+            key=len
+        )
+        if not conjuntos or not conjuntos[0]:
+            return []
+        candidatos = set.intersection(*conjuntos) - ignorar
+        achados = [p for p in candidatos if texto in self._nomes[p]]
+        return heapq.nsmallest(limite, achados, key=lambda p: self._nomes[p])
+
+    def _com_trecho_digitos(self, digitos, ignorar, limite):
+        conjuntos = sorted(
+            (self._trigramas_digitos.get(digitos[i:i + 3], set()) for i in range(len(digitos) - 2)),
+            key=len
+        )
+        if not conjuntos[0]:
+            return []
+        candidatos = set.intersection(*conjuntos) - ignorar
+        achados = [p for p in candidatos if any(digitos in numero for numero in self._digitos[p])]
+        return heapq.nsmallest(limite, achados, key=lambda p: self._nomes[p])
+
+    def _parecidos(self, texto, ignorar, limite):
+        """Nomes com semelhança de trigramas (Jaccard) acima do mínimo"""
+        trigramas_termo = trigramas(texto)
+        # Candidatos vêm dos trigramas mais raros do termo, até um teto,
+        # para o custo não depender de trigramas comuns como ' da'
+        candidatos = set()
+        for lista in sorted((self._trigramas.get(t, set()) for t in trigramas_termo), key=len):
+            candidatos.update(itertools.islice(lista, MAXIMO_CANDIDATOS - len(candidatos)))
+            if len(candidatos) >= MAXIMO_CANDIDATOS:
+                break
+        candidatos -= ignorar
+
+        semelhancas = {}
+        for posicao in candidatos:
+            trigramas_nome = self._trigramas_nome[posicao]
+            comuns = len(trigramas_termo & trigramas_nome)
+            semelhanca = comuns / (len(trigramas_termo) + len(trigramas_nome) - comuns)
+            if semelhanca >= SEMELHANCA_MINIMA:
+                semelhancas[posicao] = semelhanca
+        return heapq.nsmallest(limite, semelhancas, key=lambda p: (-semelhancas[p], self._nomes[p]))
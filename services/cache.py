@@ -0,0 +1,138 @@
+"""
+Cache com invalidação por tags
+
+Substitui o st.cache_data.clear() global: cada entrada do cache recebe tags
+por coleção e mês (ex.: 'vendas:2024-08'), e uma escrita invalida apenas as
+entradas que ela afeta. Salvar uma venda não derruba o cache de custos nem
+o de fornecedores.
+
+Convenção das tags:
+    'colecao:YYYY-MM'  dados de um mês específico
+    'colecao'          dados que atravessam meses (ex.: lista de fornecedores)
+"""
+
+import copy
+import functools
+import threading
+import time
+
+import streamlit as st
+
+from services.particoes import get_cache_particoes
+
+
+def tag(colecao, mes=None):
+    """Monta a tag de uma coleção, opcionalmente restrita a um mês (YYYY-MM)"""
+    return f"{colecao}:{mes}" if mes else colecao
+
+
+class CacheComTags:
+    """Cache em memória com expiração (TTL) e índice de tags"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entradas = {}  # chave -> (expira_em, valor, tags)
+        self._por_tag = {}   # tag -> set(chaves)
+        self._geracao = 0    # incrementada a cada invalidação
+
+    def obter(self, chave, carregar, ttl, tags=(), copiar=True):
+        """
+        Retorna o valor em cache ou chama carregar() e guarda o resultado
+
+        Args:
+            chave: Chave hashable da entrada
+            carregar: Função sem argumentos que produz o valor
+            ttl: Validade em segundos
+            tags: Tags usadas para invalidação
+            copiar: False para objetos somente leitura (ex.: índices), que
+                são devolvidos sem cópia
+
+        Returns:
+            Cópia do valor (alterações da página não afetam o cache)
+        """
+        entregar = copy.deepcopy if copiar else (lambda valor: valor)
+        agora = time.monotonic()
+        with self._lock:
+            entrada = self._entradas.get(chave)
+            if entrada and entrada[0] > agora:
+                return entregar(entrada[1])
+            geracao = self._geracao
+
+        valor = carregar()
+
+        with self._lock:
+            # Uma escrita durante a carga pode ter tornado o valor obsoleto
+            if geracao != self._geracao:
+                return entregar(valor)
+            self._remover(chave)
+            self._entradas[chave] = (agora + ttl, valor, tuple(tags))
+            for t in tags:
+                self._por_tag.setdefault(t, set()).add(chave)
+        return entregar(valor)
+
+    def invalidar(self, colecao, mes=None):
+        """
+        Remove as entradas afetadas por uma escrita
+
+        Com mês: entradas daquele mês e entradas da coleção inteira.
+        Sem mês: todas as entradas da coleção, de qualquer mês.
+        """
+        with self._lock:
+            self._geracao += 1
+            if mes:
+                alvos = {tag(colecao, mes), tag(colecao)}
+            else:
+                prefixo = f"{colecao}:"
+                alvos = {t for t in self._por_tag if t == colecao or t.startswith(prefixo)}
+
+            for t in alvos:
+                for chave in list(self._por_tag.get(t, ())):
+                    self._remover(chave)
+
+    def limpar(self):
+        with self._lock:
+            self._entradas.clear()
+            self._por_tag.clear()
+
+    def _remover(self, chave):
+        entrada = self._entradas.pop(chave, None)
+        if not entrada:
+            return
+        for t in entrada[2]:
+            chaves = self._por_tag.get(t)
+            if chaves:
+                chaves.discard(chave)
+                if not chaves:
+                    del self._por_tag[t]
+
+
+@st.cache_resource
+def get_cache():
+    """Cache compartilhado por todas as sessões do processo"""
+    return CacheComTags()
+
+
+def cache_com_tags(ttl, tags, copiar=True):
+    """
+    Decorador no estilo st.cache_data, com tags para invalidação seletiva
+
+    Args:
+        ttl: Validade em segundos
+        tags: Lista de tags ou função que recebe os mesmos argumentos da
+            função decorada e devolve a lista (avaliada a cada chamada)
+        copiar: False para resultados que a página não altera
+    """
+    def decorador(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            chave = (func.__code__.co_filename, func.__qualname__, args, tuple(sorted(kwargs.items())))
+            tags_entrada = tags(*args, **kwargs) if callable(tags) else tags
+            return get_cache().obter(chave, lambda: func(*args, **kwargs), ttl, tags_entrada, copiar)
+        return wrapper
+    return decorador
+
+
+def invalidar(colecao, mes=None):
+    """Invalida o cache compartilhado e as partições em disco após uma escrita em 'colecao'"""
+    get_cache().invalidar(colecao, mes)
+    get_cache_particoes().invalidar(colecao, mes)
@@ -0,0 +1,57 @@
+"""
+Classificação contábil dos custos
+
+Categorias por tipo de custo e unidades de medida, compartilhadas pelo
+formulário da página de Custos e pelas importações em lote, para que as
+duas entradas sigam as mesmas regras.
+"""
+
+# Definir categorias contábeis
+CUSTOS_FIXOS = {
+    'salarios': 'Salários',
+    'internet': 'Internet',
+    'telefone': 'Telefone',
+    'manutencao_geral': 'Manutenção em Geral',
+    'sistema': 'Sistema',
+    'imposto': 'Imposto',
+    'consultoria': 'Consultoria',
+    'marketing': 'Marketing'
+}
+
+CUSTOS_VARIAVEIS = {
+    'sementes': 'Sementes',
+    'fertilizantes': 'Fertilizantes',
+    'espuma_fenolica': 'Espuma Fenólica',
+    'produtos_limpeza': 'Produtos de Limpeza',
+    'equipamentos_descartaveis': 'Equipamentos Descartáveis',
+    'frete': 'Frete',
+    'nutrientes': 'Nutrientes',
+    'embalagens': 'Embalagens',
+    'defensivos': 'Defensivos',
+    'aluguel_maquina': 'Aluguel de Máquina',
+    'diesel_trator': 'Diesel para Trator',
+    'mao_obra_temporaria': 'Mão de Obra Temporária',
+    'outros_variaveis': 'Outros Variáveis'
+}
+
+INVESTIMENTOS = {
+    'equipamentos': 'Equipamentos',
+    'tecnologia': 'Tecnologia',
+    'veiculos': 'Veículos',
+    'bens_moveis': 'Bens Móveis',
+    'irrigacao': 'Sistema de Irrigação',
+    'construcao': 'Construção',
+    'melhorias_terreno': 'Melhorias no Terreno',
+    'expansao_area': 'Expansão de Área',
+    'infraestrutura': 'Infraestrutura',
+    'outros_investimentos': 'Outros Investimentos'
+}
+
+# tipo_custo -> categorias do tipo
+CATEGORIAS_POR_TIPO = {
+    'Custos Fixos': CUSTOS_FIXOS,
+    'Custos Variáveis': CUSTOS_VARIAVEIS,
+    'Investimentos': INVESTIMENTOS,
+}
+
+UNIDADES_MEDIDA = ["UN", "KG", "L", "M", "M²", "M³", "T", "SC", "CX", "PC", "HR", "DIA"]
@@ -0,0 +1,242 @@
+"""
+Gerador de dados sintéticos para benchmarks e testes de volume
+
+Documentos no mesmo formato dos formulários (custos_contabeis, vendas com
+produtos e acerto_consumo, fornecedores), gerados a partir de uma semente:
+a mesma semente e a mesma escala dão sempre os mesmos dados, então duas
+execuções do benchmark medem exatamente o mesmo volume.
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from services.categorias import CATEGORIAS_POR_TIPO
+from services.repository import COLECAO_CUSTOS, COLECAO_VENDAS, MAX_OPERACOES_LOTE
+from services.rollups import agrupar_incrementos, incrementos_custo, incrementos_venda
+
+TIPOS_FORNECEDOR = ["Insumos Agrícolas", "Equipamentos", "Serviços", "Transporte", "Consultoria", "Outros"]
+TIPOS_PAGAMENTO = ["Dinheiro", "PIX", "Cartão", "Boleto", "Prazo"]
+PRODUTOS = [
+    ('Alface Crespa', 'UN', 3.5), ('Rúcula', 'UN', 4.0), ('Tomate Cereja', 'KG', 18.0),
+    ('Couve', 'UN', 3.0), ('Cheiro-verde', 'UN', 2.5), ('Agrião', 'UN', 4.5),
+    ('Espinafre', 'UN', 5.0), ('Morango', 'CX', 12.0), ('Pepino', 'KG', 6.0),
+]
+NOMES = ['Ana', 'Bruno', 'Carla', 'Diego', 'Elisa', 'Fábio', 'Gabriela', 'Hugo', 'Íris', 'João']
+SOBRENOMES = ['Silva', 'Souza', 'Oliveira', 'Pereira', 'Costa', 'Rodrigues', 'Almeida', 'Lima']
+
+# Lotes de escrita ao popular (abaixo do limite do Firestore, com folga para os rollups)
+LOTE_POPULAR = MAX_OPERACOES_LOTE - 50
+
+# Carimbo mais recente aceito: documentos recém-gravados cairiam na margem
+# da sincronização incremental e seriam relidos em todo rerun
+ATRASO_CARIMBO = timedelta(hours=1)
+
+
+class GeradorDados:
+    """Documentos sintéticos reproduzíveis a partir de uma semente"""
+
+    def __init__(self, semente=42):
+        self.rng = random.Random(semente)
+        self._uuid = random.Random(semente + 1)
+
+    def _id(self):
+        return str(uuid.UUID(int=self._uuid.getrandbits(128)))[:8]
+
+    def _data(self, mes):
+        return f"{mes}-{self.rng.randint(1, 28):02d}"
+
+    def fornecedores(self, quantidade):
+        """Fornecedores com nome e CNPJ únicos; ~10% inativos"""
+        return [
+            {
+                'nome': f"{self.rng.choice(['Agro', 'Casa', 'Distribuidora', 'Sítio'])} "
+                        f"{self.rng.choice(SOBRENOMES)} {i:04d}",
+                'cnpj_cpf': f"{10000000 + i:08d}0001{i % 100:02d}",
+                'telefone': f"(11) 9{self.rng.randint(1000, 9999)}-{self.rng.randint(1000, 9999)}",
+                'email': f"contato{i}@fornecedor.com.br",
+                'endereco': '',
+                'tipo_fornecedor': self.rng.choice(TIPOS_FORNECEDOR),
+                'observacoes': '',
+                'ativo': self.rng.random() > 0.1,
+                'data_cadastro': datetime(2024, 1, 1).isoformat(),
+                'app_version': 'RST_v2.3'
+            }
+            for i in range(quantidade)
+        ]
+
+    def custos(self, quantidade, mes, fornecedores):
+        """
+        Custos de um mês (YYYY-MM) com tipos e categorias reais
+
+        Args:
+            fornecedores: Fornecedores já gravados (com 'id' e 'nome')
+        """
+        tipos = list(CATEGORIAS_POR_TIPO)
+        custos = []
+        for _ in range(quantidade):
+            tipo = self.rng.choices(tipos, weights=[2, 7, 1])[0]
+            categoria = self.rng.choice(list(CATEGORIAS_POR_TIPO[tipo]))
+            fornecedor = self.rng.choice(fornecedores)
+            quantidade_item = float(self.rng.randint(1, 50))
+            valor_unitario = round(self.rng.uniform(1, 300), 2)
+            valor = round(quantidade_item * valor_unitario, 2)
+            custo = {
+                'data': self._data(mes),
+                'tipo_custo': tipo,
+                'categoria': categoria,
+                'categoria_nome': CATEGORIAS_POR_TIPO[tipo][categoria],
+                'descricao_item': f"{CATEGORIAS_POR_TIPO[tipo][categoria]} lote {self.rng.randint(1, 999)}",
+                'quantidade': quantidade_item,
+                'unidade_medida': self.rng.choice(['UN', 'KG', 'L', 'CX', 'SC']),
+                'valor_unitario': valor_unitario,
+                'valor': valor,
+                'fornecedor': fornecedor['nome'],
+                'fornecedor_id': fornecedor['id'],
+                'numero_nf': str(self.rng.randint(1000, 999999)),
+                'imagem_nf_url': '',
+                'tem_nota_fiscal': self.rng.random() < 0.6,
+                'observacoes': '',
+                'timestamp': datetime.now().isoformat(),
+                'app_version': 'RST_v2.3'
+            }
+            if tipo == 'Investimentos':
+                custo.update({'vida_util_meses': 24, 'depreciacao_mensal': valor / 24, 'roi_calculado': False})
+            custos.append(custo)
+        return custos
+
+    def vendas(self, quantidade, mes, sequencia_inicial=1):
+        """
+        Vendas de um mês com 1-6 produtos; consignações parte acertadas
+
+        Os status seguem a regra do formulário: à vista é Pago, prazo/boleto
+        Pendente e consignação Consignado (ou Acertado, com acerto_consumo).
+        """
+        vendas = []
+        for i in range(quantidade):
+            data = self._data(mes)
+            produtos = []
+            for nome, unidade, preco in self.rng.sample(PRODUTOS, self.rng.randint(1, 6)):
+                quantidade_produto = float(self.rng.randint(1, 30))
+                valor_unitario = round(preco * self.rng.uniform(0.8, 1.2), 2)
+                produtos.append({
+                    'id': self._id(), 'nome': nome, 'quantidade': quantidade_produto, 'unidade': unidade,
+                    'valor_unitario': valor_unitario, 'valor_total': round(quantidade_produto * valor_unitario, 2),
+                })
+            total = round(sum(p['valor_total'] for p in produtos), 2)
+            consignacao = self.rng.random() < 0.25
+            pagamento = self.rng.choice(TIPOS_PAGAMENTO)
+            if consignacao:
+                status = 'Consignado'
+            elif pagamento in ('Dinheiro', 'PIX', 'Cartão'):
+                status = 'Pago'
+            else:
+                status = 'Pendente'
+            venda = {
+                'numero_venda': f"V{data.replace('-', '')}-{sequencia_inicial + i:04d}",
+                'data_venda': data,
+                'nome_cliente': f"{self.rng.choice(NOMES)} {self.rng.choice(SOBRENOMES)}",
+                'telefone_cliente': '',
+                'modalidade_venda': 'Consignação' if consignacao else 'Venda Direta',
+                'tipo_pagamento': pagamento,
+                'data_vencimento': data if pagamento == 'Prazo' else '',
+                'status_recebimento': status,
+                'produtos': produtos,
+                'valor_total': total,
+                'observacoes': '',
+                'timestamp': datetime.now().isoformat(),
+                'app_version': 'RST_v2.4'
+            }
+            if consignacao and self.rng.random() < 0.5:
+                venda.update(self._acerto(produtos, total))
+            vendas.append(venda)
+        return vendas
+
+    def _acerto(self, produtos, total):
+        """Campos de uma consignação acertada (mesmo formato da página de Vendas)"""
+        produtos_acerto = []
+        for produto in produtos:
+            consumida = float(self.rng.randint(0, int(produto['quantidade'])))
+            perdida = float(self.rng.randint(0, int(produto['quantidade'] - consumida)))
+            produtos_acerto.append({
+                'nome': produto['nome'],
+                'quantidade_original': produto['quantidade'],
+                'unidade': produto['unidade'],
+                'valor_unitario': produto['valor_unitario'],
+                'quantidade_consumida': consumida,
+                'quantidade_perdida': perdida,
+                'quantidade_devolvida': produto['quantidade'] - consumida - perdida,
+                'valor_a_receber': consumida * produto['valor_unitario'],
+                'valor_perda': perdida * produto['valor_unitario'],
+            })
+        a_receber = sum(p['valor_a_receber'] for p in produtos_acerto)
+        perda = sum(p['valor_perda'] for p in produtos_acerto)
+        return {
+            'status_recebimento': 'Acertado',
+            'valor_final': a_receber,
+            'acerto_consumo': {
+                'data_acerto': datetime.now().isoformat(),
+                'produtos_acerto': produtos_acerto,
+                'valor_original': total,
+                'valor_a_receber': a_receber,
+                'valor_perda': perda,
+                'eficiencia_percentual': a_receber / total * 100 if total else 0.0,
+                'observacoes_acerto': '',
+                'acertado_por': 'Sistema RST'
+            },
+        }
+
+
+def carimbar_na_data(dados, campo_data, limite):
+    """Como repository.carimbar, mas com a data do próprio documento (no máximo 'limite')"""
+    dados = dict(dados)
+    dados['ultima_atualizacao'] = min(f"{dados[campo_data]}T12:00:00+00:00", limite)
+    return dados
+
+
+def gravar(backend, colecao, campo_data, documentos, incrementos):
+    """Grava documentos e rollups em lotes, como os repositórios fazem"""
+    limite = (datetime.now(timezone.utc) - ATRASO_CARIMBO).isoformat()
+    for inicio in range(0, len(documentos), LOTE_POPULAR):
+        lote = documentos[inicio:inicio + LOTE_POPULAR]
+        backend.executar_lote(
+            [('adicionar', colecao, carimbar_na_data(d, campo_data, limite)) for d in lote]
+            + agrupar_incrementos([incrementos(d) for d in lote])
+        )
+
+
+def popular(repos, meses, custos_por_mes, vendas_por_mes, fornecedores, semente=42):
+    """
+    Grava dados sintéticos no backend dos repositórios (rollups incluídos)
+
+    O carimbo 'ultima_atualizacao' fica na data de cada documento, como se
+    tivessem sido lançados ao longo do mês.
+
+    Args:
+        repos: Repositorios (services.repository)
+        meses: Meses YYYY-MM a popular
+        custos_por_mes: Custos por mês
+        vendas_por_mes: Vendas por mês
+        fornecedores: Fornecedores cadastrados
+        semente: Semente do gerador
+
+    Returns:
+        dict: Quantidade gravada por coleção
+    """
+    gerador = GeradorDados(semente)
+    cadastrados = []
+    for fornecedor in gerador.fornecedores(fornecedores):
+        fornecedor['id'] = repos.fornecedores.adicionar(fornecedor)
+        cadastrados.append(fornecedor)
+
+    total_custos = total_vendas = 0
+    for mes in meses:
+        custos = gerador.custos(custos_por_mes, mes, cadastrados)
+        gravar(repos.backend, COLECAO_CUSTOS, 'data', custos, incrementos_custo)
+        total_custos += len(custos)
+
+        vendas = gerador.vendas(vendas_por_mes, mes, sequencia_inicial=total_vendas + 1)
+        gravar(repos.backend, COLECAO_VENDAS, 'data_venda', vendas, incrementos_venda)
+        total_vendas += len(vendas)
+
+    return {'fornecedores': len(cadastrados), 'custos_contabeis': total_custos, 'vendas': total_vendas}
@@ -0,0 +1,220 @@
+"""
+Exportação do histórico completo para CSV ou Parquet
+
+Percorre a coleção inteira com cursores (backend.pagina), uma página de
+cada vez, e grava cada página no arquivo assim que chega: a memória usada
+é a de uma página, não a do histórico. O arquivo é escrito numa pasta
+temporária e depois servido para download.
+
+Cada coleção tem colunas fixas (COLUNAS), o que permite escrever o CSV e o
+Parquet em partes com o mesmo cabeçalho/schema. Nas vendas, cada produto
+vira uma linha, com os dados da venda repetidos e, nas consignações
+acertadas, as quantidades consumidas/perdidas/devolvidas do produto.
+"""
+
+import csv
+import glob
+import os
+import tempfile
+import time
+from datetime import datetime
+
+# Documentos por página lida do banco
+TAMANHO_PAGINA = 500
+
+# Arquivos de exportação mais antigos que isso são apagados
+VALIDADE_ARQUIVOS = 3600  # segundos
+
+PREFIXO_ARQUIVO = 'rst_export_'
+
+# coleção -> campo de ordenação (documentos sem o campo não entram no Firestore)
+ORDEM = {
+    'custos_contabeis': 'data',
+    'vendas': 'data_venda',
+    'fornecedores': 'nome',
+}
+
+# coleção -> [(coluna, tipo)], tipo em 'texto', 'numero', 'logico'
+COLUNAS = {
+    'custos_contabeis': [
+        ('id', 'texto'), ('data', 'texto'), ('tipo_custo', 'texto'), ('categoria', 'texto'),
+        ('categoria_nome', 'texto'), ('descricao_item', 'texto'), ('quantidade', 'numero'),
+        ('unidade_medida', 'texto'), ('valor_unitario', 'numero'), ('valor', 'numero'),
+        ('fornecedor', 'texto'), ('fornecedor_id', 'texto'), ('numero_nf', 'texto'),
+        ('chave_nfe', 'texto'), ('tem_nota_fiscal', 'logico'), ('imagem_nf_url', 'texto'),
+        ('observacoes', 'texto'), ('vida_util_meses', 'numero'), ('depreciacao_mensal', 'numero'),
+        ('lote_producao', 'texto'), ('timestamp', 'texto'), ('ultima_atualizacao', 'texto'),
+    ],
+    'vendas': [
+        ('id', 'texto'), ('numero_venda', 'texto'), ('data_venda', 'texto'), ('nome_cliente', 'texto'),
+        ('telefone_cliente', 'texto'), ('modalidade_venda', 'texto'), ('tipo_pagamento', 'texto'),
+        ('data_vencimento', 'texto'), ('status_recebimento', 'texto'), ('valor_total', 'numero'),
+        ('valor_final', 'numero'), ('data_recebimento', 'texto'), ('data_acerto', 'texto'),
+        ('eficiencia_percentual', 'numero'), ('observacoes', 'texto'), ('timestamp', 'texto'),
+        ('produto_id', 'texto'), ('produto_nome', 'texto'), ('produto_quantidade', 'numero'),
+        ('produto_unidade', 'texto'), ('produto_valor_unitario', 'numero'),
+        ('produto_valor_total', 'numero'), ('produto_quantidade_consumida', 'numero'),
+        ('produto_quantidade_perdida', 'numero'), ('produto_quantidade_devolvida', 'numero'),
+        ('produto_valor_a_receber', 'numero'), ('produto_valor_perda', 'numero'),
+    ],
+    'fornecedores': [
+        ('id', 'texto'), ('nome', 'texto'), ('cnpj_cpf', 'texto'), ('telefone', 'texto'),
+        ('email', 'texto'), ('endereco', 'texto'), ('tipo_fornecedor', 'texto'),
+        ('observacoes', 'texto'), ('ativo', 'logico'), ('data_cadastro', 'texto'),
+        ('ultima_atualizacao', 'texto'),
+    ],
+}
+
+
+def paginas(backend, colecao, tamanho=TAMANHO_PAGINA):
+    """
+    Todos os documentos da coleção, página a página, em ordem crescente
+
+    Yields:
+        list: Documentos de uma página (com 'id')
+    """
+    ordem = ORDEM[colecao]
+    apos = None
+    while True:
+        pagina = backend.pagina(colecao, [], ordem, 'ASCENDING', tamanho, apos=apos)
+        if pagina:
+            yield pagina
+        if len(pagina) < tamanho:
+            return
+        apos = (pagina[-1].get(ordem, ''), pagina[-1]['id'])
+
+
+def linhas_vendas(venda):
+    """Uma linha por produto da venda (uma linha só se não há produtos)"""
+    acerto = venda.get('acerto_consumo') or {}
+    base = {
+        **venda,
+        'data_acerto': acerto.get('data_acerto'),
+        'eficiencia_percentual': acerto.get('eficiencia_percentual'),
+    }
+    acertos = {p.get('nome'): p for p in acerto.get('produtos_acerto', [])}
+    produtos = venda.get('produtos') or [{}]
+    for produto in produtos:
+        acertado = acertos.get(produto.get('nome'), {})
+        yield {
+            **base,
+            'produto_id': produto.get('id'),
+            'produto_nome': produto.get('nome'),
+            'produto_quantidade': produto.get('quantidade'),
+            'produto_unidade': produto.get('unidade'),
+            'produto_valor_unitario': produto.get('valor_unitario'),
+            'produto_valor_total': produto.get('valor_total'),
+            'produto_quantidade_consumida': acertado.get('quantidade_consumida'),
+            'produto_quantidade_perdida': acertado.get('quantidade_perdida'),
+            'produto_quantidade_devolvida': acertado.get('quantidade_devolvida'),
+            'produto_valor_a_receber': acertado.get('valor_a_receber'),
+            'produto_valor_perda': acertado.get('valor_perda'),
+        }
+
+
+def linhas(colecao, documentos):
+    """Linhas do arquivo para uma página de documentos, com as colunas da coleção"""
+    colunas = COLUNAS[colecao]
+    for documento in documentos:
+        registros = linhas_vendas(documento) if colecao == 'vendas' else [documento]
+        for registro in registros:
+            yield {coluna: converter(registro.get(coluna), tipo) for coluna, tipo in colunas}
+
+
+def converter(valor, tipo):
+    """Valor no tipo da coluna; ausente ou inválido vira None"""
+    if valor is None or valor == '':
+        return None
+    try:
+        if tipo == 'numero':
+            return float(valor)
+        if tipo == 'logico':
+            return bool(valor)
+    except (TypeError, ValueError):
+        return None
+    return str(valor)
+
+
+def limpar_antigos(pasta=None, validade=VALIDADE_ARQUIVOS):
+    """Apaga exportações esquecidas na pasta temporária"""
+    limite = time.time() - validade
+    for caminho in glob.glob(os.path.join(pasta or tempfile.gettempdir(), f"{PREFIXO_ARQUIVO}*")):
+        try:
+            if os.path.getmtime(caminho) < limite:
+                os.remove(caminho)
+        except OSError:
+            pass
+
+
+def exportar(backend, colecao, formato='csv', tamanho_pagina=TAMANHO_PAGINA, progresso=None, pasta=None):
+    """
+    Exporta a coleção inteira para um arquivo temporário
+
+    Args:
+        backend: Backend com pagina() (services.repository)
+        colecao: 'custos_contabeis', 'vendas' ou 'fornecedores'
+        formato: 'csv' ou 'parquet'
+        tamanho_pagina: Documentos lidos por vez
+        progresso: Função chamada com (documentos lidos, linhas escritas) a cada página
+        pasta: Pasta do arquivo; padrão é a pasta temporária do sistema
+
+    Returns:
+        tuple: (caminho do arquivo, linhas escritas)
+    """
+    if colecao not in COLUNAS:
+        raise ValueError(f"Coleção não exportável: {colecao}")
+    if formato not in ('csv', 'parquet'):
+        raise ValueError(f"Formato não suportado: {formato}")
+    limpar_antigos(pasta)
+
+    descritor, caminho = tempfile.mkstemp(
+        prefix=f"{PREFIXO_ARQUIVO}{colecao}_{datetime.now().strftime('%Y%m%d_%H%M%S')}_",
+        suffix=f".{formato}", dir=pasta
+    )
+    os.close(descritor)
+    escrever = _exportar_parquet if formato == 'parquet' else _exportar_csv
+    try:
+        total = escrever(caminho, colecao, paginas(backend, colecao, tamanho_pagina), progresso)
+    except Exception:
+        os.remove(caminho)
+        raise
+    return caminho, total
+
+
+def _exportar_csv(caminho, colecao, paginas_documentos, progresso):
+    colunas = [coluna for coluna, _ in COLUNAS[colecao]]
+    lidos = escritas = 0
+    # utf-8-sig para o Excel reconhecer os acentos
+    with open(caminho, 'w', newline='', encoding='utf-8-sig') as arquivo:
+        escritor = csv.DictWriter(arquivo, fieldnames=colunas)
+        escritor.writeheader()
+        for documentos in paginas_documentos:
+            lote = list(linhas(colecao, documentos))
+            escritor.writerows(lote)
+            lidos += len(documentos)
+            escritas += len(lote)
+            if progresso:
+                progresso(lidos, escritas)
+    return escritas
+
+
+def _exportar_parquet(caminho, colecao, paginas_documentos, progresso):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ValueError("Exportação em Parquet requer o pacote pyarrow (pip install pyarrow)")
+
+    tipos = {'texto': pa.string(), 'numero': pa.float64(), 'logico': pa.bool_()}
+    schema = pa.schema([(coluna, tipos[tipo]) for coluna, tipo in COLUNAS[colecao]])
+    lidos = escritas = 0
+    # Um row group por página: o arquivo nunca é montado inteiro na memória
+    with pq.ParquetWriter(caminho, schema) as escritor:
+        for documentos in paginas_documentos:
+            lote = list(linhas(colecao, documentos))
+            escritor.write_table(pa.Table.from_pylist(lote, schema=schema))
+            lidos += len(documentos)
+            escritas += len(lote)
+            if progresso:
+                progresso(lidos, escritas)
+    return escritas
@@ -0,0 +1,684 @@
+"""
+Firestore e Storage falsos, em memória, para testes e benchmarks
+
+Implementam o subconjunto da API do SDK usado pelo app (FirestoreBackend e
+config/firebase_config.py): collection, where, select, order_by, limit,
+start_after, stream, count/sum/avg, on_snapshot, add, document().get/set/
+update/delete, batches e transações. Com RST_FIREBASE_FAKE=1 o
+init_firebase() devolve o FirestoreFalso e o get_bucket() o BucketFalso,
+então as páginas rodam sem credenciais nem rede.
+
+As regras seguem o Firestore onde o app depende delas:
+
+- filtros e ordenação ignoram documentos sem o campo;
+- sem order_by, a ordem é pelo campo da desigualdade e depois pelo id;
+- lotes e transações são atômicos; 'create' falha com AlreadyExists e
+  'update' de documento inexistente com NotFound;
+- Increment, SERVER_TIMESTAMP e DELETE_FIELD são aplicados na escrita;
+- transações funcionam com o firestore.transactional do SDK (uma por vez,
+  como os locks pessimistas do servidor).
+
+Os listeners são chamados na própria thread que escreveu, logo após a
+escrita, com as mudanças (ADDED/MODIFIED/REMOVED) da consulta.
+"""
+
+import copy
+import enum
+import threading
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+from google.api_core.exceptions import AlreadyExists, NotFound
+from google.cloud.firestore_v1 import transforms
+
+ID_DOCUMENTO = '__name__'
+
+# Ordem entre tipos diferentes, como no Firestore
+_ORDEM_TIPOS = [
+    (type(None), 0), (bool, 1), (int, 2), (float, 2), (datetime, 3),
+    (str, 4), (bytes, 5), (list, 8), (dict, 9),
+]
+
+
+def _chave(valor):
+    for tipo, ordem in _ORDEM_TIPOS:
+        if isinstance(valor, tipo):
+            return (ordem, valor)
+    return (10, str(valor))
+
+
+def _ler_campo(dados, caminho):
+    """Valor do campo (caminho com pontos); KeyError se não existe"""
+    valor = dados
+    for parte in caminho.split('.'):
+        if not isinstance(valor, dict) or parte not in valor:
+            raise KeyError(caminho)
+        valor = valor[parte]
+    return valor
+
+
+def _atende(valor, operador, esperado):
+    if operador == '==':
+        return valor == esperado
+    if operador == '!=':
+        return valor is not None and valor != esperado
+    if operador == 'in':
+        return valor in esperado
+    if operador == 'not-in':
+        return valor is not None and valor not in esperado
+    if operador == 'array-contains':
+        return isinstance(valor, list) and esperado in valor
+    if operador == 'array-contains-any':
+        return isinstance(valor, list) and any(v in valor for v in esperado)
+    # Desigualdades só comparam valores do mesmo tipo
+    a, b = _chave(valor), _chave(esperado)
+    if a[0] != b[0]:
+        return False
+    return {'<': a < b, '<=': a <= b, '>': a > b, '>=': a >= b}[operador]
+
+
+def _resolver(valor, atual):
+    """Aplica os sentinelas do SDK ao valor escrito"""
+    if isinstance(valor, transforms.Increment):
+        base = atual if isinstance(atual, (int, float)) and not isinstance(atual, bool) else 0
+        return base + valor.value
+    if valor is transforms.SERVER_TIMESTAMP:
+        return datetime.now(timezone.utc)
+    return copy.deepcopy(valor)
+
+
+def _mesclar(destino, dados, merge):
+    """Grava 'dados' em 'destino' (merge=True mescla mapas em vez de substituir)"""
+    for campo, valor in dados.items():
+        if valor is transforms.DELETE_FIELD:
+            destino.pop(campo, None)
+        elif merge and isinstance(valor, dict) and isinstance(destino.get(campo), dict):
+            _mesclar(destino[campo], valor, merge)
+        elif isinstance(valor, dict):
+            destino[campo] = {}
+            _mesclar(destino[campo], valor, merge)
+        else:
+            destino[campo] = _resolver(valor, destino.get(campo))
+
+
+def _atualizar(destino, dados):
+    """update(): chaves com pontos são caminhos de campos aninhados"""
+    for caminho, valor in dados.items():
+        partes = caminho.split('.')
+        alvo = destino
+        for parte in partes[:-1]:
+            if not isinstance(alvo.get(parte), dict):
+                alvo[parte] = {}
+            alvo = alvo[parte]
+        if valor is transforms.DELETE_FIELD:
+            alvo.pop(partes[-1], None)
+        else:
+            alvo[partes[-1]] = _resolver(valor, alvo.get(partes[-1]))
+
+
+class SnapshotFalso:
+    """DocumentSnapshot: id, exists, to_dict() e get(campo)"""
+
+    def __init__(self, referencia, dados):
+        self.reference = referencia
+        self.id = referencia.id
+        self._dados = dados
+        self.exists = dados is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._dados) if self.exists else None
+
+    def get(self, campo):
+        return copy.deepcopy(_ler_campo(self._dados or {}, campo))
+
+
+class ReferenciaFalsa:
+    """DocumentReference"""
+
+    def __init__(self, cliente, colecao, doc_id):
+        self._cliente = cliente
+        self.colecao = colecao
+        self.id = doc_id
+        self.path = f"{colecao}/{doc_id}"
+
+    def get(self, transaction=None):
+        return self._cliente._ler(self)
+
+    def set(self, dados, merge=False):
+        self._cliente._escrever([('set', self, dados, merge)])
+
+    def create(self, dados):
+        self._cliente._escrever([('create', self, dados, False)])
+
+    def update(self, dados):
+        self._cliente._escrever([('update', self, dados, False)])
+
+    def delete(self):
+        self._cliente._escrever([('delete', self, None, False)])
+
+
+class ResultadoAgregacao:
+    def __init__(self, alias, value):
+        self.alias = alias
+        self.value = value
+
+
+class AgregacaoFalsa:
+    """AggregationQuery: count/sum/avg encadeados e get()"""
+
+    def __init__(self, consulta):
+        self._consulta = consulta
+        self._agregacoes = []
+
+    def count(self, alias=None):
+        self._agregacoes.append(('count', None, alias or 'field_1'))
+        return self
+
+    def sum(self, campo, alias=None):
+        self._agregacoes.append(('sum', campo, alias or 'field_1'))
+        return self
+
+    def avg(self, campo, alias=None):
+        self._agregacoes.append(('avg', campo, alias or 'field_1'))
+        return self
+
+    def get(self, transaction=None):
+        cliente = self._consulta._cliente
+        with cliente._lock:
+            documentos = self._consulta._executar(contar=False)
+            # Agregações custam uma leitura a cada 1000 documentos contados
+            cliente.operacoes['leituras'] += 1 + len(documentos) // 1000
+        resultado = []
+        for funcao, campo, alias in self._agregacoes:
+            if funcao == 'count':
+                valor = len(documentos)
+            else:
+                numeros = []
+                for _, dados in documentos:
+                    try:
+                        numero = _ler_campo(dados, campo)
+                    except KeyError:
+                        continue
+                    if isinstance(numero, (int, float)) and not isinstance(numero, bool):
+                        numeros.append(numero)
+                if funcao == 'sum':
+                    valor = sum(numeros)
+                else:
+                    valor = sum(numeros) / len(numeros) if numeros else None
+            resultado.append(ResultadoAgregacao(alias, valor))
+        return [resultado]
+
+
+class TipoMudanca(enum.Enum):
+    ADDED = 1
+    MODIFIED = 2
+    REMOVED = 3
+
+
+class MudancaFalsa:
+    """DocumentChange"""
+
+    def __init__(self, tipo, documento):
+        self.type = tipo
+        self.document = documento
+
+
+class WatchFalso:
+    """Watch devolvido por on_snapshot"""
+
+    def __init__(self, cliente, consulta, callback):
+        self._cliente = cliente
+        self._consulta = consulta
+        self._callback = callback
+        self._vistos = None  # None até o primeiro snapshot
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+        self._cliente._remover_listener(self)
+
+    def notificar(self):
+        """Chama o callback com o que mudou desde a última notificação"""
+        if not self.is_active:
+            return
+        with self._cliente._lock:
+            documentos = self._consulta._executar(contar=False)
+        atuais = {ref.id: (ref, dados) for ref, dados in documentos}
+        primeiro = self._vistos is None
+        vistos = self._vistos or {}
+        mudancas = []
+        for doc_id, (ref, dados) in atuais.items():
+            if doc_id not in vistos:
+                mudancas.append(MudancaFalsa(TipoMudanca.ADDED, SnapshotFalso(ref, dados)))
+            elif vistos[doc_id] != dados:
+                mudancas.append(MudancaFalsa(TipoMudanca.MODIFIED, SnapshotFalso(ref, dados)))
+        for doc_id, dados in vistos.items():
+            if doc_id not in atuais:
+                referencia = ReferenciaFalsa(self._cliente, self._consulta.colecao, doc_id)
+                mudancas.append(MudancaFalsa(TipoMudanca.REMOVED, SnapshotFalso(referencia, dados)))
+        self._vistos = {doc_id: dados for doc_id, (_, dados) in atuais.items()}
+        # O primeiro snapshot chega mesmo sem documentos
+        if mudancas or primeiro:
+            self._cliente.operacoes['leituras'] += len(mudancas)
+            self._callback(
+                [SnapshotFalso(ref, dados) for ref, dados in documentos], mudancas, datetime.now(timezone.utc)
+            )
+
+
+class ConsultaFalsa:
+    """Query imutável: cada método devolve uma nova consulta"""
+
+    def __init__(self, cliente, colecao, filtros=(), ordens=(), limite=None, campos=None, apos=None):
+        self._cliente = cliente
+        self.colecao = colecao
+        self._filtros = tuple(filtros)
+        self._ordens = tuple(ordens)
+        self._limite = limite
+        self._campos = campos
+        self._apos = apos
+
+    def _copia(self, **mudancas):
+        atributos = {
+            'filtros': self._filtros, 'ordens': self._ordens, 'limite': self._limite,
+            'campos': self._campos, 'apos': self._apos,
+        }
+        atributos.update(mudancas)
+        return ConsultaFalsa(self._cliente, self.colecao, **atributos)
+
+    def where(self, campo=None, operador=None, valor=None, filter=None):
+        if filter is not None:
+            campo, operador, valor = filter.field_path, filter.op_string, filter.value
+        return self._copia(filtros=self._filtros + ((campo, operador, valor),))
+
+    def select(self, campos):
+        return self._copia(campos=list(campos))
+
+    def order_by(self, campo, direction='ASCENDING'):
+        return self._copia(ordens=self._ordens + ((campo, direction),))
+
+    def limit(self, limite):
+        return self._copia(limite=limite)
+
+    def start_after(self, cursor):
+        if isinstance(cursor, SnapshotFalso):
+            cursor = dict(cursor.to_dict(), **{ID_DOCUMENTO: cursor.id})
+        return self._copia(apos=dict(cursor))
+
+    def count(self, alias=None):
+        return AgregacaoFalsa(self).count(alias)
+
+    def sum(self, campo, alias=None):
+        return AgregacaoFalsa(self).sum(campo, alias)
+
+    def avg(self, campo, alias=None):
+        return AgregacaoFalsa(self).avg(campo, alias)
+
+    def stream(self, transaction=None):
+        with self._cliente._lock:
+            documentos = self._executar()
+        for ref, dados in documentos:
+            yield SnapshotFalso(ref, self._projetar(dados))
+
+    def get(self, transaction=None):
+        return list(self.stream())
+
+    def on_snapshot(self, callback):
+        watch = WatchFalso(self._cliente, self, callback)
+        self._cliente._adicionar_listener(watch)
+        watch.notificar()
+        return watch
+
+    def _ordenacao(self):
+        ordens = list(self._ordens)
+        if not ordens:
+            desigualdade = next(
+                (c for c, op, _ in self._filtros if op in ('<', '<=', '>', '>=', '!=', 'not-in')), None
+            )
+            if desigualdade:
+                ordens.append((desigualdade, 'ASCENDING'))
+        if not any(campo == ID_DOCUMENTO for campo, _ in ordens):
+            ordens.append((ID_DOCUMENTO, ordens[-1][1] if ordens else 'ASCENDING'))
+        return ordens
+
+    def _executar(self, contar=True):
+        """Documentos (referência, dados) que atendem a consulta, já ordenados"""
+        documentos = []
+        for doc_id, dados in self._cliente._dados.get(self.colecao, {}).items():
+            try:
+                if all(_atende(_ler_campo(dados, c), op, v) for c, op, v in self._filtros):
+                    documentos.append((doc_id, dados))
+            except KeyError:
+                continue
+
+        for campo, direcao in reversed(self._ordenacao()):
+            if campo != ID_DOCUMENTO:
+                documentos = [(i, d) for i, d in documentos if _tem_campo(d, campo)]
+            documentos.sort(
+                key=lambda item, campo=campo: _chave(item[0] if campo == ID_DOCUMENTO else _ler_campo(item[1], campo)),
+                reverse=direcao == 'DESCENDING'
+            )
+
+        if self._apos is not None:
+            documentos = [item for item in documentos if self._depois_do_cursor(item)]
+        if self._limite:
+            documentos = documentos[:self._limite]
+        if contar:
+            # Consultas vazias também são cobradas como uma leitura
+            self._cliente.operacoes['leituras'] += max(1, len(documentos))
+        return [
+            (ReferenciaFalsa(self._cliente, self.colecao, doc_id), copy.deepcopy(dados))
+            for doc_id, dados in documentos
+        ]
+
+    def _depois_do_cursor(self, item):
+        doc_id, dados = item
+        for campo, direcao in self._ordenacao():
+            valor = doc_id if campo == ID_DOCUMENTO else _ler_campo(dados, campo)
+            a, b = _chave(valor), _chave(self._apos[campo])
+            if a != b:
+                return a > b if direcao == 'ASCENDING' else a < b
+        return False
+
+    def _projetar(self, dados):
+        if self._campos is None:
+            return dados
+        projetado = {}
+        for campo in self._campos:
+            try:
+                valor = _ler_campo(dados, campo)
+            except KeyError:
+                continue
+            alvo = projetado
+            partes = campo.split('.')
+            for parte in partes[:-1]:
+                alvo = alvo.setdefault(parte, {})
+            alvo[partes[-1]] = valor
+        return projetado
+
+
+def _tem_campo(dados, campo):
+    try:
+        _ler_campo(dados, campo)
+        return True
+    except KeyError:
+        return False
+
+
+class ColecaoFalsa(ConsultaFalsa):
+    """CollectionReference: uma consulta sem filtros que também cria documentos"""
+
+    def __init__(self, cliente, colecao):
+        super().__init__(cliente, colecao)
+        self.id = colecao
+
+    def document(self, doc_id=None):
+        return ReferenciaFalsa(self._cliente, self.colecao, doc_id or uuid.uuid4().hex[:20])
+
+    def add(self, dados, document_id=None):
+        referencia = self.document(document_id)
+        referencia.create(dados)
+        return datetime.now(timezone.utc), referencia
+
+
+class LoteFalso:
+    """WriteBatch: as escritas só acontecem no commit(), todas ou nenhuma"""
+
+    def __init__(self, cliente):
+        self._cliente = cliente
+        self._escritas = []
+
+    def set(self, referencia, dados, merge=False):
+        self._escritas.append(('set', referencia, dados, merge))
+
+    def create(self, referencia, dados):
+        self._escritas.append(('create', referencia, dados, False))
+
+    def update(self, referencia, dados):
+        self._escritas.append(('update', referencia, dados, False))
+
+    def delete(self, referencia):
+        self._escritas.append(('delete', referencia, None, False))
+
+    def commit(self):
+        escritas, self._escritas = self._escritas, []
+        self._cliente._escrever(escritas)
+        return []
+
+
+class TransacaoFalsa(LoteFalso):
+    """
+    Transaction compatível com firestore.transactional
+
+    Segura o lock do cliente do _begin ao _commit/_rollback: as transações
+    rodam uma de cada vez e nada escreve entre a leitura e a gravação.
+    """
+
+    def __init__(self, cliente, max_attempts=5, read_only=False):
+        super().__init__(cliente)
+        self._max_attempts = max_attempts
+        self._read_only = read_only
+        self._id = None
+
+    @property
+    def in_progress(self):
+        return self._id is not None
+
+    def get(self, referencia):
+        return referencia.get(transaction=self)
+
+    def _clean_up(self):
+        self._escritas = []
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._cliente._lock.acquire()
+        self._id = uuid.uuid4().bytes
+
+    def _commit(self):
+        try:
+            self.commit()
+        finally:
+            self._encerrar()
+
+    def _rollback(self):
+        self._escritas = []
+        self._encerrar()
+
+    def _encerrar(self):
+        if self._id is not None:
+            self._id = None
+            self._cliente._lock.release()
+
+
+class FirestoreFalso:
+    """
+    Cliente Firestore em memória (firestore.Client)
+
+    Attributes:
+        operacoes: Leituras e escritas de documentos, contadas como o
+            Firestore cobra (consulta vazia = 1 leitura)
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._dados = {}  # coleção -> {id: dados}
+        self._listeners = []
+        self.operacoes = Counter()
+
+    def collection(self, nome):
+        return ColecaoFalsa(self, nome)
+
+    def batch(self):
+        return LoteFalso(self)
+
+    def transaction(self, max_attempts=5, read_only=False):
+        return TransacaoFalsa(self, max_attempts, read_only)
+
+    def collections(self):
+        with self._lock:
+            return [ColecaoFalsa(self, nome) for nome, docs in self._dados.items() if docs]
+
+    def _ler(self, referencia):
+        with self._lock:
+            self.operacoes['leituras'] += 1
+            dados = self._dados.get(referencia.colecao, {}).get(referencia.id)
+            return SnapshotFalso(referencia, copy.deepcopy(dados))
+
+    def _escrever(self, escritas):
+        """Valida e aplica as escritas de forma atômica; depois avisa os listeners"""
+        with self._lock:
+            novos = {}
+            for tipo, referencia, dados, merge in escritas:
+                chave = (referencia.colecao, referencia.id)
+                if chave in novos:
+                    atual = novos[chave]
+                else:
+                    atual = copy.deepcopy(self._dados.get(referencia.colecao, {}).get(referencia.id))
+                if tipo == 'create' and atual is not None:
+                    raise AlreadyExists(f"Documento já existe: {referencia.path}")
+                if tipo == 'update' and atual is None:
+                    raise NotFound(f"Documento não encontrado: {referencia.path}")
+
+                if tipo == 'delete':
+                    novos[chave] = None
+                    continue
+                documento = atual if (atual is not None and (merge or tipo == 'update')) else {}
+                if tipo == 'update':
+                    _atualizar(documento, dados)
+                else:
+                    _mesclar(documento, dados, merge)
+                novos[chave] = documento
+
+            for (colecao, doc_id), documento in novos.items():
+                if documento is None:
+                    self._dados.get(colecao, {}).pop(doc_id, None)
+                    self.operacoes['exclusoes'] += 1
+                else:
+                    self._dados.setdefault(colecao, {})[doc_id] = documento
+                    self.operacoes['escritas'] += 1
+            colecoes = {colecao for colecao, _ in novos}
+            listeners = [w for w in self._listeners if w._consulta.colecao in colecoes]
+
+        for watch in listeners:
+            watch.notificar()
+
+    def _adicionar_listener(self, watch):
+        with self._lock:
+            self._listeners.append(watch)
+
+    def _remover_listener(self, watch):
+        with self._lock:
+            if watch in self._listeners:
+                self._listeners.remove(watch)
+
+
+class BlobFalso:
+    """Blob do Storage guardado na memória do BucketFalso"""
+
+    def __init__(self, bucket, nome):
+        self.bucket = bucket
+        self.name = nome
+        self.content_type = None
+        self.public = False
+
+    @property
+    def public_url(self):
+        return f"https://storage.googleapis.com/{self.bucket.name}/{quote(self.name)}"
+
+    @property
+    def size(self):
+        dados = self.bucket.arquivos.get(self.name)
+        return len(dados) if dados is not None else None
+
+    def upload_from_string(self, dados, content_type='text/plain'):
+        if isinstance(dados, str):
+            dados = dados.encode('utf-8')
+        self.content_type = content_type
+        self.bucket._gravar(self, bytes(dados))
+
+    def download_as_bytes(self):
+        if self.name not in self.bucket.arquivos:
+            raise NotFound(f"Arquivo não encontrado: {self.name}")
+        return self.bucket.arquivos[self.name]
+
+    def exists(self):
+        return self.name in self.bucket.arquivos
+
+    def delete(self):
+        if self.bucket.arquivos.pop(self.name, None) is None:
+            raise NotFound(f"Arquivo não encontrado: {self.name}")
+
+    def make_public(self):
+        self.public = True
+
+    def create_resumable_upload_session(self, content_type=None, size=None):
+        self.content_type = content_type
+        return self.bucket._abrir_sessao(self, size)
+
+
+class BucketFalso:
+    """
+    Bucket do Storage em memória
+
+    As sessões de upload resumível são URLs 'falso://' atendidas pela
+    SessaoHttpFalsa, com o mesmo protocolo (Content-Range, 308 + Range).
+    """
+
+    def __init__(self, name='bucket-falso'):
+        self.name = name
+        self.arquivos = {}  # nome -> bytes
+        self._sessoes = {}  # url -> [blob, total, bytearray]
+        self._lock = threading.Lock()
+
+    def blob(self, nome):
+        return BlobFalso(self, nome)
+
+    def get_blob(self, nome):
+        return BlobFalso(self, nome) if nome in self.arquivos else None
+
+    def list_blobs(self, prefix=''):
+        return [BlobFalso(self, nome) for nome in sorted(self.arquivos) if nome.startswith(prefix)]
+
+    def _gravar(self, blob, dados):
+        with self._lock:
+            self.arquivos[blob.name] = dados
+
+    def _abrir_sessao(self, blob, total):
+        url = f"falso://{self.name}/upload/{uuid.uuid4().hex}"
+        with self._lock:
+            self._sessoes[url] = [blob, total, bytearray()]
+        return url
+
+
+class RespostaFalsa:
+    def __init__(self, status_code, headers=None, text=''):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+class SessaoHttpFalsa:
+    """Atende os PUTs das sessões resumíveis de um BucketFalso"""
+
+    def __init__(self, bucket):
+        self.bucket = bucket
+
+    def put(self, url, data=b'', headers=None, timeout=None):
+        with self.bucket._lock:
+            sessao = self.bucket._sessoes.get(url)
+        if sessao is None:
+            return RespostaFalsa(404, text='Sessão de upload inexistente')
+        blob, total, recebido = sessao
+
+        faixa, _, tamanho = (headers or {}).get('Content-Range', '').replace('bytes ', '').partition('/')
+        if faixa != '*':
+            inicio = int(faixa.split('-')[0])
+            if inicio != len(recebido):
+                return RespostaFalsa(400, text='Content-Range fora de ordem')
+            recebido.extend(data)
+        if len(recebido) >= int(tamanho or total):
+            blob.bucket._gravar(blob, bytes(recebido))
+            return RespostaFalsa(200)
+        return RespostaFalsa(308, {'Range': f"bytes=0-{len(recebido) - 1}"} if recebido else {})
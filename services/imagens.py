@@ -0,0 +1,113 @@
+"""
+Preparação das fotos de notas fiscais antes do upload
+
+Fotos de celular chegam com 4–10 MB, rotacionadas só pela tag EXIF e em
+resolução muito maior que o necessário para ler uma nota. Antes do upload
+cada imagem é:
+
+- girada conforme a orientação EXIF (e a tag é descartada);
+- reduzida para caber em RST_IMAGEM_MAX_LADO pixels (padrão 1600);
+- recodificada em JPEG ou WebP (RST_IMAGEM_FORMATO) com qualidade
+  RST_IMAGEM_QUALIDADE (padrão 80);
+- acompanhada de uma miniatura de RST_MINIATURA_LADO pixels (padrão 320).
+
+PDFs e arquivos que o Pillow não abre seguem sem alteração e sem miniatura.
+"""
+
+import io
+import os
+from dataclasses import dataclass
+
+MAX_LADO = int(os.getenv("RST_IMAGEM_MAX_LADO", "1600"))
+FORMATO = os.getenv("RST_IMAGEM_FORMATO", "jpeg").lower()
+QUALIDADE = int(os.getenv("RST_IMAGEM_QUALIDADE", "80"))
+MINIATURA_LADO = int(os.getenv("RST_MINIATURA_LADO", "320"))
+QUALIDADE_MINIATURA = 70
+
+# formato -> (nome no Pillow, content type, extensão)
+FORMATOS = {
+    'jpeg': ('JPEG', 'image/jpeg', 'jpg'),
+    'webp': ('WEBP', 'image/webp', 'webp'),
+}
+
+
+@dataclass
+class ArquivoPreparado:
+    """Conteúdo pronto para o upload"""
+    dados: bytes
+    content_type: str
+    extensao: str
+    miniatura: bytes = None  # mesmo formato do arquivo; None para PDFs
+    tamanho_original: int = 0
+
+
+def preparar_arquivo(dados, content_type, extensao, max_lado=None, formato=None, qualidade=None):
+    """
+    Normaliza, reduz e recodifica uma imagem; outros arquivos passam direto
+
+    Args:
+        dados: Conteúdo original
+        content_type: Tipo MIME informado pelo upload
+        extensao: Extensão original (sem ponto)
+        max_lado: Maior lado em pixels (padrão MAX_LADO)
+        formato: 'jpeg' ou 'webp' (padrão FORMATO)
+        qualidade: Qualidade da compressão, 1-95 (padrão QUALIDADE)
+
+    Returns:
+        ArquivoPreparado
+    """
+    original = ArquivoPreparado(dados, content_type, extensao, tamanho_original=len(dados))
+    if not content_type.startswith('image/'):
+        return original
+
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        # Sem Pillow a imagem sobe como veio
+        return original
+
+    max_lado = max_lado or MAX_LADO
+    nome_pil, tipo, nova_extensao = FORMATOS.get(formato or FORMATO, FORMATOS['jpeg'])
+    qualidade = qualidade or QUALIDADE
+
+    try:
+        with Image.open(io.BytesIO(dados)) as aberta:
+            imagem = ImageOps.exif_transpose(aberta)
+            imagem = _sem_transparencia(imagem)
+    except Exception:
+        return original
+
+    imagem.thumbnail((max_lado, max_lado), Image.LANCZOS)
+    principal = _codificar(imagem, nome_pil, qualidade)
+
+    miniatura = imagem.copy()
+    miniatura.thumbnail((MINIATURA_LADO, MINIATURA_LADO), Image.LANCZOS)
+
+    return ArquivoPreparado(
+        dados=principal,
+        content_type=tipo,
+        extensao=nova_extensao,
+        miniatura=_codificar(miniatura, nome_pil, QUALIDADE_MINIATURA),
+        tamanho_original=len(dados),
+    )
+
+
+def _sem_transparencia(imagem):
+    """RGB sobre fundo branco (JPEG não tem canal alfa)"""
+    from PIL import Image
+
+    if imagem.mode in ('RGBA', 'LA') or (imagem.mode == 'P' and 'transparency' in imagem.info):
+        imagem = imagem.convert('RGBA')
+        fundo = Image.new('RGB', imagem.size, (255, 255, 255))
+        fundo.paste(imagem, mask=imagem.getchannel('A'))
+        return fundo
+    return imagem.convert('RGB')
+
+
+def _codificar(imagem, formato, qualidade):
+    saida = io.BytesIO()
+    opcoes = {'quality': qualidade}
+    if formato == 'JPEG':
+        opcoes.update(optimize=True, progressive=True)
+    imagem.save(saida, formato, **opcoes)
+    return saida.getvalue()
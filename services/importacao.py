@@ -0,0 +1,422 @@
+"""
+Importação de custos em lote a partir de planilhas (CSV ou XLSX)
+
+As linhas são lidas uma a uma do arquivo, validadas com as mesmas regras do
+formulário da página de Custos (categorias de CUSTOS_FIXOS,
+CUSTOS_VARIAVEIS e INVESTIMENTOS, valor = quantidade × valor unitário,
+depreciação dos investimentos) e gravadas em lotes atômicos de até
+MAX_OPERACOES_LOTE escritas.
+
+O progresso fica num documento da coleção 'importacoes', identificado pelo
+SHA-256 do arquivo e gravado no mesmo lote das linhas. Se a importação cair
+no meio, enviar o mesmo arquivo de novo continua da primeira linha ainda não
+gravada, sem duplicar custos.
+
+Colunas da planilha (cabeçalho na primeira linha, sem diferenciar acentos
+e maiúsculas):
+    data, tipo_custo, categoria, descricao_item, quantidade, unidade_medida,
+    valor_unitario, fornecedor, numero_nf, observacoes, vida_util_meses,
+    lote_producao e, opcionalmente, valor (conferido contra quantidade ×
+    valor unitário)
+"""
+
+import csv
+import hashlib
+import io
+from dataclasses import dataclass, field
+from datetime import date, datetime
+
+from services.busca import normalizar, so_digitos
+from services.categorias import CATEGORIAS_POR_TIPO, UNIDADES_MEDIDA
+from services.repository import MAX_OPERACOES_LOTE
+
+COLECAO_IMPORTACOES = 'importacoes'
+
+# Vida útil assumida quando a planilha não informa (mesmo padrão do formulário)
+VIDA_UTIL_PADRAO = 12
+
+# Diferença tolerada entre a coluna valor e quantidade × valor unitário
+TOLERANCIA_VALOR = 0.01
+
+# Nomes alternativos aceitos no cabeçalho -> coluna
+ALIASES_COLUNAS = {
+    'tipo': 'tipo_custo',
+    'descricao': 'descricao_item',
+    'produto': 'descricao_item',
+    'qtd': 'quantidade',
+    'unidade': 'unidade_medida',
+    'un': 'unidade_medida',
+    'valor_unit': 'valor_unitario',
+    'nf': 'numero_nf',
+    'vida_util': 'vida_util_meses',
+    'lote': 'lote_producao',
+}
+
+# Formas curtas aceitas para o tipo de custo
+ALIASES_TIPOS = {
+    'fixo': 'Custos Fixos',
+    'fixos': 'Custos Fixos',
+    'variavel': 'Custos Variáveis',
+    'variaveis': 'Custos Variáveis',
+    'investimento': 'Investimentos',
+}
+
+
+@dataclass
+class ResultadoImportacao:
+    """Andamento de uma importação, atualizado a cada lote gravado"""
+    importacao_id: str
+    total: int = None          # linhas estimadas no arquivo (None se desconhecido)
+    lidas: int = 0             # linhas lidas nesta execução
+    gravadas: int = 0          # custos gravados nesta execução
+    puladas: int = 0           # linhas já gravadas numa execução anterior
+    erros: list = field(default_factory=list)  # {'linha', 'erros', 'dados'}
+    concluida: bool = False
+    falha: str = None          # mensagem do lote que falhou, se houver
+
+
+class MapaFornecedores:
+    """Fornecedores cadastrados por nome normalizado e por dígitos do CNPJ/CPF"""
+
+    def __init__(self, fornecedores):
+        self.por_nome = {}
+        self.por_documento = {}
+        for fornecedor in fornecedores:
+            self.por_nome.setdefault(normalizar(fornecedor.get('nome', '')), fornecedor)
+            documento = so_digitos(fornecedor.get('cnpj_cpf', ''))
+            if documento:
+                self.por_documento.setdefault(documento, fornecedor)
+
+    def encontrar(self, texto):
+        """Fornecedor pelo nome ou pelo CNPJ/CPF (com ou sem pontuação), ou None"""
+        fornecedor = self.por_nome.get(normalizar(texto))
+        if fornecedor is None and so_digitos(texto):
+            fornecedor = self.por_documento.get(so_digitos(texto))
+        return fornecedor
+
+
+def hash_arquivo(arquivo, tamanho_bloco=1024 * 1024):
+    """
+    SHA-256 do conteúdo e quantidade de quebras de linha, lendo em blocos
+
+    Volta o arquivo para o início ao terminar.
+
+    Returns:
+        tuple: (hex do SHA-256, quebras de linha)
+    """
+    sha = hashlib.sha256()
+    quebras = 0
+    arquivo.seek(0)
+    for bloco in iter(lambda: arquivo.read(tamanho_bloco), b''):
+        sha.update(bloco)
+        quebras += bloco.count(b'\n')
+    arquivo.seek(0)
+    return sha.hexdigest(), quebras
+
+
+def nome_coluna(cabecalho):
+    coluna = normalizar(cabecalho).replace(' ', '_')
+    return ALIASES_COLUNAS.get(coluna, coluna)
+
+
+def ler_linhas(arquivo, nome_arquivo):
+    """
+    Linhas da planilha como dicts, sem carregar o arquivo inteiro
+
+    Args:
+        arquivo: Arquivo binário (ex.: UploadedFile do Streamlit)
+        nome_arquivo: Nome original, usado para escolher entre CSV e XLSX
+
+    Yields:
+        tuple: (número da linha no arquivo, dict coluna -> valor)
+    """
+    if nome_arquivo.lower().endswith('.xlsx'):
+        yield from _linhas_xlsx(arquivo)
+    else:
+        yield from _linhas_csv(arquivo)
+
+
+def _linhas_csv(arquivo):
+    texto = io.TextIOWrapper(arquivo, encoding='utf-8-sig', newline='')
+    try:
+        amostra = texto.read(4096)
+        texto.seek(0)
+        try:
+            dialeto = csv.Sniffer().sniff(amostra, delimiters=';,\t')
+        except csv.Error:
+            dialeto = csv.excel
+        leitor = csv.reader(texto, dialeto)
+        cabecalho = [nome_coluna(c) for c in next(leitor, [])]
+        for linha in leitor:
+            if any(valor.strip() for valor in linha):
+                yield leitor.line_num, dict(zip(cabecalho, linha))
+    finally:
+        # Não fecha o arquivo original junto com o wrapper
+        texto.detach()
+
+
+def _linhas_xlsx(arquivo):
+    try:
+        import openpyxl
+    except ImportError:
+        raise ValueError("Importação de XLSX requer o pacote openpyxl (pip install openpyxl)")
+
+    planilha = openpyxl.load_workbook(arquivo, read_only=True, data_only=True)
+    try:
+        linhas = planilha.active.iter_rows(values_only=True)
+        cabecalho = [nome_coluna(c) for c in next(linhas, ())]
+        for numero, linha in enumerate(linhas, start=2):
+            if any(valor not in (None, '') for valor in linha):
+                yield numero, dict(zip(cabecalho, linha))
+    finally:
+        planilha.close()
+
+
+def numero(valor):
+    """
+    Converte '1.234,56', '1234.56', 'R$ 10,00' ou um número da planilha
+
+    Raises:
+        ValueError: Texto que não é um número
+    """
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return float(valor)
+    texto = str(valor or '').replace('R$', '').replace(' ', '').strip()
+    if not texto:
+        raise ValueError("vazio")
+    if ',' in texto:
+        texto = texto.replace('.', '').replace(',', '.')
+    return float(texto)
+
+
+def data_iso(valor):
+    """Converte DD/MM/AAAA, AAAA-MM-DD ou uma data da planilha para AAAA-MM-DD"""
+    if isinstance(valor, datetime):
+        return valor.date().isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    texto = str(valor or '').strip()[:10]
+    for formato in ('%d/%m/%Y', '%Y-%m-%d'):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    raise ValueError(texto)
+
+
+def texto(linha, coluna):
+    valor = linha.get(coluna)
+    return '' if valor is None else str(valor).strip()
+
+
+def validar_linha(linha, fornecedores):
+    """
+    Valida uma linha da planilha com as regras do formulário de custos
+
+    Args:
+        linha: dict coluna -> valor
+        fornecedores: MapaFornecedores dos fornecedores ativos
+
+    Returns:
+        tuple: (custo_data no formato do formulário ou None, lista de erros)
+    """
+    erros = []
+
+    try:
+        data_custo = data_iso(linha.get('data'))
+    except ValueError:
+        data_custo = None
+        erros.append("Data inválida (use DD/MM/AAAA ou AAAA-MM-DD)")
+
+    tipo_informado = normalizar(texto(linha, 'tipo_custo'))
+    tipo_custo = ALIASES_TIPOS.get(tipo_informado)
+    for tipo in CATEGORIAS_POR_TIPO:
+        if normalizar(tipo) == tipo_informado:
+            tipo_custo = tipo
+    categoria = None
+    if tipo_custo is None:
+        erros.append("Tipo de custo deve ser Custos Fixos, Custos Variáveis ou Investimentos")
+    else:
+        categorias = CATEGORIAS_POR_TIPO[tipo_custo]
+        informada = normalizar(texto(linha, 'categoria'))
+        for chave, nome in categorias.items():
+            if informada in (chave, normalizar(nome)):
+                categoria = chave
+        if categoria is None:
+            erros.append(f"Categoria '{texto(linha, 'categoria')}' não existe em {tipo_custo}")
+
+    descricao_item = texto(linha, 'descricao_item')
+    if not descricao_item:
+        erros.append("A descrição do produto/serviço é obrigatória")
+
+    quantidade = valor_unitario = None
+    try:
+        quantidade = numero(linha.get('quantidade'))
+        if quantidade <= 0:
+            erros.append("A quantidade deve ser maior que zero")
+    except ValueError:
+        erros.append("Quantidade inválida")
+    try:
+        valor_unitario = numero(linha.get('valor_unitario'))
+        if valor_unitario <= 0:
+            erros.append("O valor unitário deve ser maior que zero")
+    except ValueError:
+        erros.append("Valor unitário inválido")
+
+    valor = None
+    if quantidade is not None and valor_unitario is not None:
+        valor = quantidade * valor_unitario
+        if texto(linha, 'valor'):
+            try:
+                if abs(numero(linha.get('valor')) - valor) > TOLERANCIA_VALOR:
+                    erros.append(f"Valor não confere com quantidade × valor unitário (R$ {valor:.2f})")
+            except ValueError:
+                erros.append("Valor inválido")
+
+    unidade_medida = texto(linha, 'unidade_medida').upper() or 'UN'
+    if unidade_medida not in UNIDADES_MEDIDA:
+        erros.append(f"Unidade '{unidade_medida}' inválida (use {', '.join(UNIDADES_MEDIDA)})")
+
+    fornecedor = fornecedores.encontrar(texto(linha, 'fornecedor'))
+    if fornecedor is None:
+        erros.append(f"Fornecedor '{texto(linha, 'fornecedor')}' não cadastrado ou inativo")
+
+    vida_util = VIDA_UTIL_PADRAO
+    if tipo_custo == 'Investimentos' and texto(linha, 'vida_util_meses'):
+        try:
+            vida_util = int(numero(linha.get('vida_util_meses')))
+            if vida_util < 1:
+                erros.append("A vida útil deve ser de pelo menos 1 mês")
+        except ValueError:
+            erros.append("Vida útil inválida")
+
+    if erros:
+        return None, erros
+
+    custo_data = {
+        'data': data_custo,
+        'tipo_custo': tipo_custo,
+        'categoria': categoria,
+        'categoria_nome': CATEGORIAS_POR_TIPO[tipo_custo][categoria],
+        'descricao_item': descricao_item,
+        'quantidade': float(quantidade),
+        'unidade_medida': unidade_medida,
+        'valor_unitario': float(valor_unitario),
+        'valor': float(valor),
+        'fornecedor': fornecedor['nome'],
+        'fornecedor_id': fornecedor['id'],
+        'numero_nf': texto(linha, 'numero_nf'),
+        'imagem_nf_url': '',
+        'tem_nota_fiscal': False,
+        'observacoes': texto(linha, 'observacoes'),
+        'timestamp': datetime.now().isoformat(),
+        'app_version': 'RST_v2.3'
+    }
+    if tipo_custo == 'Investimentos':
+        custo_data.update({
+            'vida_util_meses': vida_util,
+            'depreciacao_mensal': valor / vida_util,
+            'roi_calculado': False
+        })
+    if tipo_custo == 'Custos Variáveis' and texto(linha, 'lote_producao'):
+        custo_data['lote_producao'] = texto(linha, 'lote_producao')
+    return custo_data, erros
+
+
+def gravar_em_lotes(repos, itens, importacao_id, nome_arquivo, total=None, progresso=None):
+    """
+    Grava custos já validados em lotes, com progresso retomável
+
+    Args:
+        repos: Repositorios (services.repository)
+        itens: Iterável de (posição, custo_data ou None, erros, dados originais),
+            em ordem crescente de posição
+        importacao_id: Id do documento de progresso em 'importacoes'
+        nome_arquivo: Nome mostrado no documento de progresso
+        total: Quantidade estimada de itens, para a barra de progresso
+        progresso: Função chamada com o ResultadoImportacao após cada lote
+
+    Returns:
+        ResultadoImportacao
+    """
+    resultado = ResultadoImportacao(importacao_id, total=total)
+    anterior = repos.backend.obter(COLECAO_IMPORTACOES, importacao_id) or {}
+    if anterior.get('concluida'):
+        resultado.puladas = anterior.get('gravadas', 0)
+        resultado.concluida = True
+        return resultado
+    retomar_apos = anterior.get('posicao', 0)
+    gravadas_antes = anterior.get('gravadas', 0)
+
+    pendentes = []
+    meses = set()
+    ultima_posicao = retomar_apos
+
+    def gravar(concluida=False):
+        marcador = ('definir', COLECAO_IMPORTACOES, importacao_id, {
+            'arquivo': nome_arquivo,
+            'posicao': ultima_posicao,
+            'gravadas': gravadas_antes + resultado.gravadas + len(pendentes),
+            'concluida': concluida,
+            'atualizado_em': datetime.now().isoformat(),
+        })
+        repos.custos.adicionar_lote(pendentes, operacoes=[marcador])
+        resultado.gravadas += len(pendentes)
+        pendentes.clear()
+        meses.clear()
+        if progresso:
+            progresso(resultado)
+
+    try:
+        for posicao, custo_data, erros, dados in itens:
+            if posicao <= retomar_apos:
+                resultado.puladas += 1
+                continue
+            resultado.lidas += 1
+            if custo_data is None:
+                resultado.erros.append({'linha': posicao, 'erros': erros, 'dados': dados})
+                ultima_posicao = posicao
+                continue
+            # Custos + incrementos (um por mês) + documento de progresso
+            mes = custo_data['data'][:7]
+            if len(pendentes) + 1 + len(meses | {mes}) + 1 > MAX_OPERACOES_LOTE:
+                gravar()
+            pendentes.append(custo_data)
+            meses.add(mes)
+            ultima_posicao = posicao
+        gravar(concluida=True)
+        resultado.concluida = True
+    except Exception as e:
+        resultado.falha = str(e)
+    return resultado
+
+
+def importar_custos_planilha(repos, arquivo, nome_arquivo, fornecedores, progresso=None):
+    """
+    Importa uma planilha de custos (CSV ou XLSX)
+
+    Linhas válidas são gravadas; as inválidas voltam em resultado.erros com
+    o número da linha e os motivos. Reenviar o mesmo arquivo depois de uma
+    falha continua de onde parou.
+
+    Args:
+        repos: Repositorios (services.repository)
+        arquivo: Arquivo binário
+        nome_arquivo: Nome original do arquivo
+        fornecedores: Fornecedores ativos (dicts com 'id', 'nome', 'cnpj_cpf')
+        progresso: Função chamada com o ResultadoImportacao após cada lote
+
+    Returns:
+        ResultadoImportacao
+    """
+    sha, quebras = hash_arquivo(arquivo)
+    mapa = MapaFornecedores(fornecedores)
+
+    def itens():
+        for numero_linha, linha in ler_linhas(arquivo, nome_arquivo):
+            custo_data, erros = validar_linha(linha, mapa)
+            yield numero_linha, custo_data, erros, linha
+
+    # Em XLSX as quebras de linha não dizem nada sobre o número de linhas
+    total = quebras - 1 if not nome_arquivo.lower().endswith('.xlsx') and quebras > 1 else None
+    return gravar_em_lotes(repos, itens(), f"planilha_{sha}", nome_arquivo, total, progresso)
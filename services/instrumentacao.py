@@ -0,0 +1,254 @@
+"""
+Instrumentação das chamadas ao banco e ao Storage
+
+Com RST_INSTRUMENTACAO=1 o backend é embrulhado (BackendInstrumentado) e
+cada chamada registra operação, coleção, documentos, bytes e tempo. Os
+registros somam em três níveis:
+
+- rerun: a execução atual da página (zerada por iniciar_rerun());
+- sessão: tudo o que uma aba do navegador já custou;
+- processo: todas as sessões e as threads em segundo plano.
+
+Cada chamada também vira uma linha de log JSON no logger 'rst.banco', e o
+painel_debug() mostra os totais na barra lateral quando RST_PAINEL_DEBUG=1
+ou a URL tem ?debug=1.
+
+Documentos contam como o Firestore cobra: cada documento lido ou escrito é
+um, agregações contam uma leitura e um snapshot de listener conta os
+documentos alterados.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+logger = logging.getLogger('rst.banco')
+
+# Sessões guardadas (as mais antigas saem primeiro)
+MAX_SESSOES = 200
+
+# Chave do session_state que, se definida, identifica a sessão (o AppTest usa
+# o mesmo session_id em todas; o teste de carga dá um nome a cada uma)
+CHAVE_SESSAO = '_rst_sessao'
+
+# Métodos de escrita do backend (o tamanho vem dos dados enviados)
+ESCRITAS = {'adicionar', 'atualizar', 'definir', 'definir_se_inalterado', 'executar_lote', 'incrementar_contador'}
+
+
+def instrumentacao_ativa():
+    return os.getenv("RST_INSTRUMENTACAO", "0") == "1"
+
+
+@dataclass
+class Totais:
+    """Soma das chamadas, no total e por (operação, coleção)"""
+    chamadas: int = 0
+    documentos: int = 0
+    bytes: int = 0
+    ms: float = 0.0
+    por_operacao: dict = field(default_factory=dict)
+
+    def somar(self, operacao, colecao, documentos, tamanho, ms):
+        self.chamadas += 1
+        self.documentos += documentos
+        self.bytes += tamanho
+        self.ms += ms
+        parcial = self.por_operacao.setdefault((operacao, colecao), [0, 0, 0, 0.0])
+        parcial[0] += 1
+        parcial[1] += documentos
+        parcial[2] += tamanho
+        parcial[3] += ms
+
+    def linhas(self):
+        """Uma linha por (operação, coleção), as mais lentas primeiro"""
+        return sorted(
+            (
+                {'operacao': op, 'colecao': colecao, 'chamadas': c, 'documentos': d, 'bytes': b, 'ms': round(ms, 1)}
+                for (op, colecao), (c, d, b, ms) in self.por_operacao.items()
+            ),
+            key=lambda linha: linha['ms'], reverse=True
+        )
+
+
+class Instrumentacao:
+    """Totais por rerun, por sessão e do processo"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.processo = Totais()
+        self._sessoes = OrderedDict()  # sessao_id -> {'rerun': Totais, 'sessao': Totais}
+
+    def registrar(self, operacao, colecao, documentos=0, tamanho=0, ms=0.0, sessao_id=None):
+        with self._lock:
+            self.processo.somar(operacao, colecao, documentos, tamanho, ms)
+            if sessao_id is not None:
+                sessao = self._sessao(sessao_id)
+                sessao['rerun'].somar(operacao, colecao, documentos, tamanho, ms)
+                sessao['sessao'].somar(operacao, colecao, documentos, tamanho, ms)
+        logger.info(json.dumps({
+            'operacao': operacao, 'colecao': colecao, 'documentos': documentos,
+            'bytes': tamanho, 'ms': round(ms, 2), 'sessao': sessao_id,
+        }))
+
+    def iniciar_rerun(self, sessao_id):
+        with self._lock:
+            self._sessao(sessao_id)['rerun'] = Totais()
+
+    def totais(self, sessao_id):
+        """
+        Returns:
+            tuple: (Totais do rerun, Totais da sessão)
+        """
+        with self._lock:
+            sessao = self._sessao(sessao_id)
+            return sessao['rerun'], sessao['sessao']
+
+    def _sessao(self, sessao_id):
+        if sessao_id not in self._sessoes:
+            self._sessoes[sessao_id] = {'rerun': Totais(), 'sessao': Totais()}
+            while len(self._sessoes) > MAX_SESSOES:
+                self._sessoes.popitem(last=False)
+        self._sessoes.move_to_end(sessao_id)
+        return self._sessoes[sessao_id]
+
+
+@st.cache_resource
+def get_instrumentacao():
+    """Instrumentação compartilhada pelo processo"""
+    return Instrumentacao()
+
+
+def sessao_atual():
+    """Id da sessão do Streamlit da thread atual (None em threads de fundo)"""
+    from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None:
+        return None
+    if CHAVE_SESSAO in ctx.session_state:
+        return ctx.session_state[CHAVE_SESSAO]
+    return ctx.session_id
+
+
+def tamanho(valor):
+    """Bytes aproximados do valor serializado (como trafega em JSON)"""
+    try:
+        return len(json.dumps(valor, default=str, separators=(',', ':')))
+    except (TypeError, ValueError):
+        return 0
+
+
+def documentos_lidos(operacao, resultado):
+    if operacao == 'agregar':
+        return 1
+    if isinstance(resultado, list):
+        return len(resultado)
+    return 1 if resultado else 0
+
+
+def documentos_escritos(operacao, args):
+    if operacao == 'executar_lote':
+        return len(args[0])
+    # definir_se_inalterado lê e grava o documento na transação
+    return 2 if operacao == 'definir_se_inalterado' else 1
+
+
+def colecao_da_chamada(operacao, args):
+    if operacao == 'executar_lote':
+        return ','.join(sorted({op[1] for op in args[0]}))
+    return args[0] if args and isinstance(args[0], str) else ''
+
+
+@contextmanager
+def medindo(operacao, colecao, documentos=1, tamanho=0):
+    """Mede um bloco (ex.: um upload no Storage); não faz nada se desativada"""
+    if not instrumentacao_ativa():
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        get_instrumentacao().registrar(
+            operacao, colecao, documentos, tamanho, (time.perf_counter() - inicio) * 1000, sessao_atual()
+        )
+
+
+class BackendInstrumentado:
+    """Embrulha um backend (Firestore ou SQLite) e registra cada chamada"""
+
+    def __init__(self, backend, instrumentacao):
+        self.backend = backend
+        self.instrumentacao = instrumentacao
+
+    def __getattr__(self, nome):
+        atributo = getattr(self.backend, nome)
+        if nome.startswith('_') or not callable(atributo):
+            return atributo
+        if nome == 'assinar':
+            return self._assinar
+
+        def medido(*args, **kwargs):
+            inicio = time.perf_counter()
+            resultado = atributo(*args, **kwargs)
+            ms = (time.perf_counter() - inicio) * 1000
+            if nome in ESCRITAS:
+                documentos = documentos_escritos(nome, args)
+                enviado = tamanho(args[1:] if nome != 'executar_lote' else args[0])
+            else:
+                documentos = documentos_lidos(nome, resultado)
+                enviado = tamanho(resultado)
+            self.instrumentacao.registrar(
+                nome, colecao_da_chamada(nome, args), documentos, enviado, ms, sessao_atual()
+            )
+            return resultado
+
+        return medido
+
+    def _assinar(self, colecao, filtros, callback):
+        """Listener: cada snapshot conta os documentos alterados"""
+        def medido(docs, changes, read_time):
+            inicio = time.perf_counter()
+            callback(docs, changes, read_time)
+            self.instrumentacao.registrar(
+                'snapshot', colecao, len(changes), 0, (time.perf_counter() - inicio) * 1000
+            )
+        return self.backend.assinar(colecao, filtros, medido)
+
+
+def iniciar_rerun():
+    """Zera os totais do rerun da sessão atual (chame no topo da página)"""
+    if instrumentacao_ativa():
+        sessao_id = sessao_atual()
+        if sessao_id is not None:
+            get_instrumentacao().iniciar_rerun(sessao_id)
+
+
+def painel_debug():
+    """Totais do rerun e da sessão na barra lateral (chame no fim da página)"""
+    if not instrumentacao_ativa():
+        return
+    if os.getenv("RST_PAINEL_DEBUG", "0") != "1" and st.query_params.get("debug") != "1":
+        return
+    sessao_id = sessao_atual()
+    if sessao_id is None:
+        return
+    rerun, sessao = get_instrumentacao().totais(sessao_id)
+    with st.sidebar.expander("🔧 Banco de dados (debug)"):
+        st.markdown(
+            f"**Este rerun:** {rerun.chamadas} chamadas · {rerun.documentos} docs · "
+            f"{rerun.bytes/1024:.1f} KB · {rerun.ms:.0f} ms"
+        )
+        st.markdown(
+            f"**Sessão:** {sessao.chamadas} chamadas · {sessao.documentos} docs · "
+            f"{sessao.bytes/1024:.1f} KB · {sessao.ms:.0f} ms"
+        )
+        if rerun.por_operacao:
+            st.dataframe(rerun.linhas(), hide_index=True)
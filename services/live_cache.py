@@ -0,0 +1,152 @@
+"""
+Cache ao vivo alimentado por listeners on_snapshot do Firestore
+
+Um único objeto por processo (st.cache_resource) mantém listeners nas
+consultas do mês corrente de custos_contabeis e vendas e na coleção
+fornecedores. Cada alteração recebida (ADDED/MODIFIED/REMOVED) é aplicada
+em tabelas em memória, então as leituras das páginas não fazem nenhuma
+chamada ao Firestore, independentemente de quantas sessões estão abertas.
+
+Backends sem suporte a listeners (SQLite) simplesmente não usam o cache ao
+vivo; desative-o também com RST_CACHE_AO_VIVO=0.
+"""
+
+import copy
+import logging
+import os
+import threading
+from datetime import datetime
+
+import streamlit as st
+
+from services.repository import get_backend
+
+# coleção -> (campo do filtro do mês, campo de ordenação, decrescente)
+logger = logging.getLogger(__name__)
+
+CONSULTAS = {
+    'custos_contabeis': ('data', 'data', True),
+    'vendas': ('data_venda', 'data_venda', True),
+    'fornecedores': (None, 'nome', False),
+}
+
+
+class TabelaAoVivo:
+    """Documentos de uma consulta, atualizados pelas mudanças do listener"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documentos = {}
+        self.pronta = False  # True após o primeiro snapshot
+        self.atualizada_em = None
+
+    def aplicar(self, docs, changes, read_time):
+        """Callback do on_snapshot: aplica apenas as mudanças recebidas"""
+        with self._lock:
+            for change in changes:
+                doc = change.document
+                if change.type.name == 'REMOVED':
+                    self._documentos.pop(doc.id, None)
+                else:
+                    data = doc.to_dict()
+                    data['id'] = doc.id
+                    self._documentos[doc.id] = data
+            self.pronta = True
+            self.atualizada_em = datetime.now()
+
+    def documentos(self):
+        with self._lock:
+            return [copy.deepcopy(d) for d in self._documentos.values()]
+
+
+class CacheAoVivo:
+    """Gerencia os listeners e as tabelas em memória de cada coleção"""
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._assinaturas = {}  # coleção -> (inicio_mes, watch, tabela)
+
+    def documentos(self, colecao, inicio_mes=None):
+        """
+        Retorna os documentos da coleção a partir da memória
+
+        Args:
+            colecao: 'custos_contabeis', 'vendas' ou 'fornecedores'
+            inicio_mes: Data inicial (YYYY-MM-DD) para coleções filtradas por mês
+
+        Returns:
+            list | None: None enquanto o primeiro snapshot não chegou
+        """
+        campo_filtro, campo_ordem, decrescente = CONSULTAS[colecao]
+        if campo_filtro is None:
+            inicio_mes = None
+
+        tabela = self._assinar(colecao, campo_filtro, inicio_mes)
+        if not tabela.pronta:
+            return None
+
+        return sorted(
+            tabela.documentos(),
+            key=lambda d: d.get(campo_ordem, ''),
+            reverse=decrescente
+        )
+
+    def encerrar(self):
+        """Cancela todos os listeners"""
+        with self._lock:
+            for _, watch, _ in self._assinaturas.values():
+                watch.unsubscribe()
+            self._assinaturas.clear()
+
+    def _assinar(self, colecao, campo_filtro, inicio_mes):
+        with self._lock:
+            assinatura = self._assinaturas.get(colecao)
+            # Reaproveita o listener se o mês é o mesmo e a conexão segue ativa
+            if assinatura and assinatura[0] == inicio_mes and assinatura[1].is_active:
+                return assinatura[2]
+
+            if assinatura:
+                assinatura[1].unsubscribe()
+
+            filtros = [(campo_filtro, '>=', inicio_mes)] if campo_filtro else []
+            tabela = TabelaAoVivo()
+            watch = self.backend.assinar(colecao, filtros, tabela.aplicar)
+            self._assinaturas[colecao] = (inicio_mes, watch, tabela)
+            return tabela
+
+
+@st.cache_resource
+def get_cache_ao_vivo():
+    """
+    Cache ao vivo compartilhado pelo processo
+
+    Returns:
+        CacheAoVivo | None: None se desativado ou se o backend não tem listeners
+    """
+    if os.getenv("RST_CACHE_AO_VIVO", "1") == "0":
+        return None
+    backend = get_backend()
+    if backend is None or not hasattr(backend, 'assinar'):
+        return None
+    return CacheAoVivo(backend)
+
+
+def ler_ao_vivo(colecao, inicio_mes=None):
+    """
+    Lê uma coleção do cache ao vivo
+
+    Returns:
+        list | None: None quando o cache ao vivo não está disponível ou pronto;
+        nesse caso a página usa a leitura sincronizada normal
+    """
+    cache = get_cache_ao_vivo()
+    if cache is None:
+        return None
+    try:
+        return cache.documentos(colecao, inicio_mes)
+    except Exception:
+        # Listener quebrado ou sem permissão: a página segue com a leitura
+        # normal, mas a falha fica registrada
+        logger.exception("Cache ao vivo indisponível para %s (%s)", colecao, inicio_mes)
+        return None
@@ -0,0 +1,264 @@
+"""
+Importação de NF-e (XML) de fornecedores
+
+Lê o XML da nota com um parser incremental (iterparse), item a item, e
+descarta cada <det> depois de convertido; um arquivo grande ou um .zip com
+centenas de notas é processado com memória constante.
+
+Cada NF-e:
+- tem o emitente (CNPJ/CPF) associado ao fornecedor pela chave única de
+  fornecedores_chaves, cadastrando-o se ainda não existe (opcional);
+- vira uma linha de custos_contabeis por item (<det>), com quantidade,
+  unidade e valor unitário da nota, numero_nf e a chave de acesso.
+
+A gravação usa os mesmos lotes retomáveis da importação de planilhas
+(services.importacao.gravar_em_lotes).
+"""
+
+import zipfile
+from datetime import datetime
+from xml.etree.ElementTree import ParseError, iterparse
+
+from services.busca import so_digitos
+from services.categorias import CATEGORIAS_POR_TIPO, UNIDADES_MEDIDA
+from services.importacao import gravar_em_lotes, hash_arquivo
+from services.repository import FornecedorDuplicado
+
+# Unidade comercial da NF-e (uCom) -> unidade do app
+UNIDADES_NFE = {
+    'UND': 'UN', 'UNID': 'UN', 'UNIDADE': 'UN', 'UN': 'UN',
+    'KG': 'KG', 'KGS': 'KG', 'QUILO': 'KG',
+    'L': 'L', 'LT': 'L', 'LTS': 'L', 'LITRO': 'L',
+    'M': 'M', 'MT': 'M', 'MTS': 'M',
+    'M2': 'M²', 'M²': 'M²', 'M3': 'M³', 'M³': 'M³',
+    'T': 'T', 'TON': 'T', 'TN': 'T',
+    'SC': 'SC', 'SACO': 'SC', 'SC50': 'SC',
+    'CX': 'CX', 'CAIXA': 'CX',
+    'PC': 'PC', 'PCA': 'PC', 'PECA': 'PC',
+}
+
+
+def local(tag):
+    """Nome da tag sem o namespace do portal fiscal"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def filho(elemento, nome):
+    """Texto do primeiro filho com o nome local dado, ou ''"""
+    for item in elemento:
+        if local(item.tag) == nome:
+            return (item.text or '').strip()
+    return ''
+
+
+def unidade_app(unidade_nfe):
+    """Converte a uCom da nota; unidades desconhecidas viram UN"""
+    unidade = UNIDADES_NFE.get(unidade_nfe.strip().upper(), unidade_nfe.strip().upper())
+    return unidade if unidade in UNIDADES_MEDIDA else 'UN'
+
+
+def arquivos_xml(arquivo, nome_arquivo):
+    """
+    XMLs de um upload, sem extrair o .zip para a memória
+
+    Yields:
+        tuple: (nome do XML, arquivo binário)
+    """
+    if nome_arquivo.lower().endswith('.zip'):
+        with zipfile.ZipFile(arquivo) as pacote:
+            for info in pacote.infolist():
+                if not info.is_dir() and info.filename.lower().endswith('.xml'):
+                    with pacote.open(info) as xml:
+                        yield info.filename, xml
+    else:
+        yield nome_arquivo, arquivo
+
+
+def itens_nfe(xml):
+    """
+    Itens das NF-e de um XML (nfeProc, NFe ou vários NFe), um por vez
+
+    Yields:
+        dict: Dados da nota (chave, numero_nf, data, emitente_documento,
+        emitente_nome, emitente_telefone) e do item (item, codigo,
+        descricao, unidade, quantidade, valor_unitario, valor)
+    """
+    nota = {}
+    for evento, elemento in iterparse(xml, events=('start', 'end')):
+        tag = local(elemento.tag)
+        if evento == 'start':
+            if tag == 'infNFe':
+                nota = {'chave': so_digitos(elemento.get('Id', ''))}
+            continue
+
+        if tag == 'ide':
+            nota['numero_nf'] = filho(elemento, 'nNF')
+            nota['data'] = (filho(elemento, 'dhEmi') or filho(elemento, 'dEmi'))[:10]
+        elif tag == 'emit':
+            nota['emitente_documento'] = filho(elemento, 'CNPJ') or filho(elemento, 'CPF')
+            nota['emitente_nome'] = filho(elemento, 'xNome')
+            for endereco in elemento:
+                if local(endereco.tag) == 'enderEmit':
+                    nota['emitente_telefone'] = filho(endereco, 'fone')
+            elemento.clear()
+        elif tag == 'det':
+            produto = next((p for p in elemento if local(p.tag) == 'prod'), None)
+            if produto is not None:
+                yield {
+                    **nota,
+                    'item': elemento.get('nItem', ''),
+                    'codigo': filho(produto, 'cProd'),
+                    'descricao': filho(produto, 'xProd'),
+                    'unidade': filho(produto, 'uCom'),
+                    'quantidade': filho(produto, 'qCom'),
+                    'valor_unitario': filho(produto, 'vUnCom'),
+                    'valor': filho(produto, 'vProd'),
+                }
+            # O item já foi convertido: libera a memória dele
+            elemento.clear()
+        elif tag in ('infNFe', 'NFe', 'nfeProc'):
+            elemento.clear()
+
+
+class FornecedoresNFe:
+    """Resolve o emitente da nota para um fornecedor, uma vez por CNPJ/CPF"""
+
+    def __init__(self, repos, cadastrar=True):
+        self.repos = repos
+        self.cadastrar = cadastrar
+        self._por_documento = {}
+
+    def obter(self, nota):
+        """
+        Returns:
+            tuple: (fornecedor ou None, mensagem de erro ou None)
+        """
+        documento = so_digitos(nota.get('emitente_documento', ''))
+        if not documento:
+            return None, "NF-e sem CNPJ/CPF do emitente"
+        if documento not in self._por_documento:
+            self._por_documento[documento] = self._resolver(documento, nota)
+        return self._por_documento[documento]
+
+    def _resolver(self, documento, nota):
+        fornecedor = self.repos.fornecedores.obter_por_documento(documento)
+        if fornecedor is not None:
+            return fornecedor, None
+        if not self.cadastrar:
+            return None, f"Emitente {nota.get('emitente_nome', '')} ({documento}) não cadastrado"
+        dados = {
+            'nome': nota.get('emitente_nome') or documento,
+            'cnpj_cpf': documento,
+            'telefone': nota.get('emitente_telefone', ''),
+            'email': '',
+            'endereco': '',
+            'tipo_fornecedor': 'Outros',
+            'observacoes': 'Cadastrado pela importação de NF-e',
+            'ativo': True,
+            'data_cadastro': datetime.now().isoformat(),
+            'app_version': 'RST_v2.3'
+        }
+        try:
+            dados['id'] = self.repos.fornecedores.adicionar(dados)
+        except FornecedorDuplicado:
+            return None, f"Já existe outro fornecedor com o nome '{dados['nome']}' e outro CNPJ/CPF"
+        return dados, None
+
+
+def custo_do_item(item, fornecedor, tipo_custo, categoria):
+    """
+    Linha de custos_contabeis para um item da nota
+
+    Returns:
+        tuple: (custo_data ou None, lista de erros)
+    """
+    erros = []
+    try:
+        quantidade = float(item['quantidade'])
+        valor_unitario = float(item['valor_unitario'])
+        valor = float(item['valor']) if item['valor'] else quantidade * valor_unitario
+    except ValueError:
+        return None, ["Quantidade ou valor inválido no item"]
+    if quantidade <= 0 or valor <= 0:
+        erros.append("Item com quantidade ou valor zerado")
+    if not item.get('data'):
+        erros.append("NF-e sem data de emissão")
+    if erros:
+        return None, erros
+
+    unidade = unidade_app(item['unidade'])
+    observacoes = f"NF-e {item['chave']} item {item['item']}"
+    if unidade == 'UN' and item['unidade'].strip().upper() not in ('UN', 'UND', 'UNID', 'UNIDADE'):
+        observacoes += f" (unidade na nota: {item['unidade']})"
+
+    custo_data = {
+        'data': item['data'],
+        'tipo_custo': tipo_custo,
+        'categoria': categoria,
+        'categoria_nome': CATEGORIAS_POR_TIPO[tipo_custo][categoria],
+        'descricao_item': item['descricao'],
+        'quantidade': quantidade,
+        'unidade_medida': unidade,
+        'valor_unitario': valor_unitario,
+        # vProd é o total do item na nota (quantidade × valor unitário,
+        # arredondado pelo emissor)
+        'valor': valor,
+        'fornecedor': fornecedor['nome'],
+        'fornecedor_id': fornecedor['id'],
+        'numero_nf': item['numero_nf'],
+        'chave_nfe': item['chave'],
+        'imagem_nf_url': '',
+        'tem_nota_fiscal': True,
+        'observacoes': observacoes,
+        'timestamp': datetime.now().isoformat(),
+        'app_version': 'RST_v2.3'
+    }
+    if tipo_custo == 'Investimentos':
+        custo_data.update({
+            'vida_util_meses': 12,
+            'depreciacao_mensal': valor / 12,
+            'roi_calculado': False
+        })
+    return custo_data, []
+
+
+def importar_nfe(repos, arquivo, nome_arquivo, tipo_custo, categoria, cadastrar_fornecedores=True, progresso=None):
+    """
+    Importa um XML de NF-e ou um .zip de XMLs como linhas de custo
+
+    Args:
+        repos: Repositorios (services.repository)
+        arquivo: Arquivo binário (.xml ou .zip)
+        nome_arquivo: Nome original do arquivo
+        tipo_custo: Classificação contábil aplicada aos itens
+        categoria: Chave da categoria (de CATEGORIAS_POR_TIPO[tipo_custo])
+        cadastrar_fornecedores: Cadastra emitentes ainda não cadastrados
+        progresso: Função chamada com o ResultadoImportacao após cada lote
+
+    Returns:
+        ResultadoImportacao: erros com 'linha' = posição do item no arquivo
+    """
+    if categoria not in CATEGORIAS_POR_TIPO[tipo_custo]:
+        raise ValueError(f"Categoria '{categoria}' não existe em {tipo_custo}")
+    sha, _ = hash_arquivo(arquivo)
+    fornecedores = FornecedoresNFe(repos, cadastrar_fornecedores)
+
+    def itens():
+        posicao = 0
+        for nome_xml, xml in arquivos_xml(arquivo, nome_arquivo):
+            try:
+                for item in itens_nfe(xml):
+                    posicao += 1
+                    dados = {'arquivo': nome_xml, 'nf': item.get('numero_nf', ''),
+                             'item': item['item'], 'produto': item['descricao']}
+                    fornecedor, erro = fornecedores.obter(item)
+                    if erro:
+                        yield posicao, None, [erro], dados
+                        continue
+                    custo_data, erros = custo_do_item(item, fornecedor, tipo_custo, categoria)
+                    yield posicao, custo_data, erros, dados
+            except ParseError as e:
+                posicao += 1
+                yield posicao, None, [f"XML inválido: {e}"], {'arquivo': nome_xml}
+
+    return gravar_em_lotes(repos, itens(), f"nfe_{sha}", nome_arquivo, progresso=progresso)
@@ -0,0 +1,212 @@
+"""
+Cache em disco dos meses fechados e consultas por período
+
+Meses passados de custos_contabeis e vendas quase nunca mudam, então cada
+mês fechado é guardado uma única vez em um arquivo SQLite local, em uma
+partição por (coleção, YYYY-MM, visão). Só o mês corrente é lido do banco a
+cada vez; relatórios de vários meses passam a custar uma leitura por mês
+novo, e não uma por documento a cada abertura.
+
+A partição é descartada quando uma escrita toca o mês (invalidar) e também
+quando a versão do rollup do mês não bate com a guardada. Todo lote que
+escreve no mês muda essa versão (services/rollups.py), o que cobre escritas
+feitas por outra instância do app, inclusive updates que não mudam os totais.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import streamlit as st
+
+# coleção -> (atributo em Repositorios, campo de data)
+PARTICIONADAS = {
+    'custos_contabeis': ('custos', 'data'),
+    'vendas': ('vendas', 'data_venda'),
+}
+
+# Leituras de meses em paralelo em uma consulta de período
+MAX_LEITURAS_PARALELAS = 6
+
+
+def meses_do_intervalo(inicio, fim):
+    """
+    Meses (YYYY-MM) cobertos por um período
+
+    Args:
+        inicio: Data inicial YYYY-MM-DD
+        fim: Data final YYYY-MM-DD (inclusiva)
+    """
+    ano, mes = int(inicio[:4]), int(inicio[5:7])
+    meses = []
+    while f"{ano}-{mes:02d}" <= fim[:7]:
+        meses.append(f"{ano}-{mes:02d}")
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+    return meses
+
+
+def mes_fechado(mes):
+    """True se o mês (YYYY-MM) é anterior ao mês corrente"""
+    return mes < datetime.now().strftime("%Y-%m")
+
+
+class CacheParticoes:
+    """Partições mensais imutáveis em um arquivo SQLite"""
+
+    def __init__(self, caminho):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = None  # aberto na primeira gravação ou leitura
+
+    def obter(self, colecao, mes, visao):
+        """
+        Retorna a partição guardada
+
+        Returns:
+            tuple | None: (documentos, versao) ou None se não existe
+        """
+        with self._lock:
+            conn = self._conectar(criar=False)
+            if conn is None:
+                return None
+            row = conn.execute(
+                "SELECT dados, versao FROM particoes WHERE colecao = ? AND mes = ? AND visao = ?",
+                (colecao, mes, visao)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def gravar(self, colecao, mes, visao, documentos, versao):
+        """Guarda os documentos de um mês fechado com a versão do rollup lida antes deles"""
+        with self._lock:
+            conn = self._conectar(criar=True)
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO particoes (colecao, mes, visao, dados, versao, gravado_em) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (colecao, mes, visao, json.dumps(documentos, ensure_ascii=False),
+                     versao, datetime.now().isoformat())
+                )
+
+    def invalidar(self, colecao, mes=None):
+        """Descarta as partições do mês (ou de todos os meses) de uma coleção"""
+        with self._lock:
+            conn = self._conectar(criar=False)
+            if conn is None:
+                return
+            with conn:
+                if mes:
+                    conn.execute("DELETE FROM particoes WHERE colecao = ? AND mes = ?", (colecao, mes))
+                else:
+                    conn.execute("DELETE FROM particoes WHERE colecao = ?", (colecao,))
+
+    def _conectar(self, criar):
+        if self._conn is None:
+            # Sem arquivo ainda não há o que ler nem invalidar
+            if not criar and self.caminho != ':memory:' and not os.path.exists(self.caminho):
+                return None
+            pasta = os.path.dirname(self.caminho)
+            if pasta:
+                os.makedirs(pasta, exist_ok=True)
+            self._conn = sqlite3.connect(self.caminho, check_same_thread=False)
+            colunas = {row[1] for row in self._conn.execute("PRAGMA table_info(particoes)")}
+            if colunas and 'versao' not in colunas:
+                # Arquivo do formato anterior (validado por 'registros'): é só cache
+                self._conn.execute("DROP TABLE particoes")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS particoes ("
+                "colecao TEXT NOT NULL, mes TEXT NOT NULL, visao TEXT NOT NULL, "
+                "dados TEXT NOT NULL, versao INTEGER, gravado_em TEXT, "
+                "PRIMARY KEY (colecao, mes, visao))"
+            )
+        return self._conn
+
+
+@st.cache_resource
+def get_cache_particoes():
+    """Cache de partições do processo (arquivo em RST_CACHE_PARTICOES)"""
+    return CacheParticoes(os.getenv("RST_CACHE_PARTICOES", os.path.join(".rst_cache", "particoes.db")))
+
+
+def documentos_mes(repos, colecao, mes, visao='tabela', cache=None):
+    """
+    Documentos de um mês, do disco se o mês está fechado e já foi lido
+
+    Args:
+        repos: Repositorios (services.repository)
+        colecao: 'custos_contabeis' ou 'vendas'
+        mes: Mês no formato YYYY-MM
+        visao: Projeção de campos (ver PROJECOES)
+        cache: CacheParticoes; padrão é o do processo
+
+    Returns:
+        list: Documentos do mês, mais recentes primeiro
+    """
+    from services.repository import projecao
+
+    atributo, campo_data = PARTICIONADAS[colecao]
+    repositorio = getattr(repos, atributo)
+    if not mes_fechado(mes):
+        return repositorio.listar_periodo(mes, visao=visao)
+
+    cache = cache or get_cache_particoes()
+    # O rollup custa um documento e denuncia escritas de outras instâncias
+    campos = projecao(colecao, visao)
+    versao, recalculados = repos.rollups.versao(colecao, mes, campos)
+    guardado = cache.obter(colecao, mes, visao)
+    if versao is not None and guardado is not None and guardado[1] == versao:
+        return guardado[0]
+
+    if recalculados is None:
+        documentos = repositorio.listar_periodo(mes, visao=visao)
+    else:
+        # O recálculo do rollup já leu o mês (com os campos da visão)
+        documentos = [
+            d if campos is None else {c: d[c] for c in ['id', *campos] if c in d}
+            for d in sorted(recalculados, key=lambda d: d.get(campo_data, ''), reverse=True)
+        ]
+    if versao is not None:
+        cache.gravar(colecao, mes, visao, documentos, versao)
+    return documentos
+
+
+def documentos_periodo(repos, colecao, inicio, fim, visao='tabela', cache=None):
+    """
+    Documentos de um período qualquer, montado a partir das partições mensais
+
+    Os meses que faltam no disco são lidos em paralelo, então um trimestre
+    ou um ano custa aproximadamente o tempo de um mês.
+
+    Args:
+        repos: Repositorios (services.repository)
+        colecao: 'custos_contabeis' ou 'vendas'
+        inicio: Data inicial YYYY-MM-DD
+        fim: Data final YYYY-MM-DD (inclusiva)
+        visao: Projeção de campos (ver PROJECOES)
+        cache: CacheParticoes; padrão é o do processo
+
+    Returns:
+        list: Documentos do período, mais recentes primeiro
+    """
+    campo_data = PARTICIONADAS[colecao][1]
+    meses = meses_do_intervalo(inicio, fim)
+    if not meses:
+        return []
+
+    # Resolvido aqui: as threads não têm contexto do Streamlit
+    cache = cache or get_cache_particoes()
+    with ThreadPoolExecutor(max_workers=min(MAX_LEITURAS_PARALELAS, len(meses))) as executor:
+        por_mes = list(executor.map(
+            lambda mes: documentos_mes(repos, colecao, mes, visao, cache), meses
+        ))
+
+    documentos = [
+        doc for docs in por_mes for doc in docs
+        if inicio <= doc.get(campo_data, '')[:10] <= fim
+    ]
+    documentos.sort(key=lambda d: d.get(campo_data, ''), reverse=True)
+    return documentos
@@ -0,0 +1,1190 @@
+"""
+Camada de acesso a dados do RST
+
+Centraliza todas as leituras e escritas das coleções usadas pelas páginas
+(custos_contabeis, vendas, fornecedores). As páginas falam apenas com os
+repositórios; os repositórios falam com um backend, que pode ser o
+Firestore (produção) ou um arquivo SQLite local (desenvolvimento offline,
+testes de volume).
+
+Selecione o backend com a variável de ambiente RST_BACKEND:
+    RST_BACKEND=firestore   (padrão) usa init_firebase()
+    RST_BACKEND=sqlite      usa o arquivo em RST_SQLITE_PATH (padrão: rst_local.db)
+
+Com RST_INSTRUMENTACAO=1 as chamadas ao backend são medidas
+(services/instrumentacao.py).
+"""
+
+import json
+import os
+import random
+import sqlite3
+import threading
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import streamlit as st
+
+from services.busca import normalizar, so_digitos
+from services.cache import invalidar
+from services.rollups import (
+    RollupsRepository,
+    agrupar_incrementos,
+    incremento_versao,
+    incrementos_custo,
+    incrementos_mudanca_status,
+    incrementos_venda,
+    intervalo_mes,
+)
+
+# Nomes das coleções
+COLECAO_CUSTOS = 'custos_contabeis'
+COLECAO_VENDAS = 'vendas'
+COLECAO_FORNECEDORES = 'fornecedores'
+# Máximo de operações em um WriteBatch do Firestore
+MAX_OPERACOES_LOTE = 500
+# Contadores transacionais (ex.: sequência do numero_venda)
+COLECAO_CONTADORES = 'contadores'
+# Documentos de contador do numero_venda; aumente se houver mais de uma
+# venda por segundo de forma sustentada (limite de escrita por documento)
+FRAGMENTOS_SEQUENCIA_VENDAS = 1
+# Chaves únicas dos fornecedores (nome normalizado e CNPJ/CPF) -> id do fornecedor
+COLECAO_CHAVES_FORNECEDORES = 'fornecedores_chaves'
+# Arquivos de notas fiscais já enviados: SHA-256 do conteúdo -> URLs no Storage
+COLECAO_ARQUIVOS_NF = 'arquivos_nf'
+
+
+class DocumentoJaExiste(ValueError):
+    """Uma operação 'criar' do lote encontrou o documento já gravado"""
+
+
+class FornecedorDuplicado(ValueError):
+    """Já existe fornecedor com o mesmo nome normalizado ou CNPJ/CPF"""
+
+# Projeções de campos por visão; None traz o documento completo.
+# 'ultima_atualizacao' entra nas visões usadas pela sincronização incremental.
+PROJECOES = {
+    COLECAO_CUSTOS: {
+        'resumo': ['data', 'tipo_custo', 'valor', 'depreciacao_mensal', 'ultima_atualizacao'],
+        'tabela': [
+            'data', 'tipo_custo', 'categoria_nome', 'descricao_item', 'quantidade',
+            'unidade_medida', 'valor_unitario', 'valor', 'depreciacao_mensal',
+            'fornecedor', 'numero_nf', 'tem_nota_fiscal', 'observacoes', 'ultima_atualizacao',
+        ],
+        'historico': ['data', 'categoria_nome', 'descricao_item', 'valor'],
+        'detalhe': None,
+    },
+    COLECAO_VENDAS: {
+        'resumo': ['data_venda', 'status_recebimento', 'valor_total', 'produtos', 'ultima_atualizacao'],
+        'tabela': [
+            'numero_venda', 'data_venda', 'nome_cliente', 'telefone_cliente', 'modalidade_venda',
+            'tipo_pagamento', 'status_recebimento', 'valor_total', 'produtos', 'acerto_consumo',
+            'ultima_atualizacao',
+        ],
+        'detalhe': None,
+    },
+    COLECAO_FORNECEDORES: {
+        'resumo': ['nome', 'tipo_fornecedor', 'telefone', 'cnpj_cpf', 'ativo'],
+        'tabela': [
+            'nome', 'tipo_fornecedor', 'telefone', 'cnpj_cpf', 'email', 'ativo',
+            'data_cadastro', 'observacoes',
+        ],
+        'detalhe': None,
+    },
+}
+
+
+def projecao(colecao, visao):
+    """Campos da visão ('resumo', 'tabela', 'detalhe'...) de uma coleção"""
+    return PROJECOES[colecao][visao]
+
+
+# Operadores aceitos nos filtros (mesma notação do Firestore)
+OPERADORES = {
+    '==': '=',
+    '!=': '!=',
+    '<': '<',
+    '<=': '<=',
+    '>': '>',
+    '>=': '>=',
+    'in': 'IN',
+}
+
+
+def paginar_documentos(documentos, ordem, tamanho, apos=None, decrescente=True):
+    """
+    Página de documentos já carregados, com o mesmo cursor do backend
+
+    Args:
+        documentos: Documentos com 'id' e o campo de ordenação
+        ordem: Campo de ordenação
+        tamanho: Documentos por página
+        apos: Cursor (valor de ordem, id) do último documento da página anterior
+        decrescente: Ordem decrescente (mais recentes primeiro)
+
+    Returns:
+        tuple: (documentos da página, cursor da próxima página ou None)
+    """
+    ordenados = sorted(documentos, key=lambda d: (d.get(ordem, ''), d['id']), reverse=decrescente)
+    if apos is not None:
+        apos = tuple(apos)
+        if decrescente:
+            ordenados = [d for d in ordenados if (d.get(ordem, ''), d['id']) < apos]
+        else:
+            ordenados = [d for d in ordenados if (d.get(ordem, ''), d['id']) > apos]
+    return fechar_pagina(ordenados[:tamanho + 1], ordem, tamanho)
+
+
+def fechar_pagina(documentos, ordem, tamanho):
+    """Separa a página do documento extra lido para saber se há uma próxima"""
+    if len(documentos) <= tamanho:
+        return documentos, None
+    pagina = documentos[:tamanho]
+    return pagina, (pagina[-1].get(ordem, ''), pagina[-1]['id'])
+
+
+def valor_inicial(inicial):
+    """Valor inicial de um contador, chamando-o se for uma função"""
+    return inicial() if callable(inicial) else inicial
+
+
+def agregar_documentos(documentos, agregacoes):
+    """
+    Calcula agregações em Python sobre documentos já carregados
+
+    Usado quando o servidor não oferece a agregação; mesma semântica do
+    Firestore: sum ignora valores não numéricos e avg de nada é None.
+    """
+    resultado = {}
+    for alias, (funcao, campo) in agregacoes.items():
+        if funcao == 'count':
+            resultado[alias] = len(documentos)
+            continue
+        valores = [
+            d[campo] for d in documentos
+            if isinstance(d.get(campo), (int, float)) and not isinstance(d.get(campo), bool)
+        ]
+        if funcao == 'sum':
+            resultado[alias] = sum(valores)
+        elif funcao == 'avg':
+            resultado[alias] = sum(valores) / len(valores) if valores else None
+        else:
+            raise ValueError(f"Agregação não suportada: {funcao}")
+    return resultado
+
+
+class FirestoreBackend:
+    """Backend que executa as consultas no Cloud Firestore"""
+
+    def __init__(self, db):
+        self.db = db
+
+    def listar(self, colecao, filtros=None, ordem=None, direcao='ASCENDING', limite=None, campos=None):
+        """
+        Lista documentos de uma coleção
+
+        Args:
+            colecao: Nome da coleção
+            filtros: Lista de tuplas (campo, operador, valor)
+            ordem: Campo usado na ordenação
+            direcao: 'ASCENDING' ou 'DESCENDING'
+            limite: Número máximo de documentos
+            campos: Projeção (select); None traz todos os campos
+
+        Returns:
+            list: Documentos como dicts, com a chave 'id'
+        """
+        query = self.db.collection(colecao)
+        for campo, operador, valor in filtros or []:
+            query = query.where(campo, operador, valor)
+        if campos is not None:
+            query = query.select(campos)
+        if ordem:
+            query = query.order_by(ordem, direction=direcao)
+        if limite:
+            query = query.limit(limite)
+
+        documentos = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            data['id'] = doc.id
+            documentos.append(data)
+        return documentos
+
+    def pagina(self, colecao, filtros, ordem, direcao, limite, apos=None, campos=None):
+        """
+        Lista uma página com cursor (start_after) em vez de offset
+
+        A ordenação tem o id do documento como desempate, então o cursor
+        (valor de ordem, id) é estável mesmo com vários documentos no mesmo dia.
+
+        Args:
+            colecao: Nome da coleção
+            filtros: Lista de tuplas (campo, operador, valor)
+            ordem: Campo usado na ordenação
+            direcao: 'ASCENDING' ou 'DESCENDING'
+            limite: Número máximo de documentos
+            apos: Cursor (valor de ordem, id) do último documento já exibido
+            campos: Projeção (select); None traz todos os campos
+
+        Returns:
+            list: Documentos como dicts, com a chave 'id'
+        """
+        query = self.db.collection(colecao)
+        for campo, operador, valor in filtros or []:
+            query = query.where(campo, operador, valor)
+        if campos is not None:
+            query = query.select(campos)
+        query = query.order_by(ordem, direction=direcao).order_by('__name__', direction=direcao)
+        if apos is not None:
+            query = query.start_after({ordem: apos[0], '__name__': apos[1]})
+        query = query.limit(limite)
+
+        documentos = []
+        for doc in query.stream():
+            data = doc.to_dict()
+            data['id'] = doc.id
+            documentos.append(data)
+        return documentos
+
+    def agregar(self, colecao, agregacoes, filtros=None):
+        """
+        Executa count()/sum()/avg() no servidor, sem baixar os documentos
+
+        Args:
+            colecao: Nome da coleção
+            agregacoes: Dict alias -> (função, campo), função em 'count', 'sum', 'avg'
+                (campo é ignorado em 'count'); no máximo 5 por consulta
+            filtros: Lista de tuplas (campo, operador, valor)
+
+        Returns:
+            dict: alias -> valor
+        """
+        query = self.db.collection(colecao)
+        for campo, operador, valor in filtros or []:
+            query = query.where(campo, operador, valor)
+
+        try:
+            consulta = query
+            for alias, (funcao, campo) in agregacoes.items():
+                if funcao == 'count':
+                    consulta = consulta.count(alias=alias)
+                else:
+                    consulta = getattr(consulta, funcao)(campo, alias=alias)
+        except AttributeError:
+            # Versões antigas do SDK não têm sum()/avg()
+            return agregar_documentos(self.listar(colecao, filtros), agregacoes)
+
+        resultado = {}
+        for linha in consulta.get():
+            for agregado in linha:
+                resultado[agregado.alias] = agregado.value
+        return resultado
+
+    def assinar(self, colecao, filtros, callback):
+        """
+        Registra um listener on_snapshot na consulta
+
+        Args:
+            colecao: Nome da coleção
+            filtros: Lista de tuplas (campo, operador, valor)
+            callback: Função (docs, changes, read_time) chamada a cada alteração
+
+        Returns:
+            Watch: Objeto do listener (use unsubscribe() para encerrar)
+        """
+        query = self.db.collection(colecao)
+        for campo, operador, valor in filtros or []:
+            query = query.where(campo, operador, valor)
+        return query.on_snapshot(callback)
+
+    def obter(self, colecao, doc_id):
+        """Retorna um documento pelo id ou None se não existir"""
+        doc = self.db.collection(colecao).document(doc_id).get()
+        if not doc.exists:
+            return None
+        data = doc.to_dict()
+        data['id'] = doc.id
+        return data
+
+    def adicionar(self, colecao, dados):
+        """Cria um documento e retorna o id gerado"""
+        doc_ref = self.db.collection(colecao).add(dados)
+        return doc_ref[1].id
+
+    def atualizar(self, colecao, doc_id, dados):
+        """Atualiza campos de um documento existente"""
+        self.db.collection(colecao).document(doc_id).update(dados)
+
+    def definir(self, colecao, doc_id, dados):
+        """Cria ou substitui um documento com id conhecido"""
+        self.db.collection(colecao).document(doc_id).set(dados)
+
+    def definir_se_inalterado(self, colecao, doc_id, anterior, dados):
+        """
+        Substitui um documento só se ele ainda estiver como foi lido
+
+        A comparação e a gravação acontecem numa transação: se outra escrita
+        (ex.: um incremento de rollup) tocar o documento no meio, o
+        Firestore repete a função, que então vê o valor novo e desiste.
+
+        Args:
+            colecao: Nome da coleção
+            doc_id: Id do documento
+            anterior: Conteúdo lido antes (sem 'id'), ou None se não existia
+            dados: Novo conteúdo
+
+        Returns:
+            bool: True se gravou, False se o documento mudou
+        """
+        from firebase_admin import firestore
+
+        ref = self.db.collection(colecao).document(doc_id)
+
+        @firestore.transactional
+        def substituir(transacao):
+            doc = ref.get(transaction=transacao)
+            if (doc.to_dict() if doc.exists else None) != anterior:
+                return False
+            transacao.set(ref, dados)
+            return True
+
+        return substituir(self.db.transaction())
+
+    def incrementar_contador(self, colecao, doc_id, inicial=0, passo=1):
+        """
+        Soma 'passo' ao campo 'valor' de um contador numa transação
+
+        Args:
+            colecao: Coleção dos contadores
+            doc_id: Id do contador
+            inicial: Valor assumido quando o contador ainda não existe (ou
+                função que o calcula, chamada só nesse caso)
+            passo: Quanto somar
+
+        Returns:
+            int: Valor do contador depois da soma (único entre chamadas concorrentes)
+        """
+        from firebase_admin import firestore
+
+        ref = self.db.collection(colecao).document(doc_id)
+
+        @firestore.transactional
+        def incrementar(transacao):
+            doc = ref.get(transaction=transacao)
+            valor = (doc.get('valor') if doc.exists else valor_inicial(inicial)) + passo
+            transacao.set(ref, {'valor': valor, 'atualizado_em': datetime.now().isoformat()})
+            return valor
+
+        return incrementar(self.db.transaction())
+
+    def executar_lote(self, operacoes):
+        """
+        Executa várias escritas de forma atômica (WriteBatch, máx. 500)
+
+        Args:
+            operacoes: Lista de tuplas
+                ('adicionar', colecao, dados)
+                ('definir', colecao, doc_id, dados)
+                ('atualizar', colecao, doc_id, dados)
+                ('incrementar', colecao, doc_id, {campo: delta})
+                ('criar', colecao, doc_id, dados)  falha o lote se o documento existe
+                ('excluir', colecao, doc_id)
+
+        Returns:
+            list: Id do documento de cada operação, na mesma ordem
+
+        Raises:
+            DocumentoJaExiste: Um 'criar' encontrou o documento; nada é gravado
+        """
+        from firebase_admin import firestore
+        from google.api_core.exceptions import AlreadyExists
+
+        batch = self.db.batch()
+        ids = []
+        for operacao in operacoes:
+            tipo, colecao = operacao[0], operacao[1]
+            if tipo == 'adicionar':
+                ref = self.db.collection(colecao).document()
+                batch.set(ref, operacao[2])
+            else:
+                ref = self.db.collection(colecao).document(operacao[2])
+                if tipo == 'definir':
+                    batch.set(ref, operacao[3])
+                elif tipo == 'atualizar':
+                    batch.update(ref, operacao[3])
+                elif tipo == 'incrementar':
+                    batch.set(ref, {
+                        campo: firestore.Increment(delta) for campo, delta in operacao[3].items()
+                    }, merge=True)
+                elif tipo == 'criar':
+                    batch.create(ref, operacao[3])
+                elif tipo == 'excluir':
+                    batch.delete(ref)
+                else:
+                    raise ValueError(f"Operação não suportada: {tipo}")
+            ids.append(ref.id)
+        try:
+            batch.commit()
+        except AlreadyExists as e:
+            raise DocumentoJaExiste(str(e)) from e
+        return ids
+
+
+class SQLiteBackend:
+    """
+    Backend local em SQLite com a mesma API do FirestoreBackend
+
+    Cada documento é guardado como JSON numa única tabela; os filtros e a
+    ordenação usam json_extract, então as consultas das páginas rodam sem
+    alterações contra um arquivo local.
+    """
+
+    def __init__(self, caminho=':memory:'):
+        self.caminho = caminho
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS documentos (
+                colecao TEXT NOT NULL,
+                id TEXT NOT NULL,
+                dados TEXT NOT NULL,
+                PRIMARY KEY (colecao, id)
+            )
+        """)
+        self._conn.commit()
+
+    def listar(self, colecao, filtros=None, ordem=None, direcao='ASCENDING', limite=None, campos=None):
+        """Lista documentos de uma coleção (mesma assinatura do Firestore)"""
+        where, params = self._where(colecao, filtros)
+        sql = f"SELECT id, dados FROM documentos WHERE {where}"
+
+        if ordem:
+            sql += f" ORDER BY json_extract(dados, ?) {'DESC' if direcao == 'DESCENDING' else 'ASC'}"
+            params.append(f'$.{ordem}')
+
+        if limite:
+            sql += " LIMIT ?"
+            params.append(int(limite))
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return self._decodificar(rows, campos)
+
+    def pagina(self, colecao, filtros, ordem, direcao, limite, apos=None, campos=None):
+        """Página com cursor (valor de ordem, id), mesma API do FirestoreBackend"""
+        where, params = self._where(colecao, filtros)
+        sentido = 'DESC' if direcao == 'DESCENDING' else 'ASC'
+        if apos is not None:
+            comparacao = '<' if sentido == 'DESC' else '>'
+            where += (f" AND (json_extract(dados, ?) {comparacao} ?"
+                      f" OR (json_extract(dados, ?) = ? AND id {comparacao} ?))")
+            params.extend([f'$.{ordem}', apos[0], f'$.{ordem}', apos[0], apos[1]])
+        sql = (f"SELECT id, dados FROM documentos WHERE {where}"
+               f" ORDER BY json_extract(dados, ?) {sentido}, id {sentido} LIMIT ?")
+        params.extend([f'$.{ordem}', int(limite)])
+
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return self._decodificar(rows, campos)
+
+    def agregar(self, colecao, agregacoes, filtros=None):
+        """Agregações em SQL (COUNT/SUM/AVG), mesma API do FirestoreBackend"""
+        colunas = []
+        params = []
+        for funcao, campo in agregacoes.values():
+            if funcao == 'count':
+                colunas.append("COUNT(*)")
+            elif funcao in ('sum', 'avg'):
+                # Como no Firestore, só valores numéricos entram na conta
+                colunas.append(
+                    f"{funcao.upper()}(CASE WHEN json_type(dados, ?) IN ('integer', 'real') "
+                    f"THEN json_extract(dados, ?) END)"
+                )
+                params.extend([f'$.{campo}', f'$.{campo}'])
+            else:
+                raise ValueError(f"Agregação não suportada: {funcao}")
+
+        where, params_where = self._where(colecao, filtros)
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(colunas)} FROM documentos WHERE {where}", params + params_where
+            ).fetchone()
+
+        resultado = {}
+        for (alias, (funcao, _)), valor in zip(agregacoes.items(), row):
+            resultado[alias] = 0 if funcao == 'sum' and valor is None else valor
+        return resultado
+
+    def obter(self, colecao, doc_id):
+        """Retorna um documento pelo id ou None se não existir"""
+        with self._lock:
+            data = self._ler(colecao, doc_id)
+        if data is None:
+            return None
+        data['id'] = doc_id
+        return data
+
+    def adicionar(self, colecao, dados):
+        """Cria um documento e retorna o id gerado"""
+        return self.executar_lote([('adicionar', colecao, dados)])[0]
+
+    def atualizar(self, colecao, doc_id, dados):
+        """Atualiza campos de um documento existente"""
+        self.executar_lote([('atualizar', colecao, doc_id, dados)])
+
+    def definir(self, colecao, doc_id, dados):
+        """Cria ou substitui um documento com id conhecido"""
+        self.executar_lote([('definir', colecao, doc_id, dados)])
+
+    def definir_se_inalterado(self, colecao, doc_id, anterior, dados):
+        """Substitui um documento só se ele ainda estiver como foi lido (mesma API do Firestore)"""
+        with self._lock:
+            try:
+                if self._ler(colecao, doc_id) != anterior:
+                    return False
+                self._gravar(colecao, doc_id, dados)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return True
+
+    def incrementar_contador(self, colecao, doc_id, inicial=0, passo=1):
+        """Soma 'passo' ao campo 'valor' de um contador numa transação (mesma API do Firestore)"""
+        with self._lock:
+            existe = self._ler(colecao, doc_id) is not None
+        # O valor inicial pode consultar o próprio backend, então é
+        # calculado fora do lock; se outra thread criou o contador nesse
+        # meio tempo, o valor dela prevalece
+        inicio = None if existe else valor_inicial(inicial)
+        with self._lock:
+            try:
+                atual = self._ler(colecao, doc_id)
+                valor = (atual['valor'] if atual else inicio) + passo
+                self._gravar(colecao, doc_id, {'valor': valor, 'atualizado_em': datetime.now().isoformat()})
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return valor
+
+    def executar_lote(self, operacoes):
+        """Executa várias escritas numa única transação (mesmas operações do Firestore)"""
+        ids = []
+        with self._lock:
+            try:
+                for operacao in operacoes:
+                    tipo, colecao = operacao[0], operacao[1]
+                    if tipo == 'adicionar':
+                        doc_id = uuid.uuid4().hex[:20]
+                        self._gravar(colecao, doc_id, operacao[2])
+                    else:
+                        doc_id = operacao[2]
+                        if tipo == 'definir':
+                            self._gravar(colecao, doc_id, operacao[3])
+                        elif tipo == 'atualizar':
+                            atual = self._ler(colecao, doc_id)
+                            if atual is None:
+                                raise KeyError(f"Documento {colecao}/{doc_id} não encontrado")
+                            atual.update(operacao[3])
+                            self._gravar(colecao, doc_id, atual)
+                        elif tipo == 'incrementar':
+                            atual = self._ler(colecao, doc_id) or {}
+                            for campo, delta in operacao[3].items():
+                                atual[campo] = atual.get(campo, 0) + delta
+                            self._gravar(colecao, doc_id, atual)
+                        elif tipo == 'criar':
+                            if self._ler(colecao, doc_id) is not None:
+                                raise DocumentoJaExiste(f"Documento {colecao}/{doc_id} já existe")
+                            self._gravar(colecao, doc_id, operacao[3])
+                        elif tipo == 'excluir':
+                            self._conn.execute(
+                                "DELETE FROM documentos WHERE colecao = ? AND id = ?", (colecao, doc_id)
+                            )
+                        else:
+                            raise ValueError(f"Operação não suportada: {tipo}")
+                    ids.append(doc_id)
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return ids
+
+    def _where(self, colecao, filtros):
+        sql = "colecao = ?"
+        params = [colecao]
+        for campo, operador, valor in filtros or []:
+            if operador not in OPERADORES:
+                raise ValueError(f"Operador não suportado: {operador}")
+            if operador == 'in':
+                marcadores = ', '.join('?' * len(valor))
+                sql += f" AND json_extract(dados, ?) IN ({marcadores})"
+                params.extend([f'$.{campo}', *valor])
+            else:
+                sql += f" AND json_extract(dados, ?) {OPERADORES[operador]} ?"
+                params.extend([f'$.{campo}', valor])
+        return sql, params
+
+    def _decodificar(self, rows, campos):
+        documentos = []
+        for doc_id, dados in rows:
+            data = json.loads(dados)
+            if campos is not None:
+                data = {campo: data[campo] for campo in campos if campo in data}
+            data['id'] = doc_id
+            documentos.append(data)
+        return documentos
+
+    def _ler(self, colecao, doc_id):
+        row = self._conn.execute(
+            "SELECT dados FROM documentos WHERE colecao = ? AND id = ?",
+            (colecao, doc_id)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _gravar(self, colecao, doc_id, dados):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO documentos (colecao, id, dados) VALUES (?, ?, ?)",
+            (colecao, doc_id, json.dumps(dados, ensure_ascii=False))
+        )
+
+
+class Sequencia:
+    """
+    Números únicos e crescentes a partir de contadores transacionais
+
+    Cada número custa uma transação pequena em um documento de contador.
+    Com fragmentos > 1 as transações se espalham por vários documentos
+    (mais vendas por segundo); o fragmento k entrega base+k+1, base+k+1+N,
+    ... então os números seguem únicos e crescentes em cada fragmento, mas
+    podem sair fora de ordem entre fragmentos diferentes.
+
+    Args:
+        backend: Backend com incrementar_contador()
+        nome: Prefixo dos documentos em 'contadores'
+        fragmentos: Quantidade de documentos de contador
+        base: Função que devolve o último número já usado, chamada só quando
+            um fragmento ainda não existe
+    """
+
+    def __init__(self, backend, nome, fragmentos=1, base=None):
+        self.backend = backend
+        self.nome = nome
+        self.fragmentos = fragmentos
+        self.base = base or (lambda: 0)
+
+    def proximo(self):
+        """Próximo número da sequência"""
+        fragmento = random.randrange(self.fragmentos)
+        doc_id = self.nome if self.fragmentos == 1 else f"{self.nome}_{fragmento}"
+        return self.backend.incrementar_contador(
+            COLECAO_CONTADORES, doc_id,
+            # Valor anterior ao primeiro número do fragmento
+            inicial=lambda: self.base() + fragmento + 1 - self.fragmentos,
+            passo=self.fragmentos
+        )
+
+
+def chaves_fornecedor(fornecedor):
+    """
+    Chaves únicas de um fornecedor, usadas como id em fornecedores_chaves
+
+    O nome é comparado sem acentos, maiúsculas e espaços extras
+    ("Casa do Adubo " e "casa do adubo" colidem); o CNPJ/CPF só pelos dígitos.
+
+    Returns:
+        dict: id da chave -> descrição do campo ('nome' ou 'cnpj_cpf')
+    """
+    chaves = {}
+    nome = normalizar(fornecedor.get('nome', ''))
+    if nome:
+        chaves[quote(f"nome:{nome}", safe='')] = 'nome'
+    documento = so_digitos(fornecedor.get('cnpj_cpf', ''))
+    if documento:
+        chaves[f"doc:{documento}"] = 'cnpj_cpf'
+    return chaves
+
+
+def agora_utc():
+    """Instante atual em ISO 8601 com fuso UTC (formato de 'ultima_atualizacao')"""
+    return datetime.now(timezone.utc).isoformat()
+
+
+def carimbar(dados):
+    """
+    Marca o documento com 'ultima_atualizacao'
+
+    É o campo usado como marca d'água pela sincronização incremental
+    (services/sync.py): toda escrita feita pelos repositórios atualiza o
+    carimbo, inclusive updates como "Marcar como Pago". O carimbo é em UTC
+    para que instâncias em fusos diferentes comparem os mesmos instantes.
+    """
+    dados = dict(dados)
+    dados['ultima_atualizacao'] = agora_utc()
+    return dados
+
+
+class CustosRepository:
+    """Acesso à coleção custos_contabeis"""
+
+    colecao = COLECAO_CUSTOS
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def listar_mes(self, inicio_mes, visao='detalhe'):
+        """Custos com data a partir de inicio_mes (YYYY-MM-DD), mais recentes primeiro"""
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('data', '>=', inicio_mes)],
+            ordem='data',
+            direcao='DESCENDING',
+            campos=projecao(self.colecao, visao)
+        )
+
+    def listar_periodo(self, mes, visao='detalhe'):
+        """Custos de um mês (YYYY-MM), mais recentes primeiro"""
+        inicio, fim = intervalo_mes(mes)
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('data', '>=', inicio), ('data', '<', fim)],
+            ordem='data',
+            direcao='DESCENDING',
+            campos=projecao(self.colecao, visao)
+        )
+
+    def listar_alterados(self, desde, visao='detalhe'):
+        """Custos criados ou alterados depois de 'desde' (ISO), para sincronização incremental"""
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('ultima_atualizacao', '>', desde)],
+            campos=projecao(self.colecao, visao)
+        )
+
+    def listar_por_fornecedor(self, nome_fornecedor, limite=10, visao='historico'):
+        """Últimos custos registrados para um fornecedor"""
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('fornecedor', '==', nome_fornecedor)],
+            ordem='data',
+            direcao='DESCENDING',
+            limite=limite,
+            campos=projecao(self.colecao, visao)
+        )
+
+    def adicionar(self, custo_data):
+        """Grava o custo e atualiza o rollup do mês no mesmo lote"""
+        doc_id = self.backend.executar_lote([
+            ('adicionar', self.colecao, carimbar(custo_data)),
+            incrementos_custo(custo_data),
+        ])[0]
+        invalidar(self.colecao, custo_data['data'][:7])
+        return doc_id
+
+    def atualizar(self, custo_id, data, dados):
+        """
+        Atualiza campos de um custo que não entram no rollup (ex.: a nota fiscal)
+
+        Os totais não mudam, mas a versão do rollup do mês (e do mês novo, se
+        a data mudou) anda no mesmo lote, o que avisa as outras instâncias.
+
+        Args:
+            custo_id: Id do custo
+            data: Data do custo (YYYY-MM-DD), para invalidar o mês
+            dados: Campos alterados
+        """
+        meses = sorted({data[:7], dados.get('data', data)[:7]})
+        self.backend.executar_lote(
+            [('atualizar', self.colecao, custo_id, carimbar(dados))]
+            + [incremento_versao('custos', mes) for mes in meses]
+        )
+        for mes in meses:
+            invalidar(self.colecao, mes)
+
+    def adicionar_lote(self, custos, operacoes=()):
+        """
+        Grava vários custos num único lote atômico
+
+        Os incrementos de rollup são agrupados por mês, então o lote usa
+        len(custos) + meses + len(operacoes) escritas, no máximo
+        MAX_OPERACOES_LOTE.
+
+        Args:
+            custos: Dicts no mesmo formato do formulário
+            operacoes: Escritas extras no mesmo lote (ex.: progresso de uma importação)
+
+        Returns:
+            list: Ids dos custos gravados, na mesma ordem
+        """
+        incrementos = agrupar_incrementos([incrementos_custo(c) for c in custos])
+        lote = [('adicionar', self.colecao, carimbar(c)) for c in custos] + incrementos + list(operacoes)
+        if len(lote) > MAX_OPERACOES_LOTE:
+            raise ValueError(f"Lote com {len(lote)} operações (máximo {MAX_OPERACOES_LOTE})")
+        ids = self.backend.executar_lote(lote)[:len(custos)]
+        for mes in sorted({c['data'][:7] for c in custos}):
+            invalidar(self.colecao, mes)
+        return ids
+
+
+class VendasRepository:
+    """Acesso à coleção vendas"""
+
+    colecao = COLECAO_VENDAS
+
+    def __init__(self, backend):
+        self.backend = backend
+        # A numeração passa a ser global e continua da quantidade de vendas
+        # já gravadas, que é sempre maior ou igual a qualquer sequência do
+        # formato antigo (reiniciado a cada mês), então não há colisão
+        self.sequencia = Sequencia(
+            backend, 'vendas', fragmentos=FRAGMENTOS_SEQUENCIA_VENDAS,
+            base=lambda: self.backend.agregar(self.colecao, {'total': ('count', None)})['total']
+        )
+
+    def proximo_numero(self, data=None):
+        """
+        Próximo numero_venda, no formato V{AAAAMMDD}-{sequência}
+
+        A sequência é global (não reinicia por dia nem por mês) e vem de um
+        contador transacional: duas vendas salvas ao mesmo tempo nunca
+        recebem o mesmo número, e não é preciso listar as vendas do mês.
+        """
+        data = data or datetime.now()
+        return f"V{data.strftime('%Y%m%d')}-{self.sequencia.proximo():04d}"
+
+    def listar_mes(self, inicio_mes, visao='detalhe'):
+        """Vendas com data_venda a partir de inicio_mes, mais recentes primeiro"""
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('data_venda', '>=', inicio_mes)],
+            ordem='data_venda',
+            direcao='DESCENDING',
+            campos=projecao(self.colecao, visao)
+        )
+
+    def listar_periodo(self, mes, visao='detalhe'):
+        """Vendas de um mês (YYYY-MM), mais recentes primeiro"""
+        inicio, fim = intervalo_mes(mes)
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('data_venda', '>=', inicio), ('data_venda', '<', fim)],
+            ordem='data_venda',
+            direcao='DESCENDING',
+            campos=projecao(self.colecao, visao)
+        )
+
+    def listar_alterados(self, desde, visao='detalhe'):
+        """Vendas criadas ou alteradas depois de 'desde' (ISO), para sincronização incremental"""
+        return self.backend.listar(
+            self.colecao,
+            filtros=[('ultima_atualizacao', '>', desde)],
+            campos=projecao(self.colecao, visao)
+        )
+
+    def listar_pagina(self, inicio_mes, tamanho, apos=None, status=None, tipos_pagamento=None, visao='tabela'):
+        """
+        Página de vendas do mês, mais recentes primeiro
+
+        Args:
+            inicio_mes: Data inicial no formato YYYY-MM-DD
+            tamanho: Vendas por página
+            apos: Cursor (data_venda, id) devolvido pela página anterior
+            status: status_recebimento exigido (None = todos)
+            tipos_pagamento: Tipos de pagamento aceitos (None = todos)
+
+        Returns:
+            tuple: (vendas da página, cursor da próxima página ou None)
+        """
+        if tipos_pagamento is not None and not tipos_pagamento:
+            return [], None
+        # Lê um documento a mais só para saber se existe próxima página
+        vendas = self.backend.pagina(
+            self.colecao,
+            self._filtros_pagina(inicio_mes, status, tipos_pagamento),
+            ordem='data_venda',
+            direcao='DESCENDING',
+            limite=tamanho + 1,
+            apos=apos,
+            campos=projecao(self.colecao, visao)
+        )
+        return fechar_pagina(vendas, 'data_venda', tamanho)
+
+    def contar(self, inicio_mes, status=None, tipos_pagamento=None):
+        """Quantidade de vendas com os mesmos filtros de listar_pagina (count no servidor)"""
+        if tipos_pagamento is not None and not tipos_pagamento:
+            return 0
+        return self.backend.agregar(
+            self.colecao,
+            {'total': ('count', None)},
+            filtros=self._filtros_pagina(inicio_mes, status, tipos_pagamento)
+        )['total']
+
+    def _filtros_pagina(self, inicio_mes, status, tipos_pagamento):
+        filtros = [('data_venda', '>=', inicio_mes)]
+        if status:
+            filtros.append(('status_recebimento', '==', status))
+        if tipos_pagamento:
+            filtros.append(('tipo_pagamento', 'in', list(tipos_pagamento)))
+        return filtros
+
+    def estatisticas_mes(self, inicio_mes):
+        """
+        Quantidade, faturamento e ticket médio das vendas a partir de inicio_mes
+
+        Usa agregações no servidor: custa poucas leituras, não uma por venda.
+        """
+        resultado = self.backend.agregar(
+            self.colecao,
+            {
+                'total_vendas': ('count', None),
+                'faturamento': ('sum', 'valor_total'),
+                'ticket_medio': ('avg', 'valor_total'),
+            },
+            filtros=[('data_venda', '>=', inicio_mes)]
+        )
+        resultado['ticket_medio'] = resultado['ticket_medio'] or 0.0
+        return resultado
+
+    def adicionar(self, venda_data):
+        """Grava a venda e atualiza o rollup do mês no mesmo lote"""
+        doc_id = self.backend.executar_lote([
+            ('adicionar', self.colecao, carimbar(venda_data)),
+            incrementos_venda(venda_data),
+        ])[0]
+        invalidar(self.colecao, venda_data['data_venda'][:7])
+        return doc_id
+
+    def atualizar(self, venda, dados):
+        """
+        Atualiza uma venda e, se o status mudar, o rollup do mês
+
+        Args:
+            venda: Venda como está gravada (precisa de 'id', 'data_venda',
+                'status_recebimento' e 'valor_total')
+            dados: Campos alterados
+        """
+        operacoes = [('atualizar', self.colecao, venda['id'], carimbar(dados))]
+        mudanca = incrementos_mudanca_status(venda, dados)
+        operacoes.append(mudanca or incremento_versao('vendas', venda['data_venda'][:7]))
+        self.backend.executar_lote(operacoes)
+        invalidar(self.colecao, venda['data_venda'][:7])
+
+
+class FornecedoresRepository:
+    """Acesso à coleção fornecedores"""
+
+    colecao = COLECAO_FORNECEDORES
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def listar(self, visao='detalhe'):
+        """Todos os fornecedores ordenados por nome"""
+        return self.backend.listar(self.colecao, ordem='nome', campos=projecao(self.colecao, visao))
+
+    def listar_ativos(self, visao='detalhe'):
+        """Fornecedores ativos (ausência do campo 'ativo' conta como ativo)"""
+        fornecedores = self.backend.listar(self.colecao, campos=projecao(self.colecao, visao))
+        return [f for f in fornecedores if f.get('ativo', True)]
+
+    def contagens(self):
+        """
+        Total, ativos e inativos via count() no servidor
+
+        Fornecedores sem o campo 'ativo' contam como ativos, por isso os
+        ativos são o total menos os marcados explicitamente como inativos.
+        """
+        total = self.backend.agregar(self.colecao, {'total': ('count', None)})['total']
+        inativos = self.backend.agregar(
+            self.colecao, {'total': ('count', None)}, filtros=[('ativo', '==', False)]
+        )['total']
+        return {'total': total, 'ativos': total - inativos, 'inativos': inativos}
+
+    def duplicado(self, fornecedor_data, ignorar_id=None):
+        """
+        Campo que já pertence a outro fornecedor (um get por chave)
+
+        Returns:
+            str | None: 'nome', 'cnpj_cpf' ou None se não há conflito
+        """
+        for chave, campo in chaves_fornecedor(fornecedor_data).items():
+            dono = self.backend.obter(COLECAO_CHAVES_FORNECEDORES, chave)
+            if dono is not None and dono.get('fornecedor_id') != ignorar_id:
+                return campo
+        return None
+
+    def obter_por_documento(self, cnpj_cpf):
+        """
+        Fornecedor dono de um CNPJ/CPF, pela chave única (dois gets, sem consulta)
+
+        Returns:
+            dict | None: Fornecedor ou None se o documento não está cadastrado
+        """
+        documento = so_digitos(cnpj_cpf)
+        if not documento:
+            return None
+        chave = self.backend.obter(COLECAO_CHAVES_FORNECEDORES, f"doc:{documento}")
+        if chave is None:
+            return None
+        return self.backend.obter(self.colecao, chave['fornecedor_id'])
+
+    def existe_nome(self, nome):
+        """Verifica se já existe fornecedor com este nome (normalizado)"""
+        return self.duplicado({'nome': nome}) is not None
+
+    def adicionar(self, fornecedor_data):
+        """
+        Grava o fornecedor e as suas chaves únicas no mesmo lote
+
+        As chaves são criadas com 'criar', que falha se já existem: dois
+        cadastros simultâneos do mesmo fornecedor não passam os dois.
+
+        Raises:
+            FornecedorDuplicado: Nome normalizado ou CNPJ/CPF já cadastrado
+        """
+        doc_id = uuid.uuid4().hex[:20]
+        operacoes = [
+            ('criar', COLECAO_CHAVES_FORNECEDORES, chave, {'fornecedor_id': doc_id, 'campo': campo})
+            for chave, campo in chaves_fornecedor(fornecedor_data).items()
+        ]
+        operacoes.append(('definir', self.colecao, doc_id, fornecedor_data))
+        self._executar(operacoes, fornecedor_data)
+        invalidar(self.colecao)
+        return doc_id
+
+    def atualizar(self, fornecedor_id, dados):
+        """Atualiza o fornecedor; troca as chaves únicas se nome ou CNPJ/CPF mudam"""
+        operacoes = [('atualizar', self.colecao, fornecedor_id, dados)]
+        if 'nome' in dados or 'cnpj_cpf' in dados:
+            atual = self.backend.obter(self.colecao, fornecedor_id) or {}
+            antigas = chaves_fornecedor(atual)
+            novas = chaves_fornecedor({**atual, **dados})
+            operacoes += [
+                ('criar', COLECAO_CHAVES_FORNECEDORES, chave, {'fornecedor_id': fornecedor_id, 'campo': campo})
+                for chave, campo in novas.items() if chave not in antigas
+            ]
+            operacoes += [
+                ('excluir', COLECAO_CHAVES_FORNECEDORES, chave)
+                for chave in antigas if chave not in novas
+            ]
+        self._executar(operacoes, dados, fornecedor_id)
+        invalidar(self.colecao)
+
+    def garantir_chaves(self):
+        """
+        Cria as chaves dos fornecedores cadastrados antes do índice existir
+
+        Roda uma vez por banco (marcador '_migracao'); em fornecedores já
+        duplicados, o primeiro por data de cadastro fica com a chave.
+        """
+        if self.backend.obter(COLECAO_CHAVES_FORNECEDORES, '_migracao'):
+            return
+        operacoes = []
+        # Chaves gravadas por cadastros novos não são sobrescritas
+        usadas = {chave['id'] for chave in self.backend.listar(COLECAO_CHAVES_FORNECEDORES, campos=[])}
+        for fornecedor in sorted(self.backend.listar(self.colecao), key=lambda f: f.get('data_cadastro', '')):
+            for chave, campo in chaves_fornecedor(fornecedor).items():
+                if chave not in usadas:
+                    usadas.add(chave)
+                    operacoes.append(('definir', COLECAO_CHAVES_FORNECEDORES, chave,
+                                      {'fornecedor_id': fornecedor['id'], 'campo': campo}))
+        operacoes.append(('definir', COLECAO_CHAVES_FORNECEDORES, '_migracao',
+                          {'concluida_em': datetime.now().isoformat()}))
+        for inicio in range(0, len(operacoes), MAX_OPERACOES_LOTE):
+            self.backend.executar_lote(operacoes[inicio:inicio + MAX_OPERACOES_LOTE])
+
+    def _executar(self, operacoes, dados, fornecedor_id=None):
+        try:
+            self.backend.executar_lote(operacoes)
+        except DocumentoJaExiste as e:
+            campo = self.duplicado(dados, ignorar_id=fornecedor_id) or 'nome'
+            rotulo = 'CNPJ/CPF' if campo == 'cnpj_cpf' else 'nome'
+            raise FornecedorDuplicado(f"Fornecedor já cadastrado com este {rotulo}") from e
+
+
+class ArquivosNFRepository:
+    """
+    Índice dos arquivos de nota fiscal por conteúdo
+
+    O id do documento é o SHA-256 do arquivo original: anexar de novo a
+    mesma foto ou PDF (uma nota com vários itens) custa uma leitura e
+    reaproveita as URLs, sem novo upload.
+    """
+
+    colecao = COLECAO_ARQUIVOS_NF
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def obter(self, sha):
+        """URLs já enviadas para o conteúdo, ou None"""
+        return self.backend.obter(self.colecao, sha)
+
+    def registrar(self, sha, dados):
+        """Guarda o resultado de um upload ('url', 'miniatura_url', 'bytes'...)"""
+        self.backend.definir(self.colecao, sha, carimbar(dados))
+
+
+@dataclass
+class Repositorios:
+    """Agrupa os repositórios que as páginas usam"""
+    backend: object
+    custos: CustosRepository
+    vendas: VendasRepository
+    fornecedores: FornecedoresRepository
+    rollups: RollupsRepository
+    arquivos_nf: ArquivosNFRepository
+
+
+def criar_repositorios(backend):
+    """Monta os repositórios sobre um backend já inicializado"""
+    return Repositorios(
+        backend=backend,
+        custos=CustosRepository(backend),
+        vendas=VendasRepository(backend),
+        fornecedores=FornecedoresRepository(backend),
+        rollups=RollupsRepository(backend),
+        arquivos_nf=ArquivosNFRepository(backend)
+    )
+
+
+@st.cache_resource
+def get_backend():
+    """
+    Cria o backend configurado em RST_BACKEND (uma vez por processo)
+
+    Returns:
+        FirestoreBackend | SQLiteBackend | None: None se o Firebase falhar
+    """
+    tipo = os.getenv("RST_BACKEND", "firestore").lower()
+
+    if tipo == "sqlite":
+        backend = SQLiteBackend(os.getenv("RST_SQLITE_PATH", "rst_local.db"))
+    else:
+        from config.firebase_config import init_firebase
+        db = init_firebase()
+        if not db:
+            return None
+        backend = FirestoreBackend(db)
+
+    # RST_INSTRUMENTACAO=1: mede cada chamada (services/instrumentacao.py)
+    from services.instrumentacao import BackendInstrumentado, get_instrumentacao, instrumentacao_ativa
+    if instrumentacao_ativa():
+        return BackendInstrumentado(backend, get_instrumentacao())
+    return backend
+
+
+def get_repositorios():
+    """
+    Retorna os repositórios sobre o backend configurado
+
+    Returns:
+        Repositorios | None: None se o backend não puder ser inicializado
+    """
+    backend = get_backend()
+    if backend is None:
+        return None
+    return criar_repositorios(backend)
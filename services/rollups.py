@@ -0,0 +1,312 @@
+"""
+Resumos mensais pré-agregados (rollups)
+
+Os totais das barras laterais e do dashboard ficam em documentos da coleção
+'rollups' (ex.: rollups/custos_2024-08, rollups/vendas_2024-08), atualizados
+com incrementos no mesmo lote atômico em que o custo ou a venda é gravado.
+Ler os totais do mês custa um único documento, qualquer que seja o volume.
+
+Meses gravados antes dos rollups existirem são recalculados a partir dos
+documentos na primeira leitura e marcados com 'completo'. O recálculo só
+grava se o rollup não mudou desde que foi lido; uma venda ou custo salvo no
+meio faz o recálculo recomeçar, em vez de ter o incremento sobrescrito.
+
+Todo lote que escreve no mês soma 1 ao campo 'versao' do rollup (inclusive
+updates que não mexem nos totais); o cache de meses fechados
+(services/particoes.py) compara essa versão para saber se o que guardou
+ainda vale.
+"""
+
+from datetime import datetime
+
+from services.cache import cache_com_tags, tag
+
+COLECAO_ROLLUPS = 'rollups'
+
+# Tentativas de recálculo quando há escritas concorrentes no mês
+TENTATIVAS_RECALCULO = 3
+
+# tipo_custo -> campo do rollup de custos
+CAMPOS_TIPO_CUSTO = {
+    'Custos Fixos': 'custos_fixos',
+    'Custos Variáveis': 'custos_variaveis',
+    'Investimentos': 'investimentos',
+}
+
+# status_recebimento -> campo do rollup de vendas
+CAMPOS_STATUS_VENDA = {
+    'Pago': 'total_recebido',
+    'Pendente': 'total_pendente',
+    'Consignado': 'total_consignado',
+    'Acertado': 'total_acertado',
+    'Cancelado': 'total_cancelado',
+}
+
+RESUMO_CUSTOS_VAZIO = {
+    'custos_fixos': 0.0,
+    'custos_variaveis': 0.0,
+    'investimentos': 0.0,
+    'depreciacao': 0.0,
+    'registros': 0,
+}
+
+RESUMO_VENDAS_VAZIO = {
+    'total_vendas': 0.0,
+    'registros': 0,
+    'produtos_vendidos': 0,
+    **{campo: 0.0 for campo in CAMPOS_STATUS_VENDA.values()},
+}
+
+
+def intervalo_mes(mes):
+    """
+    Limites de um mês para filtros de data
+
+    Args:
+        mes: Mês no formato YYYY-MM
+
+    Returns:
+        tuple: (primeiro dia, primeiro dia do mês seguinte) em YYYY-MM-DD
+    """
+    ano, numero = int(mes[:4]), int(mes[5:7])
+    if numero == 12:
+        proximo = f"{ano + 1}-01-01"
+    else:
+        proximo = f"{ano}-{numero + 1:02d}-01"
+    return f"{mes}-01", proximo
+
+
+def mes_anterior(mes):
+    """Mês anterior no formato YYYY-MM"""
+    ano, numero = int(mes[:4]), int(mes[5:7])
+    if numero == 1:
+        return f"{ano - 1}-12"
+    return f"{ano}-{numero - 1:02d}"
+
+
+def id_rollup(prefixo, mes):
+    return f"{prefixo}_{mes}"
+
+
+def campo_status(status):
+    return CAMPOS_STATUS_VENDA.get(status, f"total_{str(status).lower()}")
+
+
+def incremento_versao(prefixo, mes):
+    """Operação de lote que só marca o rollup do mês como alterado"""
+    return ('incrementar', COLECAO_ROLLUPS, id_rollup(prefixo, mes), {'versao': 1})
+
+
+def incrementos_custo(custo):
+    """Operação de lote que soma um novo custo ao rollup do seu mês"""
+    campos = {'registros': 1, 'versao': 1}
+    tipo = custo.get('tipo_custo')
+    if tipo in CAMPOS_TIPO_CUSTO:
+        campos[CAMPOS_TIPO_CUSTO[tipo]] = float(custo.get('valor', 0))
+    if tipo == 'Investimentos':
+        campos['depreciacao'] = float(custo.get('depreciacao_mensal', 0))
+    return ('incrementar', COLECAO_ROLLUPS, id_rollup('custos', custo['data'][:7]), campos)
+
+
+def incrementos_venda(venda):
+    """Operação de lote que soma uma nova venda ao rollup do seu mês"""
+    valor = float(venda.get('valor_total', 0))
+    campos = {
+        'registros': 1,
+        'versao': 1,
+        'total_vendas': valor,
+        'produtos_vendidos': len(venda.get('produtos', [])),
+        campo_status(venda.get('status_recebimento')): valor,
+    }
+    return ('incrementar', COLECAO_ROLLUPS, id_rollup('vendas', venda['data_venda'][:7]), campos)
+
+
+def incrementos_mudanca_status(venda, dados):
+    """
+    Operação de lote que move o valor da venda entre os totais por status
+
+    Args:
+        venda: Venda como estava antes da atualização
+        dados: Campos que serão atualizados
+
+    Returns:
+        tuple | None: None se o status não muda
+    """
+    anterior = venda.get('status_recebimento')
+    novo = dados.get('status_recebimento', anterior)
+    if novo == anterior:
+        return None
+    valor = float(venda.get('valor_total', 0))
+    return ('incrementar', COLECAO_ROLLUPS, id_rollup('vendas', venda['data_venda'][:7]), {
+        campo_status(anterior): -valor,
+        campo_status(novo): valor,
+        'versao': 1,
+    })
+
+
+def agrupar_incrementos(operacoes):
+    """
+    Junta os incrementos de um mesmo rollup em uma única operação
+
+    Usado nas gravações em lote: mil custos do mesmo mês viram um
+    incremento, e não mil escritas no mesmo documento. A 'versao' soma como
+    os demais campos; basta que mude.
+    """
+    agrupados = {}
+    for _, colecao, doc_id, campos in operacoes:
+        soma = agrupados.setdefault((colecao, doc_id), {})
+        for campo, valor in campos.items():
+            soma[campo] = soma.get(campo, 0) + valor
+    return [('incrementar', colecao, doc_id, campos) for (colecao, doc_id), campos in agrupados.items()]
+
+
+def calcular_resumo_custos(custos):
+    """Totais de custos calculados a partir dos documentos"""
+    return _somar(RESUMO_CUSTOS_VAZIO, map(incrementos_custo, custos))
+
+
+def calcular_resumo_vendas(vendas):
+    """Totais de vendas calculados a partir dos documentos"""
+    return _somar(RESUMO_VENDAS_VAZIO, map(incrementos_venda, vendas))
+
+
+def _somar(vazio, incrementos):
+    resumo = dict(vazio)
+    for _, _, _, campos in incrementos:
+        for campo, valor in campos.items():
+            if campo != 'versao':
+                resumo[campo] = resumo.get(campo, 0) + valor
+    return resumo
+
+
+# coleção -> (prefixo do rollup, campo de data, cálculo, resumo vazio, campos lidos no recálculo)
+ROLLUPS = {
+    'custos_contabeis': ('custos', 'data', calcular_resumo_custos, RESUMO_CUSTOS_VAZIO,
+                         ['data', 'tipo_custo', 'valor', 'depreciacao_mensal']),
+    'vendas': ('vendas', 'data_venda', calcular_resumo_vendas, RESUMO_VENDAS_VAZIO,
+               ['data_venda', 'status_recebimento', 'valor_total', 'produtos']),
+}
+
+
+class RollupsRepository:
+    """Leitura dos rollups, com recálculo de meses sem resumo completo"""
+
+    colecao = COLECAO_ROLLUPS
+
+    def __init__(self, backend):
+        self.backend = backend
+
+    def resumo_custos(self, mes):
+        """Totais de custos do mês (YYYY-MM)"""
+        return self._resumo('custos_contabeis', mes)
+
+    def resumo_vendas(self, mes):
+        """Totais de vendas do mês (YYYY-MM)"""
+        return self._resumo('vendas', mes)
+
+    def versao(self, colecao, mes, campos=None):
+        """
+        Versão do rollup do mês, que muda a cada lote que escreve no mês
+
+        Se o rollup ainda não está completo, ele é recalculado e os
+        documentos lidos no recálculo voltam junto, para quem ia ler o mês
+        em seguida não ler de novo.
+
+        Args:
+            colecao: 'custos_contabeis' ou 'vendas'
+            mes: Mês no formato YYYY-MM
+            campos: Campos a ler no recálculo além dos do rollup (None = todos)
+
+        Returns:
+            tuple: (versao, documentos); documentos é None sem recálculo e
+            versao é None se o recálculo não conseguiu gravar
+        """
+        prefixo = ROLLUPS[colecao][0]
+        doc = self._ler(id_rollup(prefixo, mes))
+        if doc is not None and doc.get('completo'):
+            return doc.get('versao', 0), None
+        _, versao, documentos = self.recalcular(colecao, mes, doc, campos)
+        return versao, documentos
+
+    def recalcular(self, colecao, mes, anterior=None, campos=()):
+        """
+        Refaz o rollup do mês a partir dos documentos e grava como completo
+
+        A gravação só acontece se o rollup ainda está igual a 'anterior' (o
+        que foi lido antes de listar os documentos). Se um incremento chegou
+        no meio, o rollup é relido e o recálculo recomeça; esgotadas as
+        tentativas, devolve o resumo calculado sem gravar e o mês continua
+        incompleto, para ser recalculado na próxima leitura.
+
+        Args:
+            colecao: 'custos_contabeis' ou 'vendas'
+            mes: Mês no formato YYYY-MM
+            anterior: Rollup lido antes (sem 'id'), ou None se não existia
+            campos: Campos lidos além dos do rollup (None = todos)
+
+        Returns:
+            tuple: (resumo, versao gravada ou None, documentos lidos)
+        """
+        prefixo, campo_data, calcular, _, campos_rollup = ROLLUPS[colecao]
+        inicio, fim = intervalo_mes(mes)
+        doc_id = id_rollup(prefixo, mes)
+        versao = None
+        for tentativa in range(TENTATIVAS_RECALCULO):
+            if tentativa:
+                anterior = self._ler(doc_id)
+            documentos = self.backend.listar(colecao, filtros=[
+                (campo_data, '>=', inicio),
+                (campo_data, '<', fim),
+            ], campos=None if campos is None else sorted(set(campos_rollup) | set(campos)))
+            resumo = calcular(documentos)
+            # O recálculo também é uma escrita: a versão anda
+            proxima = (anterior or {}).get('versao', 0) + 1
+            gravado = self.backend.definir_se_inalterado(self.colecao, doc_id, anterior, {
+                **resumo,
+                'versao': proxima,
+                'completo': True,
+                'recalculado_em': datetime.now().isoformat(),
+            })
+            if gravado:
+                versao = proxima
+                break
+        return resumo, versao, documentos
+
+    def _ler(self, doc_id):
+        doc = self.backend.obter(self.colecao, doc_id)
+        if doc is not None:
+            doc.pop('id', None)
+        return doc
+
+    def _resumo(self, colecao, mes):
+        prefixo, _, _, vazio, _ = ROLLUPS[colecao]
+        doc = self._ler(id_rollup(prefixo, mes))
+        if doc is None or not doc.get('completo'):
+            # Mês anterior aos rollups ou criado só por incrementos
+            return self.recalcular(colecao, mes, doc)[0]
+        resumo = dict(vazio)
+        resumo.update({
+            campo: valor for campo, valor in doc.items()
+            if campo in vazio or campo.startswith('total_')
+        })
+        return resumo
+
+
+@cache_com_tags(ttl=60, tags=lambda mes: [tag('custos_contabeis', mes)])
+def get_resumo_custos(mes):
+    """Totais de custos do mês com cache (invalidado pelas escritas do mês)"""
+    from services.repository import get_repositorios
+    repos = get_repositorios()
+    if not repos:
+        return dict(RESUMO_CUSTOS_VAZIO)
+    return repos.rollups.resumo_custos(mes)
+
+
+@cache_com_tags(ttl=60, tags=lambda mes: [tag('vendas', mes)])
+def get_resumo_vendas(mes):
+    """Totais de vendas do mês com cache (invalidado pelas escritas do mês)"""
+    from services.repository import get_repositorios
+    repos = get_repositorios()
+    if not repos:
+        return dict(RESUMO_VENDAS_VAZIO)
+    return repos.rollups.resumo_vendas(mes)
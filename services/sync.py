@@ -0,0 +1,123 @@
+"""
+Sincronização incremental dos dados do mês
+
+Em vez de reler o mês inteiro a cada expiração do cache, o sincronizador
+guarda os documentos já lidos e a maior 'ultima_atualizacao' vista
+(marca d'água). Nas próximas leituras busca apenas os documentos escritos
+depois dela e os mescla no conjunto em memória.
+
+A consulta incremental não enxerga exclusões feitas por outras instâncias
+nem escritas com relógio atrasado além da sobreposição; por isso, a cada
+RECARGA_COMPLETA, o mês é relido inteiro.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+import streamlit as st
+
+from services.repository import agora_utc
+
+# Margem relida a cada sincronização para tolerar relógios levemente
+# diferentes entre instâncias do app; a mesclagem por id é idempotente
+SOBREPOSICAO = timedelta(seconds=30)
+
+# Intervalo entre recargas completas do mês
+RECARGA_COMPLETA = timedelta(minutes=10)
+
+
+class SincronizadorMes:
+    """
+    Mantém em memória os documentos de uma coleção a partir do início do mês
+
+    Args:
+        repositorio: Repositório com listar_mes(inicio_mes) e listar_alterados(desde)
+        campo_data: Campo de data usado no filtro do mês ('data' ou 'data_venda')
+        visao: Projeção de campos mantida em memória ('resumo', 'tabela', 'detalhe')
+        recarga: Intervalo (timedelta) entre recargas completas do mês
+    """
+
+    def __init__(self, repositorio, campo_data, visao='detalhe', recarga=RECARGA_COMPLETA):
+        self.repositorio = repositorio
+        self.campo_data = campo_data
+        self.visao = visao
+        self.recarga = recarga
+        self._carregado_em = None  # time.monotonic() da última carga completa
+        self._lock = threading.Lock()
+        self._inicio_mes = None
+        self._documentos = {}
+        self._marca_dagua = None
+        self.leituras = 0  # documentos lidos do backend desde a criação
+
+    def documentos(self, inicio_mes):
+        """
+        Retorna os documentos do mês, sincronizando só o que mudou
+
+        Args:
+            inicio_mes: Data inicial no formato YYYY-MM-DD
+
+        Returns:
+            list: Documentos ordenados por campo_data, mais recentes primeiro
+        """
+        with self._lock:
+            vencida = (self._carregado_em is not None
+                       and time.monotonic() - self._carregado_em >= self.recarga.total_seconds())
+            if self._inicio_mes != inicio_mes or vencida:
+                self._carga_completa(inicio_mes)
+            else:
+                self._carga_incremental()
+
+            return sorted(
+                (dict(d) for d in self._documentos.values()),
+                key=lambda d: d.get(self.campo_data, ''),
+                reverse=True
+            )
+
+    def reiniciar(self):
+        """Descarta o estado; a próxima leitura refaz a carga completa"""
+        with self._lock:
+            self._inicio_mes = None
+            self._documentos = {}
+            self._marca_dagua = None
+            self._carregado_em = None
+
+    def _carga_completa(self, inicio_mes):
+        docs = self.repositorio.listar_mes(inicio_mes, visao=self.visao)
+        self.leituras += len(docs)
+        self._inicio_mes = inicio_mes
+        self._documentos = {d['id']: d for d in docs}
+        self._carregado_em = time.monotonic()
+        # Documentos antigos podem não ter o carimbo; o instante da carga
+        # serve de marca d'água inicial
+        self._marca_dagua = max(
+            [d.get('ultima_atualizacao', '') for d in docs] + [agora_utc()]
+        )
+
+    def _carga_incremental(self):
+        desde = (datetime.fromisoformat(self._marca_dagua) - SOBREPOSICAO).isoformat()
+        docs = self.repositorio.listar_alterados(desde, visao=self.visao)
+        self.leituras += len(docs)
+
+        for doc in docs:
+            if doc.get(self.campo_data, '') >= self._inicio_mes:
+                self._documentos[doc['id']] = doc
+            else:
+                # A data foi alterada para fora do mês
+                self._documentos.pop(doc['id'], None)
+            if doc.get('ultima_atualizacao', '') > self._marca_dagua:
+                self._marca_dagua = doc['ultima_atualizacao']
+
+
+@st.cache_resource
+def get_sincronizador(colecao, campo_data, _repositorio, visao='detalhe'):
+    """
+    Sincronizador compartilhado pelo processo para uma coleção e visão
+
+    Args:
+        colecao: Nome da coleção (chave do cache)
+        campo_data: Campo de data usado no filtro do mês
+        _repositorio: Repositório da coleção (não entra na chave do cache)
+        visao: Projeção de campos mantida em memória
+    """
+    return SincronizadorMes(_repositorio, campo_data, visao)
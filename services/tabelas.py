@@ -0,0 +1,102 @@
+"""
+Preparação dos dados exibidos nas tabelas e gráficos das páginas
+
+Funções sem Streamlit, usadas pela página de Custos e pelo benchmark
+(benchmark.py), para que o tempo medido seja o da página. O pandas é
+importado na primeira chamada (partida a frio mais rápida).
+"""
+
+# Colunas da tabela filtrável de custos -> nome exibido
+COLUNAS_CUSTOS = {
+    'data_formatada': 'Data',
+    'tipo_custo': 'Tipo',
+    'categoria_nome': 'Categoria',
+    'descricao_item': 'Produto/Serviço',
+    'quantidade': 'Qtd',
+    'unidade_medida': 'Un.',
+    'valor_unitario': 'Valor Unit. (R$)',
+    'valor': 'Valor Total (R$)',
+    'fornecedor': 'Fornecedor',
+    'numero_nf': 'Nº NF',
+    'tem_nota_fiscal': 'Com NF',
+    'observacoes': 'Observações'
+}
+
+COLUNAS_CUSTOS_PADRAO = [
+    'data_formatada', 'tipo_custo', 'categoria_nome', 'descricao_item', 'quantidade',
+    'unidade_medida', 'valor_unitario', 'valor', 'fornecedor',
+]
+
+
+def resumir_fornecedores_ativos(fornecedores_docs):
+    """Fornecedores ativos (campo ausente conta como ativo), por nome"""
+    fornecedores = []
+    for data in fornecedores_docs:
+        # Considerar ativo se o campo não existir ou for True
+        if data.get('ativo', True):
+            fornecedores.append({
+                'nome': data.get('nome', ''),
+                'tipo': data.get('tipo_fornecedor', ''),
+                'telefone': data.get('telefone', ''),
+                'cnpj_cpf': data.get('cnpj_cpf', ''),
+                'id': data['id']
+            })
+
+    # Ordenar por nome
+    fornecedores.sort(key=lambda x: x['nome'].lower())
+    return fornecedores
+
+
+def dataframe_custos(custos):
+    """DataFrame dos custos com a data formatada e as colunas novas garantidas"""
+    import pandas as pd
+
+    df_custos = pd.DataFrame(custos)
+    df_custos['data_formatada'] = pd.to_datetime(df_custos['data']).dt.strftime('%d/%m/%Y')
+
+    # Garantir que colunas novas existam (para compatibilidade com dados antigos)
+    if 'quantidade' not in df_custos.columns:
+        df_custos['quantidade'] = 1.0
+    if 'unidade_medida' not in df_custos.columns:
+        df_custos['unidade_medida'] = 'UN'
+    if 'valor_unitario' not in df_custos.columns:
+        df_custos['valor_unitario'] = df_custos['valor']
+    return df_custos
+
+
+def filtrar_custos(df_custos, tipos, valor_minimo):
+    """Custos dos tipos escolhidos com valor a partir de valor_minimo"""
+    return df_custos[
+        (df_custos['tipo_custo'].isin(tipos)) &
+        (df_custos['valor'] >= valor_minimo)
+    ]
+
+
+def tabela_exibicao_custos(df_filtrado, colunas):
+    """Colunas escolhidas, renomeadas e com valores formatados para exibir"""
+    df_exibicao = df_filtrado[colunas].copy()
+
+    # Renomear colunas para nomes mais amigáveis
+    df_exibicao = df_exibicao.rename(columns=COLUNAS_CUSTOS)
+
+    # Formatar valores monetários e quantidade
+    if 'Valor Total (R$)' in df_exibicao.columns:
+        df_exibicao['Valor Total (R$)'] = df_exibicao['Valor Total (R$)'].apply(lambda x: f"R$ {x:.2f}")
+    if 'Valor Unit. (R$)' in df_exibicao.columns:
+        df_exibicao['Valor Unit. (R$)'] = df_exibicao['Valor Unit. (R$)'].apply(lambda x: f"R$ {x:.2f}")
+    if 'Qtd' in df_exibicao.columns:
+        df_exibicao['Qtd'] = df_exibicao['Qtd'].apply(lambda x: f"{x:.2f}".rstrip('0').rstrip('.'))
+    return df_exibicao
+
+
+def evolucao_por_tipo(custos, formato):
+    """Valor por dia (linhas) e tipo de custo (colunas), para o gráfico de área"""
+    import pandas as pd
+
+    df_grafico = pd.DataFrame(custos)
+    df_grafico['data'] = pd.to_datetime(df_grafico['data'])
+
+    # Agrupar por data e tipo
+    pivot_data = df_grafico.groupby(['data', 'tipo_custo'])['valor'].sum().unstack(fill_value=0)
+    pivot_data.index = pivot_data.index.strftime(formato)
+    return pivot_data
@@ -0,0 +1,124 @@
+"""
+Relatório de tempo de importação (partida a frio)
+
+Cada alvo é medido num Python novo com -X importtime, depois do streamlit
+(que já está carregado quando uma página roda): o número é o que aquele
+módulo ou página acrescenta ao primeiro carregamento. Para as páginas, são
+medidas as importações de topo do script.
+
+Uso:
+    python -m services.tempo_importacao              # app e módulos pesados
+    python -m services.tempo_importacao pandas main.py
+"""
+
+import ast
+import glob
+import os
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Módulos que costumam pesar na primeira tela
+MODULOS_PESADOS = [
+    'config.firebase_config',
+    'services.repository',
+    'pandas',
+    'firebase_admin.firestore',
+    'firebase_admin.storage',
+    'pyarrow',
+    'PIL.Image',
+]
+
+# Já carregado antes de qualquer script do app
+BASE = 'streamlit'
+
+
+def importacoes_do_script(caminho):
+    """Módulos importados no topo de um script (como o Streamlit o executa)"""
+    with open(caminho, encoding='utf-8') as arquivo:
+        arvore = ast.parse(arquivo.read())
+    modulos = []
+    for no in arvore.body:
+        if isinstance(no, ast.Import):
+            modulos.extend(alias.name for alias in no.names)
+        elif isinstance(no, ast.ImportFrom) and no.module and not no.level:
+            modulos.append(no.module)
+    return modulos
+
+
+def medir(modulos, base=BASE, mais_lentos=5):
+    """
+    Tempo para importar os módulos num processo novo, com 'base' já carregado
+
+    Returns:
+        dict: {'total_ms', 'mais_lentos': [(módulo, ms próprios)],
+        'importados': nomes de todos os módulos carregados}
+    """
+    codigo = f"import {base}\n" + ''.join(f"import {m}\n" for m in modulos)
+    processo = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', codigo],
+        cwd=RAIZ, capture_output=True, text=True
+    )
+    if processo.returncode:
+        raise RuntimeError(processo.stderr.strip().splitlines()[-1])
+
+    # A base é importada primeiro; só contam as linhas depois dela
+    linhas = processo.stderr.splitlines()
+    inicio = max(i for i, linha in enumerate(linhas) if linha.split('|')[-1].strip() == base) + 1
+    proprios = []
+    total = 0
+    for linha in linhas[inicio:]:
+        if not linha.startswith('import time:') or '|' not in linha:
+            continue
+        proprio, cumulativo, nome = linha[len('import time:'):].split('|')
+        proprios.append((nome.strip(), int(proprio) / 1000))
+        # Módulos de topo têm um espaço só após o '|'; os aninhados, mais
+        if not nome.startswith('  '):
+            total += int(cumulativo) / 1000
+    importados = [nome for nome, _ in proprios]
+    proprios.sort(key=lambda item: item[1], reverse=True)
+    return {'total_ms': total, 'mais_lentos': proprios[:mais_lentos], 'importados': importados}
+
+
+def alvos_padrao():
+    """(nome, módulos) para o main.py, cada página e os módulos pesados"""
+    scripts = [os.path.join(RAIZ, 'main.py')] + sorted(glob.glob(os.path.join(RAIZ, 'pages', '*.py')))
+    alvos = [(os.path.relpath(s, RAIZ), importacoes_do_script(s)) for s in scripts]
+    return alvos + [(m, [m]) for m in MODULOS_PESADOS]
+
+
+def relatorio(alvos=None):
+    """
+    Mede cada alvo
+
+    Returns:
+        list: (nome, resultado de medir) na ordem dos alvos
+    """
+    resultados = []
+    for nome, modulos in alvos or alvos_padrao():
+        try:
+            resultados.append((nome, medir(modulos)))
+        except RuntimeError as e:
+            resultados.append((nome, {'erro': str(e)}))
+    return resultados
+
+
+def main(argumentos):
+    alvos = None
+    if argumentos:
+        alvos = [
+            (a, importacoes_do_script(os.path.join(RAIZ, a)) if a.endswith('.py') else [a])
+            for a in argumentos
+        ]
+    print(f"Tempo de importação além do {BASE} (ms)")
+    for nome, resultado in relatorio(alvos):
+        if 'erro' in resultado:
+            print(f"{nome:40} erro: {resultado['erro']}")
+            continue
+        lentos = ', '.join(f"{m} {ms:.0f}" for m, ms in resultado['mais_lentos'][:3])
+        print(f"{nome:40} {resultado['total_ms']:8.0f}   {lentos}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,109 @@
+"""
+Upload resumível em partes para o Cloud Storage
+
+Usa o protocolo de upload resumível do Storage: uma sessão é aberta para o
+blob e o arquivo sobe em partes de TAMANHO_PARTE bytes (múltiplo de
+256 KiB), cada uma com o intervalo em Content-Range. O servidor responde
+308 com o último byte guardado; se uma parte falha (conexão caída, 5xx),
+o envio pergunta ao servidor quanto já chegou e continua dali, em vez de
+recomeçar do zero. Só depois de TENTATIVAS_PARTE falhas seguidas a mesma
+parte desiste.
+
+Arquivos menores que uma parte sobem numa requisição só (sem sessão).
+"""
+
+import os
+import time
+
+# Bytes por parte; o Storage exige múltiplos de 256 KiB
+PARTE_MINIMA = 256 * 1024
+TAMANHO_PARTE = int(os.getenv("RST_UPLOAD_PARTE", str(4 * PARTE_MINIMA)))
+
+# Tentativas seguidas da mesma parte e espera antes da segunda (dobra a cada vez)
+TENTATIVAS_PARTE = 5
+ESPERA_PARTE = 1  # segundos
+
+# Respostas que valem outra tentativa; as demais (ex.: sessão expirada) desistem
+STATUS_TRANSITORIOS = {408, 429, 500, 502, 503, 504}
+
+
+class ErroUpload(Exception):
+    """O upload não pôde ser concluído"""
+
+
+class FalhaTransitoria(ErroUpload):
+    """Falha que vale tentar de novo (rede, 5xx)"""
+
+
+def enviar_em_partes(http, url_sessao, dados, tamanho_parte=TAMANHO_PARTE,
+                     tentativas=TENTATIVAS_PARTE, espera=ESPERA_PARTE, progresso=None):
+    """
+    Envia o conteúdo para uma sessão de upload resumível
+
+    Args:
+        http: Sessão HTTP autenticada (requests.Session / AuthorizedSession)
+        url_sessao: URL da sessão (Blob.create_resumable_upload_session)
+        dados: Conteúdo completo
+        tamanho_parte: Bytes por requisição (múltiplo de 256 KiB)
+        tentativas: Falhas seguidas toleradas na mesma parte
+        espera: Segundos antes da segunda tentativa
+        progresso: Função chamada com (bytes confirmados, total)
+
+    Raises:
+        ErroUpload: Falha definitiva ou tentativas esgotadas
+    """
+    if tamanho_parte % PARTE_MINIMA:
+        raise ValueError(f"tamanho_parte deve ser múltiplo de {PARTE_MINIMA}")
+    total = len(dados)
+    enviado = 0
+    falhas = 0
+    while True:
+        fim = min(enviado + tamanho_parte, total)
+        try:
+            enviado = _enviar_parte(http, url_sessao, dados[enviado:fim], enviado, total)
+            falhas = 0
+        except FalhaTransitoria:
+            falhas += 1
+            if falhas >= tentativas:
+                raise
+            time.sleep(espera * 2 ** (falhas - 1))
+            try:
+                enviado = _consultar(http, url_sessao, total)
+            except FalhaTransitoria:
+                # Sem resposta do servidor: tenta a mesma parte de novo
+                pass
+        if progresso:
+            progresso(enviado, total)
+        if enviado >= total:
+            return
+
+
+def _enviar_parte(http, url_sessao, parte, inicio, total):
+    """Envia uma parte; retorna os bytes que o servidor confirma ter"""
+    intervalo = f"bytes {inicio}-{inicio + len(parte) - 1}/{total}" if parte else f"bytes */{total}"
+    return _confirmados(_put(http, url_sessao, parte, intervalo), total)
+
+
+def _consultar(http, url_sessao, total):
+    """Pergunta ao servidor quantos bytes da sessão já foram guardados"""
+    return _confirmados(_put(http, url_sessao, b'', f"bytes */{total}"), total)
+
+
+def _put(http, url_sessao, corpo, intervalo):
+    try:
+        return http.put(url_sessao, data=corpo, headers={'Content-Range': intervalo}, timeout=60)
+    except OSError as e:
+        # requests.ConnectionError/Timeout herdam de OSError (IOError)
+        raise FalhaTransitoria(str(e)) from e
+
+
+def _confirmados(resposta, total):
+    if resposta.status_code in (200, 201):
+        return total
+    if resposta.status_code == 308:
+        # Range: bytes=0-N (ausente quando nada foi guardado ainda)
+        faixa = resposta.headers.get('Range')
+        return int(faixa.rsplit('-', 1)[1]) + 1 if faixa else 0
+    if resposta.status_code in STATUS_TRANSITORIOS:
+        raise FalhaTransitoria(f"HTTP {resposta.status_code}")
+    raise ErroUpload(f"HTTP {resposta.status_code}: {resposta.text[:200]}")
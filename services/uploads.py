@@ -0,0 +1,236 @@
+"""
+Fila de upload das notas fiscais em segundo plano
+
+Salvar um custo não espera mais pelo Storage: o formulário grava o custo
+na hora com imagem_nf_status 'pending' e entrega o arquivo à fila. Um pool
+de threads, compartilhado pelo processo (st.cache_resource), prepara e envia
+o arquivo e depois completa o custo com imagem_nf_url e
+imagem_nf_miniatura_url (status 'ok'). Falhas são tentadas de novo com
+espera crescente (cada parte de um arquivo grande já tem suas próprias
+tentativas, em services/upload_resumivel.py); esgotadas as tentativas o
+status fica 'erro', nunca uma URL provisória.
+
+Cada arquivo pendente fica também numa pasta local (RST_FILA_UPLOADS) até
+terminar, então um reinício do app retoma os envios que ficaram no meio.
+
+Os arquivos são endereçados pelo SHA-256 do conteúdo original: o blob se
+chama notas_fiscais/{sha}.{extensão} e a coleção arquivos_nf guarda as URLs
+de cada hash. A mesma nota anexada a vários itens sobe uma vez só; os
+anexos seguintes custam uma leitura do índice.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Uploads simultâneos
+TRABALHADORES_UPLOAD = 2
+
+# Tentativas por arquivo e espera antes da segunda (dobra a cada tentativa)
+TENTATIVAS_UPLOAD = 4
+ESPERA_INICIAL = 2  # segundos
+
+
+def hash_conteudo(dados):
+    """SHA-256 (hex) do conteúdo original do arquivo"""
+    return hashlib.sha256(dados).hexdigest()
+
+
+def enviar_deduplicado(repos, enviar, dados, content_type, extensao, progresso=None):
+    """
+    Envia o arquivo só se o conteúdo ainda não está no Storage
+
+    Args:
+        repos: Repositorios (usa repos.arquivos_nf)
+        enviar: Função (dados, content_type, extensao, nome=..., progresso=...) -> dict
+        dados: Conteúdo original
+        progresso: Função chamada com (bytes enviados, total)
+
+    Returns:
+        dict: Resultado do upload ou do índice, com 'reaproveitado'
+    """
+    sha = hash_conteudo(dados)
+    existente = repos.arquivos_nf.obter(sha)
+    if existente:
+        return {**existente, 'reaproveitado': True}
+    upload = enviar(dados, content_type, extensao, nome=sha, progresso=progresso)
+    repos.arquivos_nf.registrar(sha, {
+        'url': upload['url'],
+        'miniatura_url': upload.get('miniatura_url') or '',
+        'content_type': content_type,
+        'bytes': upload.get('bytes', len(dados)),
+        'bytes_original': len(dados),
+    })
+    return {**upload, 'reaproveitado': False}
+
+
+class FilaUploads:
+    """Pool de threads que envia notas fiscais e completa os custos"""
+
+    def __init__(self, repos, enviar, pasta, trabalhadores=TRABALHADORES_UPLOAD,
+                 tentativas=TENTATIVAS_UPLOAD, espera=ESPERA_INICIAL):
+        """
+        Args:
+            repos: Repositorios (services.repository)
+            enviar: Função (dados, content_type, extensao, nome=..., progresso=...)
+                -> dict com 'url' e 'miniatura_url'; deve lançar exceção em
+                caso de falha
+            pasta: Pasta onde os arquivos pendentes ficam até o envio
+            trabalhadores: Uploads simultâneos
+            tentativas: Tentativas por arquivo
+            espera: Segundos antes da segunda tentativa
+        """
+        self.repos = repos
+        self.enviar_arquivo = enviar
+        self.pasta = pasta
+        self.tentativas = tentativas
+        self.espera = espera
+        self._executor = ThreadPoolExecutor(max_workers=trabalhadores, thread_name_prefix='upload_nf')
+        self._lock = threading.Lock()
+        self._pendentes = {}  # custo_id -> Future
+        self._andamento = {}  # custo_id -> (bytes enviados, total)
+        os.makedirs(pasta, exist_ok=True)
+        self._retomar()
+
+    def enfileirar(self, custo_id, data, dados, content_type, extensao):
+        """
+        Agenda o envio da nota fiscal de um custo já gravado
+
+        Args:
+            custo_id: Id do custo em custos_contabeis
+            data: Data do custo (YYYY-MM-DD), para invalidar o mês certo
+            dados: Conteúdo do arquivo (lido antes do rerun descartar o upload)
+            content_type: Tipo MIME do arquivo
+            extensao: Extensão original (sem ponto)
+
+        Returns:
+            Future: Conclui com o status final ('ok' ou 'erro')
+        """
+        trabalho = {'custo_id': custo_id, 'data': data, 'content_type': content_type, 'extensao': extensao}
+        base = os.path.join(self.pasta, custo_id)
+        with open(f"{base}.bin", 'wb') as arquivo:
+            arquivo.write(dados)
+        # O .json só aparece depois do conteúdo completo: é ele que marca o trabalho
+        with open(f"{base}.json", 'w', encoding='utf-8') as arquivo:
+            json.dump(trabalho, arquivo)
+        return self._agendar(trabalho)
+
+    def pendentes(self):
+        """Quantidade de envios ainda não concluídos"""
+        with self._lock:
+            return sum(1 for futuro in self._pendentes.values() if not futuro.done())
+
+    def andamento(self):
+        """
+        Envios em curso, para mostrar o progresso na página
+
+        Returns:
+            dict: custo_id -> (bytes enviados, total); total 0 se ainda não começou
+        """
+        with self._lock:
+            return {
+                custo_id: self._andamento.get(custo_id, (0, 0))
+                for custo_id, futuro in self._pendentes.items() if not futuro.done()
+            }
+
+    def aguardar(self, timeout=None):
+        """Espera os envios agendados até agora terminarem"""
+        with self._lock:
+            futuros = list(self._pendentes.values())
+        wait(futuros, timeout=timeout)
+
+    def _agendar(self, trabalho):
+        futuro = self._executor.submit(self._processar, trabalho)
+        with self._lock:
+            self._pendentes[trabalho['custo_id']] = futuro
+        futuro.add_done_callback(lambda _: self._concluido(trabalho['custo_id'], futuro))
+        return futuro
+
+    def _concluido(self, custo_id, futuro):
+        with self._lock:
+            if self._pendentes.get(custo_id) is futuro:
+                del self._pendentes[custo_id]
+                self._andamento.pop(custo_id, None)
+
+    def _retomar(self):
+        """Reagenda os envios que ficaram na pasta (app reiniciado no meio)"""
+        for nome in sorted(os.listdir(self.pasta)):
+            if not nome.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.pasta, nome), encoding='utf-8') as arquivo:
+                    trabalho = json.load(arquivo)
+            except (OSError, ValueError):
+                logger.warning("Upload pendente ilegível: %s", nome)
+                continue
+            self._agendar(trabalho)
+
+    def _processar(self, trabalho):
+        custo_id = trabalho['custo_id']
+        base = os.path.join(self.pasta, custo_id)
+        try:
+            with open(f"{base}.bin", 'rb') as arquivo:
+                dados = arquivo.read()
+        except OSError as e:
+            return self._finalizar(trabalho, {'imagem_nf_status': 'erro', 'imagem_nf_erro': str(e)})
+
+        def progresso(enviados, total):
+            with self._lock:
+                self._andamento[custo_id] = (enviados, total)
+
+        erro = None
+        for tentativa in range(self.tentativas):
+            if tentativa:
+                time.sleep(self.espera * 2 ** (tentativa - 1))
+            try:
+                upload = enviar_deduplicado(
+                    self.repos, self.enviar_arquivo, dados, trabalho['content_type'], trabalho['extensao'],
+                    progresso=progresso
+                )
+            except Exception as e:
+                erro = e
+                logger.warning("Upload da NF do custo %s falhou (tentativa %d/%d): %s",
+                               custo_id, tentativa + 1, self.tentativas, e)
+                continue
+            return self._finalizar(trabalho, {
+                'imagem_nf_url': upload['url'],
+                'imagem_nf_miniatura_url': upload.get('miniatura_url') or '',
+                'imagem_nf_status': 'ok',
+            })
+        return self._finalizar(trabalho, {'imagem_nf_status': 'erro', 'imagem_nf_erro': str(erro)})
+
+    def _finalizar(self, trabalho, campos):
+        try:
+            self.repos.custos.atualizar(trabalho['custo_id'], trabalho['data'], campos)
+        except Exception:
+            # O arquivo continua na pasta e o envio é refeito no próximo início
+            logger.exception("Não foi possível atualizar o custo %s após o upload", trabalho['custo_id'])
+            return 'erro'
+        base = os.path.join(self.pasta, trabalho['custo_id'])
+        for extensao in ('json', 'bin'):
+            try:
+                os.remove(f"{base}.{extensao}")
+            except OSError:
+                pass
+        return campos['imagem_nf_status']
+
+
+@st.cache_resource
+def get_fila_uploads():
+    """Fila de uploads compartilhada pelo processo"""
+    from config.firebase_config import enviar_nota_fiscal
+    from services.repository import get_repositorios
+
+    return FilaUploads(
+        get_repositorios(),
+        enviar_nota_fiscal,
+        os.getenv("RST_FILA_UPLOADS", os.path.join(".rst_cache", "uploads"))
+    )
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+"""
+Testes do índice de busca de fornecedores
+"""
+
+import sys
+import os
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.busca import IndiceFornecedores, normalizar
+
+FORNECEDORES = [
+    {'id': '1', 'nome': 'Agropecuária São João', 'cnpj_cpf': '12.345.678/0001-90', 'telefone': '(11) 98765-4321'},
+    {'id': '2', 'nome': 'Casa do Adubo', 'cnpj_cpf': '', 'telefone': '(11) 3333-1234'},
+    {'id': '3', 'nome': 'Adubos Bom Preço', 'cnpj_cpf': '987.654.321-00', 'telefone': ''},
+    {'id': '4', 'nome': 'Bom Frete', 'telefone': '(19) 99999-0000'},
+]
+
+
+def nomes(resultados):
+    return [f['nome'] for f in resultados]
+
+
+def test_normalizar_remove_acentos_e_espacos():
+    assert normalizar('  Agropecuária   SÃO João ') == 'agropecuaria sao joao'
+
+
+def test_busca_sem_acentos_e_por_prefixo_de_palavra():
+    indice = IndiceFornecedores(FORNECEDORES)
+
+    assert nomes(indice.buscar('agropecuaria')) == ['Agropecuária São João']
+    assert nomes(indice.buscar('sao jo')) == ['Agropecuária São João']
+    # Nome começando pelo termo vem antes de palavra no meio do nome
+    assert nomes(indice.buscar('adubo')) == ['Adubos Bom Preço', 'Casa do Adubo']
+
+
+def test_busca_por_documento_telefone_e_erro_de_digitacao():
+    indice = IndiceFornecedores(FORNECEDORES)
+
+    assert nomes(indice.buscar('12345678')) == ['Agropecuária São João']
+    # Prefixo do CPF vem antes do mesmo trecho no meio de um telefone
+    assert nomes(indice.buscar('987.654')) == ['Adubos Bom Preço', 'Agropecuária São João']
+    assert nomes(indice.buscar('3333-1234')) == ['Casa do Adubo']
+    assert nomes(indice.buscar('agropecuaira')) == ['Agropecuária São João']
+    assert indice.buscar('xyz') == []
+    assert len(indice.buscar('', k=2)) == 2
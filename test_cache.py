@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Testes do cache com invalidação por tags
+"""
+
+import sys
+import os
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.cache import CacheComTags, tag
+
+
+def test_invalidacao_restrita_a_colecao_e_mes():
+    cache = CacheComTags()
+    cargas = []
+
+    def carregar(nome):
+        def _carregar():
+            cargas.append(nome)
+            return [nome]
+        return _carregar
+
+    cache.obter('vendas_ago', carregar('vendas_ago'), 60, [tag('vendas', '2024-08')])
+    cache.obter('vendas_set', carregar('vendas_set'), 60, [tag('vendas', '2024-09')])
+    cache.obter('custos_ago', carregar('custos_ago'), 60, [tag('custos_contabeis', '2024-08')])
+    cache.obter('fornecedores', carregar('fornecedores'), 60, [tag('fornecedores')])
+
+    cache.invalidar('vendas', '2024-08')
+
+    for chave in ['vendas_ago', 'vendas_set', 'custos_ago', 'fornecedores']:
+        cache.obter(chave, carregar(chave), 60, [])
+
+    # Só a entrada de vendas de agosto foi recarregada
+    assert cargas.count('vendas_ago') == 2
+    assert cargas.count('vendas_set') == 1
+    assert cargas.count('custos_ago') == 1
+    assert cargas.count('fornecedores') == 1
+
+
+def test_invalidacao_sem_mes_remove_todos_os_meses():
+    cache = CacheComTags()
+    cache.obter('a', lambda: 1, 60, [tag('vendas', '2024-08')])
+    cache.obter('b', lambda: 2, 60, [tag('vendas', '2024-09')])
+
+    cache.invalidar('vendas')
+
+    assert cache.obter('a', lambda: 10, 60) == 10
+    assert cache.obter('b', lambda: 20, 60) == 20
+
+
+def test_valor_retornado_e_copia():
+    cache = CacheComTags()
+    valor = cache.obter('x', lambda: [{'valor': 1}], 60)
+    valor[0]['valor'] = 99
+    assert cache.obter('x', lambda: [], 60) == [{'valor': 1}]
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Testes do teste de carga com sessões simultâneas (carga.py)
+"""
+
+import sys
+import os
+
+import streamlit as st
+from streamlit import config
+from streamlit.runtime import Runtime
+from streamlit.testing.v1 import app_test, local_script_runner
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import carga
+
+
+def test_percentil_por_posicao():
+    valores = list(range(1, 101))
+    assert [carga.percentil(valores, p) for p in (50, 95, 99)] == [50, 95, 99]
+    assert carga.percentil([7.0], 99) == 7.0
+
+
+def test_sessoes_simultaneas_medem_cada_rerun(monkeypatch, tmp_path):
+    # O harness muda o ambiente e o AppTest do processo; tudo volta no fim
+    for variavel in ('RST_INSTRUMENTACAO', 'RST_CACHE_PARTICOES', 'RST_FILA_UPLOADS', 'RST_FIREBASE_FAKE'):
+        monkeypatch.setenv(variavel, '')
+    monkeypatch.delenv('RST_BACKEND', raising=False)
+    monkeypatch.setattr(app_test, 'Runtime', app_test.Runtime)
+    monkeypatch.setattr(app_test, 'ScriptCache', app_test.ScriptCache)
+    monkeypatch.setattr(local_script_runner, 'ScriptCache', local_script_runner.ScriptCache)
+    monkeypatch.setattr(Runtime, '_instance', None)
+    try:
+        resultado = carga.executar(sessoes=3, fluxos=4, custos=60, vendas=30, fornecedores=5,
+                                   diretorio=str(tmp_path))
+    finally:
+        config.set_option('global.appTest', False)
+        st.cache_resource.clear()
+
+    casos = resultado['casos']
+    assert resultado['erros'] == []
+    assert casos['total']['passos'] >= 3 * 4
+    assert casos['total']['p50_ms'] <= casos['total']['p95_ms'] <= casos['total']['p99_ms']
+    # A primeira visita de cada página lê o banco; as sessões não se misturam
+    abertura = [nome for nome in casos if nome.endswith('.abrir')]
+    assert abertura and all(casos[nome]['passos'] <= 3 for nome in abertura)
+    assert any(casos[nome]['documentos_por_passo'] > 0 for nome in abertura)
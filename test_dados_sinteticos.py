@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Testes do gerador de dados sintéticos e do benchmark
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import benchmark
+from services.dados_sinteticos import GeradorDados, popular
+from services.repository import SQLiteBackend, criar_repositorios
+
+
+def test_mesma_semente_gera_os_mesmos_documentos():
+    def gerar(semente):
+        gerador = GeradorDados(semente)
+        fornecedores = [dict(f, id=str(i)) for i, f in enumerate(gerador.fornecedores(5))]
+        custos = gerador.custos(20, '2024-08', fornecedores)
+        vendas = gerador.vendas(20, '2024-08')
+        for doc in custos + vendas:
+            doc.pop('timestamp')
+            doc.get('acerto_consumo', {}).pop('data_acerto', None)
+        return fornecedores, custos, vendas
+
+    assert gerar(7) == gerar(7)
+    assert gerar(7) != gerar(8)
+
+    _, custos, vendas = gerar(7)
+    assert all(c['data'].startswith('2024-08') for c in custos)
+    for venda in vendas:
+        assert venda['valor_total'] == round(sum(p['valor_total'] for p in venda['produtos']), 2)
+        if venda['status_recebimento'] == 'Acertado':
+            assert venda['modalidade_venda'] == 'Consignação'
+            assert {'produtos_acerto', 'valor_a_receber', 'eficiencia_percentual'} <= set(venda['acerto_consumo'])
+
+
+def test_popular_grava_documentos_e_rollups():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    volume = popular(repos, ['2024-07', '2024-08'], custos_por_mes=30, vendas_por_mes=15, fornecedores=4)
+
+    assert volume == {'fornecedores': 4, 'custos_contabeis': 60, 'vendas': 30}
+    custos = repos.custos.listar_periodo('2024-08')
+    assert len(custos) == 30
+    assert repos.rollups.resumo_custos('2024-08')['registros'] == 30
+    vendas = repos.vendas.listar_periodo('2024-07')
+    resumo = repos.rollups.resumo_vendas('2024-07')
+    assert resumo['registros'] == 15
+    assert abs(resumo['total_vendas'] - sum(v['valor_total'] for v in vendas)) < 1e-6
+
+
+@pytest.mark.parametrize('backend', benchmark.BACKENDS)
+def test_benchmark_mede_todos_os_casos(tmp_path, backend):
+    resultado = benchmark.executar(custos=40, vendas=20, fornecedores=5, meses=2, repeticoes=2,
+                                   cache_dir=str(tmp_path), backend=backend)
+
+    assert resultado['volume']['custos_contabeis'] == 80
+    assert resultado['casos']['custos_mes.carga_completa']['documentos'] == 40
+    assert all(caso['mediana_ms'] >= 0 for caso in resultado['casos'].values())
+    comparacao = benchmark.comparar(resultado, resultado)
+    assert comparacao and all(variacao == 0 for *_, variacao in comparacao)
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Testes da exportação do histórico completo
+"""
+
+import sys
+import os
+import csv
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.exportacao import exportar, paginas
+from services.repository import SQLiteBackend, criar_repositorios
+
+
+def repos_com_vendas(quantidade):
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    for i in range(quantidade):
+        repos.vendas.adicionar({
+            'numero_venda': f'V-{i}', 'data_venda': f'2024-0{1 + i % 9}-10', 'status_recebimento': 'Pago',
+            'valor_total': 10.0,
+            'produtos': [{'id': 'a', 'nome': 'Alface', 'quantidade': 2.0, 'valor_total': 6.0},
+                         {'id': 'b', 'nome': 'Rúcula', 'quantidade': 1.0, 'valor_total': 4.0}],
+        })
+    return repos
+
+
+def test_paginas_percorrem_colecao_inteira_sem_repetir():
+    repos = repos_com_vendas(23)
+    vistos = [v['id'] for pagina in paginas(repos.backend, 'vendas', tamanho=5) for v in pagina]
+    assert len(vistos) == len(set(vistos)) == 23
+
+
+def test_csv_com_produtos_em_linhas(tmp_path):
+    repos = repos_com_vendas(7)
+    progresso = []
+
+    caminho, linhas = exportar(repos.backend, 'vendas', 'csv', tamanho_pagina=3,
+                               progresso=lambda lidos, escritas: progresso.append(lidos), pasta=str(tmp_path))
+
+    assert linhas == 14
+    assert progresso == [3, 6, 7]
+    with open(caminho, encoding='utf-8-sig') as arquivo:
+        registros = list(csv.DictReader(arquivo))
+    assert len(registros) == 14
+    assert {r['produto_nome'] for r in registros} == {'Alface', 'Rúcula'}
+    assert registros[0]['data_venda'] <= registros[-1]['data_venda']
+
+
+def test_parquet_com_schema_fixo(tmp_path):
+    import pyarrow.parquet as pq
+
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    repos.custos.adicionar({'data': '2024-08-02', 'tipo_custo': 'Custos Fixos', 'valor': 100.0})
+    repos.custos.adicionar({'data': '2024-08-03', 'tipo_custo': 'Investimentos', 'valor': '1200',
+                            'depreciacao_mensal': 100.0})
+
+    caminho, linhas = exportar(repos.backend, 'custos_contabeis', 'parquet', pasta=str(tmp_path))
+
+    tabela = pq.read_table(caminho)
+    assert linhas == 2 and tabela.num_rows == 2
+    assert tabela.column('valor').to_pylist() == [100.0, 1200.0]
+    assert tabela.column('depreciacao_mensal').to_pylist() == [None, 100.0]
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Testes do Firestore/Storage falsos (services/firebase_falso.py)
+
+Os cenários de test_repository.py rodam de novo sobre o FirestoreBackend
+com o FirestoreFalso, exercitando as consultas do SDK sem credenciais.
+"""
+
+import sys
+import os
+from datetime import datetime
+
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import test_repository
+from services.firebase_falso import BucketFalso, FirestoreFalso, SessaoHttpFalsa
+from services.live_cache import CacheAoVivo
+from services.repository import FirestoreBackend, criar_repositorios
+from services.upload_resumivel import PARTE_MINIMA, enviar_em_partes
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+CENARIOS = [nome for nome in dir(test_repository) if nome.startswith('test_')]
+
+
+@pytest.mark.parametrize('cenario', CENARIOS)
+def test_cenarios_do_repositorio_sobre_firestore_falso(cenario, monkeypatch):
+    monkeypatch.setattr(
+        test_repository, 'novos_repositorios',
+        lambda: criar_repositorios(FirestoreBackend(FirestoreFalso()))
+    )
+    getattr(test_repository, cenario)()
+
+
+def test_consultas_seguem_regras_do_firestore():
+    db = FirestoreFalso()
+    for dados in [{'n': 3, 'tag': 'a'}, {'n': 1}, {'n': 'texto'}, {'tag': 'b'}, {'n': 2, 'tag': 'a'}]:
+        db.collection('c').add(dados)
+
+    # Documentos sem o campo e de outro tipo ficam de fora da desigualdade
+    assert [d.get('n') for d in db.collection('c').where('n', '>', 0).stream()] == [1, 2, 3]
+    ordenados = db.collection('c').where('tag', '==', 'a').order_by('n', direction='DESCENDING').limit(1)
+    assert [d.to_dict() for d in ordenados.stream()] == [{'n': 3, 'tag': 'a'}]
+    assert [d.to_dict() for d in db.collection('c').where('tag', '==', 'b').select(['n']).stream()] == [{}]
+
+    lote = db.batch()
+    lote.set(db.collection('c').document('x'), {'n': 10})
+    lote.create(db.collection('c').document('x'), {'n': 11})
+    with pytest.raises(Exception):
+        lote.commit()
+    assert not db.collection('c').document('x').get().exists
+    assert db.operacoes['escritas'] == 5
+
+
+def test_listener_recebe_so_as_mudancas():
+    repos = criar_repositorios(FirestoreBackend(FirestoreFalso()))
+    repos.custos.adicionar({'data': '2024-08-02', 'valor': 10.0})
+    cache = CacheAoVivo(repos.backend)
+
+    assert [c['valor'] for c in cache.documentos('custos_contabeis', '2024-08-01')] == [10.0]
+    custo_id = repos.custos.adicionar({'data': '2024-08-05', 'valor': 20.0})
+    repos.custos.atualizar(custo_id, '2024-08-05', {'data': '2024-07-30'})
+
+    assert [c['valor'] for c in cache.documentos('custos_contabeis', '2024-08-01')] == [10.0]
+    cache.encerrar()
+
+
+def test_upload_resumivel_no_bucket_falso():
+    bucket = BucketFalso()
+    blob = bucket.blob('notas_fiscais/grande.pdf')
+    dados = bytes(range(256)) * (PARTE_MINIMA // 128 + 7)
+    sessao = blob.create_resumable_upload_session(content_type='application/pdf', size=len(dados))
+    progresso = []
+
+    enviar_em_partes(SessaoHttpFalsa(bucket), sessao, dados, tamanho_parte=PARTE_MINIMA,
+                     progresso=lambda enviado, total: progresso.append(enviado))
+
+    assert blob.download_as_bytes() == dados
+    assert progresso == [PARTE_MINIMA, 2 * PARTE_MINIMA, len(dados)]
+    assert blob.public_url.endswith('notas_fiscais/grande.pdf')
+
+
+@pytest.fixture
+def firebase_falso(monkeypatch, tmp_path):
+    """init_firebase()/get_bucket() com os falsos; recursos do processo recriados"""
+    monkeypatch.setenv('RST_FIREBASE_FAKE', '1')
+    monkeypatch.delenv('RST_BACKEND', raising=False)
+    monkeypatch.setenv('RST_CACHE_PARTICOES', str(tmp_path / 'particoes.db'))
+    st.cache_resource.clear()
+    yield
+    st.cache_resource.clear()
+
+
+def test_pagina_inicial_sobre_firebase_falso(firebase_falso):
+    from config.firebase_config import enviar_nota_fiscal, test_firebase_connection
+    from services.repository import get_repositorios
+
+    assert test_firebase_connection()[0]
+    repos = get_repositorios()
+    repos.custos.adicionar({'data': datetime.now().strftime('%Y-%m-%d'), 'tipo_custo': 'Custos Fixos',
+                            'valor': 123.0, 'fornecedor': 'A'})
+
+    at = AppTest.from_file(os.path.join(RAIZ, 'main.py'), default_timeout=30).run()
+
+    assert not at.exception
+    assert dict((m.label, m.value) for m in at.metric)['💰 Custos Mês'] == 'R$ 123.00'
+    resultado = enviar_nota_fiscal(b'%PDF-1.4 nota', 'application/pdf', 'pdf', nome='nf')
+    assert resultado['url'].endswith('notas_fiscais/nf.pdf')
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Testes da preparação de imagens de notas fiscais
+"""
+
+import sys
+import os
+import io
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from PIL import Image
+
+from services.imagens import preparar_arquivo
+
+
+def foto(largura, altura, orientacao=None, modo='RGB', formato='JPEG'):
+    imagem = Image.effect_noise((largura, altura), 64).convert(modo)
+    saida = io.BytesIO()
+    opcoes = {}
+    if orientacao:
+        exif = Image.Exif()
+        exif[0x0112] = orientacao
+        opcoes['exif'] = exif
+    imagem.save(saida, formato, quality=95, **opcoes) if formato == 'JPEG' else imagem.save(saida, formato)
+    return saida.getvalue()
+
+
+def test_foto_girada_pelo_exif_e_reduzida():
+    # Orientação 6: a câmera gravou deitada, a foto é em pé
+    original = foto(4000, 3000, orientacao=6)
+
+    arquivo = preparar_arquivo(original, 'image/jpeg', 'jpg', max_lado=1600)
+
+    imagem = Image.open(io.BytesIO(arquivo.dados))
+    assert imagem.size == (1200, 1600)
+    assert 0x0112 not in imagem.getexif()
+    assert len(arquivo.dados) < len(original) / 5
+    assert max(Image.open(io.BytesIO(arquivo.miniatura)).size) <= 320
+    assert arquivo.content_type == 'image/jpeg' and arquivo.extensao == 'jpg'
+
+
+def test_png_com_transparencia_vira_webp():
+    original = foto(800, 600, modo='RGBA', formato='PNG')
+
+    arquivo = preparar_arquivo(original, 'image/png', 'png', formato='webp')
+
+    assert arquivo.content_type == 'image/webp' and arquivo.extensao == 'webp'
+    assert Image.open(io.BytesIO(arquivo.dados)).size == (800, 600)
+
+
+def test_pdf_passa_sem_alteracao():
+    arquivo = preparar_arquivo(b'%PDF-1.4 conteudo', 'application/pdf', 'pdf')
+    assert arquivo.dados == b'%PDF-1.4 conteudo'
+    assert arquivo.miniatura is None
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Testes da importação de custos em lote
+"""
+
+import sys
+import os
+import io
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import services.importacao as importacao
+from services.importacao import COLECAO_IMPORTACOES, importar_custos_planilha, numero
+from services.repository import SQLiteBackend, criar_repositorios
+
+FORNECEDORES = [
+    {'id': 'f1', 'nome': 'Agropecuária São João', 'cnpj_cpf': '12.345.678/0001-90'},
+]
+
+CABECALHO = "data;tipo_custo;categoria;descricao_item;quantidade;unidade_medida;valor_unitario;fornecedor;vida_util_meses\n"
+
+
+def planilha(linhas):
+    return io.BytesIO((CABECALHO + ''.join(linhas)).encode('utf-8'))
+
+
+def test_linhas_validas_gravadas_e_invalidas_reportadas():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    arquivo = planilha([
+        "05/08/2024;Custos Variáveis;sementes;Semente de alface;2;CX;45,90;agropecuaria sao joao;\n",
+        "2024-08-06;Investimentos;Sistema de Irrigação;Bomba;1;UN;1.200,00;12345678000190;24\n",
+        "07/08/2024;Custos Fixos;sementes;Errado;1;UN;10;Agropecuária São João;\n",
+        "32/08/2024;Custos Fixos;internet;Internet;0;UN;10;Desconhecido;\n",
+    ])
+
+    resultado = importar_custos_planilha(repos, arquivo, 'custos.csv', FORNECEDORES)
+
+    assert resultado.concluida and resultado.falha is None
+    assert resultado.gravadas == 2
+    assert [e['linha'] for e in resultado.erros] == [4, 5]
+    assert len(resultado.erros[1]['erros']) == 3
+
+    custos = repos.custos.listar_periodo('2024-08')
+    investimento = [c for c in custos if c['tipo_custo'] == 'Investimentos'][0]
+    assert investimento['categoria'] == 'irrigacao'
+    assert investimento['valor'] == 1200.0
+    assert investimento['depreciacao_mensal'] == 50.0
+    assert investimento['fornecedor_id'] == 'f1'
+    resumo = repos.rollups.resumo_custos('2024-08')
+    assert resumo['custos_variaveis'] == 91.8
+    assert resumo['registros'] == 2
+
+
+def test_lotes_respeitam_limite_e_retomam_apos_falha(monkeypatch):
+    monkeypatch.setattr(importacao, 'MAX_OPERACOES_LOTE', 5)
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    linhas = [f"{dia:02d}/08/2024;Custos Fixos;internet;Item {dia};1;UN;10;Agropecuária São João;\n"
+              for dia in range(1, 11)]
+
+    # Terceiro lote falha: os dois primeiros (3 custos cada) ficam gravados
+    adicionar_lote = repos.custos.adicionar_lote
+    lotes = []
+
+    def adicionar_com_falha(custos, operacoes=()):
+        if len(lotes) == 2:
+            raise RuntimeError("conexão perdida")
+        lotes.append(len(custos))
+        return adicionar_lote(custos, operacoes)
+
+    repos.custos.adicionar_lote = adicionar_com_falha
+    resultado = importar_custos_planilha(repos, planilha(linhas), 'custos.csv', FORNECEDORES)
+    assert resultado.falha == "conexão perdida"
+    assert lotes == [3, 3]
+
+    repos.custos.adicionar_lote = adicionar_lote
+    resultado = importar_custos_planilha(repos, planilha(linhas), 'custos.csv', FORNECEDORES)
+    assert resultado.concluida
+    assert resultado.puladas == 6 and resultado.gravadas == 4
+    assert len(repos.custos.listar_periodo('2024-08')) == 10
+
+    # Mesmo arquivo de novo: nada é gravado em dobro
+    resultado = importar_custos_planilha(repos, planilha(linhas), 'custos.csv', FORNECEDORES)
+    assert resultado.gravadas == 0
+    assert len(repos.custos.listar_periodo('2024-08')) == 10
+    assert len(repos.backend.listar(COLECAO_IMPORTACOES)) == 1
+
+
+def test_numero_aceita_formato_brasileiro():
+    assert numero('1.234,56') == 1234.56
+    assert numero('R$ 10,00') == 10.0
+    assert numero('12.5') == 12.5
+    assert numero(3) == 3.0
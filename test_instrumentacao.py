@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Testes da instrumentação das chamadas ao banco
+"""
+
+import sys
+import os
+import json
+import logging
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.instrumentacao import BackendInstrumentado, Instrumentacao
+from services.repository import SQLiteBackend, criar_repositorios
+
+CUSTO = {
+    'data': '2024-08-05', 'tipo_custo': 'Custos Fixos', 'categoria': 'internet',
+    'descricao_item': 'Internet', 'quantidade': 1.0, 'unidade_medida': 'UN',
+    'valor_unitario': 100.0, 'valor': 100.0, 'fornecedor': 'Provedor',
+}
+
+
+def test_leituras_e_escritas_registradas_por_colecao(caplog):
+    instrumentacao = Instrumentacao()
+    repos = criar_repositorios(BackendInstrumentado(SQLiteBackend(':memory:'), instrumentacao))
+
+    with caplog.at_level(logging.INFO, logger='rst.banco'):
+        repos.custos.adicionar(dict(CUSTO))
+        repos.custos.adicionar(dict(CUSTO, valor=50.0))
+        custos = repos.custos.listar_periodo('2024-08')
+
+    por_operacao = {(l['operacao'], l['colecao']): l for l in instrumentacao.processo.linhas()}
+    # Cada custo vai num lote com o incremento do rollup: 2 escritas por lote
+    lote = por_operacao[('executar_lote', 'custos_contabeis,rollups')]
+    assert lote['chamadas'] == 2 and lote['documentos'] == 4
+    leitura = por_operacao[('listar', 'custos_contabeis')]
+    assert leitura['documentos'] == len(custos) == 2
+    assert leitura['bytes'] > 0
+
+    registro = json.loads(caplog.records[-1].getMessage())
+    assert registro['operacao'] == 'listar' and registro['documentos'] == 2
+
+
+def test_totais_do_rerun_zerados_e_da_sessao_acumulados():
+    instrumentacao = Instrumentacao()
+    instrumentacao.registrar('listar', 'vendas', 10, 500, 3.0, sessao_id='a')
+    instrumentacao.iniciar_rerun('a')
+    instrumentacao.registrar('obter', 'vendas', 1, 50, 1.0, sessao_id='a')
+    instrumentacao.registrar('listar', 'vendas', 7, 300, 2.0, sessao_id='b')
+    instrumentacao.registrar('storage.upload', 'notas_fiscais', 1, 9000, 40.0)
+
+    rerun, sessao = instrumentacao.totais('a')
+    assert (rerun.chamadas, rerun.documentos) == (1, 1)
+    assert (sessao.chamadas, sessao.documentos) == (2, 11)
+    assert instrumentacao.processo.documentos == 19
+    assert instrumentacao.processo.linhas()[0]['operacao'] == 'storage.upload'
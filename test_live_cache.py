@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Testes do cache ao vivo com listeners simulados
+"""
+
+import sys
+import os
+from types import SimpleNamespace
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.live_cache import CacheAoVivo, TabelaAoVivo
+
+
+def mudanca(tipo, doc_id, dados=None):
+    """Stand-in de um DocumentChange do Firestore"""
+    documento = SimpleNamespace(id=doc_id, to_dict=lambda: dict(dados or {}))
+    return SimpleNamespace(type=SimpleNamespace(name=tipo), document=documento)
+
+
+class WatchFalso:
+    def __init__(self):
+        self.is_active = True
+        self.cancelado = False
+
+    def unsubscribe(self):
+        self.cancelado = True
+        self.is_active = False
+
+
+class BackendFalso:
+    def __init__(self):
+        self.assinaturas = []  # (colecao, filtros, callback, watch)
+
+    def assinar(self, colecao, filtros, callback):
+        watch = WatchFalso()
+        self.assinaturas.append((colecao, filtros, callback, watch))
+        return watch
+
+
+def test_tabela_aplica_adicoes_alteracoes_e_remocoes():
+    tabela = TabelaAoVivo()
+    assert not tabela.pronta
+
+    tabela.aplicar(None, [mudanca('ADDED', 'a', {'valor': 1}), mudanca('ADDED', 'b', {'valor': 2})], None)
+    assert tabela.pronta
+    tabela.aplicar(None, [mudanca('MODIFIED', 'a', {'valor': 10}), mudanca('REMOVED', 'b')], None)
+
+    assert tabela.documentos() == [{'valor': 10, 'id': 'a'}]
+
+
+def test_primeiro_snapshot_vazio_deixa_tabela_pronta():
+    tabela = TabelaAoVivo()
+    tabela.aplicar(None, [], None)
+    assert tabela.pronta
+    assert tabela.documentos() == []
+
+
+def test_documentos_sao_copias():
+    tabela = TabelaAoVivo()
+    tabela.aplicar(None, [mudanca('ADDED', 'a', {'produtos': [{'nome': 'Alface'}]})], None)
+    tabela.documentos()[0]['produtos'][0]['nome'] = 'Outro'
+    assert tabela.documentos()[0]['produtos'][0]['nome'] == 'Alface'
+
+
+def test_none_ate_o_primeiro_snapshot_e_depois_ordenado():
+    backend = BackendFalso()
+    cache = CacheAoVivo(backend)
+
+    assert cache.documentos('vendas', '2024-08-01') is None
+
+    colecao, filtros, callback, _ = backend.assinaturas[0]
+    assert colecao == 'vendas'
+    assert filtros == [('data_venda', '>=', '2024-08-01')]
+    callback(None, [mudanca('ADDED', 'a', {'data_venda': '2024-08-02'}),
+                    mudanca('ADDED', 'b', {'data_venda': '2024-08-09'})], None)
+
+    assert [v['id'] for v in cache.documentos('vendas', '2024-08-01')] == ['b', 'a']
+    assert len(backend.assinaturas) == 1
+
+
+def test_reassina_quando_muda_o_mes_ou_o_listener_cai():
+    backend = BackendFalso()
+    cache = CacheAoVivo(backend)
+
+    cache.documentos('custos_contabeis', '2024-08-01')
+    cache.documentos('custos_contabeis', '2024-08-01')
+    assert len(backend.assinaturas) == 1
+
+    cache.documentos('custos_contabeis', '2024-09-01')
+    assert len(backend.assinaturas) == 2
+    assert backend.assinaturas[0][3].cancelado
+
+    backend.assinaturas[1][3].is_active = False
+    cache.documentos('custos_contabeis', '2024-09-01')
+    assert len(backend.assinaturas) == 3
+
+
+def test_fornecedores_sem_filtro_de_mes():
+    backend = BackendFalso()
+    cache = CacheAoVivo(backend)
+
+    cache.documentos('fornecedores', '2024-08-01')
+    cache.documentos('fornecedores', '2024-09-01')
+
+    assert len(backend.assinaturas) == 1
+    assert backend.assinaturas[0][1] == []
+
+
+def test_encerrar_cancela_listeners():
+    backend = BackendFalso()
+    cache = CacheAoVivo(backend)
+    cache.documentos('vendas', '2024-08-01')
+    cache.documentos('fornecedores')
+
+    cache.encerrar()
+
+    assert all(watch.cancelado for *_, watch in backend.assinaturas)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Testes da importação de NF-e
+"""
+
+import sys
+import os
+import io
+import zipfile
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.nfe import importar_nfe, itens_nfe, unidade_app
+from services.repository import SQLiteBackend, criar_repositorios
+
+
+def nfe_xml(numero, cnpj, nome, itens, data='2024-08-05T10:00:00-03:00'):
+    dets = ''.join(
+        f'<det nItem="{i}"><prod><cProd>{i}</cProd><xProd>{descricao}</xProd><uCom>{unidade}</uCom>'
+        f'<qCom>{quantidade}</qCom><vUnCom>{valor}</vUnCom><vProd>{quantidade * valor:.2f}</vProd></prod></det>'
+        for i, (descricao, unidade, quantidade, valor) in enumerate(itens, start=1)
+    )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<nfeProc xmlns="http://www.portalfiscal.inf.br/nfe" versao="4.00"><NFe><infNFe Id="NFe3524081234567800019055001000000'
+        f'{numero:03d}1000000001" versao="4.00">'
+        f'<ide><nNF>{numero}</nNF><dhEmi>{data}</dhEmi></ide>'
+        f'<emit><CNPJ>{cnpj}</CNPJ><xNome>{nome}</xNome><enderEmit><fone>1133334444</fone></enderEmit></emit>'
+        f'{dets}</infNFe></NFe></nfeProc>'
+    ).encode('utf-8')
+
+
+def test_itens_lidos_com_dados_da_nota():
+    xml = nfe_xml(7, '12345678000190', 'Agro Ltda', [('Adubo NPK', 'SC', 2, 150.0), ('Luva', 'PAR', 10, 3.5)])
+    itens = list(itens_nfe(io.BytesIO(xml)))
+
+    assert [i['descricao'] for i in itens] == ['Adubo NPK', 'Luva']
+    assert itens[0]['numero_nf'] == '7'
+    assert itens[0]['data'] == '2024-08-05'
+    assert itens[0]['emitente_documento'] == '12345678000190'
+    assert itens[1]['valor'] == '35.00'
+    assert unidade_app('PAR') == 'UN'
+    assert unidade_app('kg') == 'KG'
+
+
+def test_zip_importa_itens_e_associa_fornecedor_pelo_cnpj():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    existente = repos.fornecedores.adicionar({'nome': 'Agropecuária São João', 'cnpj_cpf': '12.345.678/0001-90'})
+
+    pacote = io.BytesIO()
+    with zipfile.ZipFile(pacote, 'w') as zf:
+        zf.writestr('nf1.xml', nfe_xml(1, '12345678000190', 'AGROPECUARIA SAO JOAO LTDA',
+                                       [('Adubo NPK', 'SC', 2, 150.0), ('Semente', 'CX', 1, 45.9)]))
+        zf.writestr('nf2.xml', nfe_xml(2, '98765432000110', 'Casa do Adubo', [('Calcário', 'TON', 3, 200.0)]))
+        zf.writestr('leiame.txt', 'ignorado')
+
+    resultado = importar_nfe(repos, pacote, 'notas.zip', 'Custos Variáveis', 'fertilizantes')
+
+    assert resultado.concluida and not resultado.erros
+    assert resultado.gravadas == 3
+    custos = repos.custos.listar_periodo('2024-08')
+    assert {c['fornecedor_id'] for c in custos if c['numero_nf'] == '1'} == {existente}
+    calcario = [c for c in custos if c['descricao_item'] == 'Calcário'][0]
+    assert calcario['unidade_medida'] == 'T'
+    assert calcario['valor'] == 600.0
+    assert calcario['fornecedor'] == 'Casa do Adubo'
+    assert repos.fornecedores.obter_por_documento('98765432000110')['nome'] == 'Casa do Adubo'
+    assert repos.rollups.resumo_custos('2024-08')['custos_variaveis'] == 945.9
+
+
+def test_emitente_desconhecido_sem_cadastro_automatico_vira_erro():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    xml = io.BytesIO(nfe_xml(3, '98765432000110', 'Casa do Adubo', [('Calcário', 'T', 1, 200.0)]))
+
+    resultado = importar_nfe(repos, xml, 'nf3.xml', 'Custos Variáveis', 'fertilizantes',
+                             cadastrar_fornecedores=False)
+
+    assert resultado.gravadas == 0
+    assert 'não cadastrado' in resultado.erros[0]['erros'][0]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Testes do cache em disco dos meses fechados
+"""
+
+import sys
+import os
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.particoes import CacheParticoes, documentos_mes, documentos_periodo, meses_do_intervalo, mes_fechado
+from services.repository import SQLiteBackend, criar_repositorios
+
+
+def contar_listagens(backend):
+    """Troca backend.listar por uma versão que conta as chamadas"""
+    chamadas = []
+    listar = backend.listar
+    backend.listar = lambda colecao, **kwargs: chamadas.append(colecao) or listar(colecao, **kwargs)
+    return chamadas
+
+
+def test_mes_fechado_servido_do_disco_ate_mudar():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    # Partições de outra instância: as escritas daqui não as invalidam
+    cache = CacheParticoes(':memory:')
+    repos.custos.adicionar({'data': '2024-08-02', 'tipo_custo': 'Custos Fixos', 'valor': 10.0})
+    custo_id = repos.custos.adicionar({'data': '2024-08-05', 'tipo_custo': 'Custos Fixos', 'valor': 20.0})
+    listagens = contar_listagens(repos.backend)
+
+    assert mes_fechado('2024-08')
+    assert [c['valor'] for c in documentos_mes(repos, 'custos_contabeis', '2024-08', cache=cache)] == [20.0, 10.0]
+    assert [c['valor'] for c in documentos_mes(repos, 'custos_contabeis', '2024-08', cache=cache)] == [20.0, 10.0]
+    assert len(listagens) == 1
+
+    # Um update que não muda os totais ainda muda a versão do rollup
+    repos.custos.atualizar(custo_id, '2024-08-05', {'valor': 99.0})
+    assert [c['valor'] for c in documentos_mes(repos, 'custos_contabeis', '2024-08', cache=cache)] == [99.0, 10.0]
+
+    repos.custos.adicionar({'data': '2024-08-09', 'tipo_custo': 'Custos Fixos', 'valor': 5.0})
+    custos = documentos_mes(repos, 'custos_contabeis', '2024-08', cache=cache)
+    assert [c['valor'] for c in custos] == [5.0, 99.0, 10.0]
+    assert len(listagens) == 3
+
+    cache.invalidar('custos_contabeis', '2024-08')
+    assert cache.obter('custos_contabeis', '2024-08', 'tabela') is None
+
+
+def test_mes_sem_rollup_lido_uma_vez():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    cache = CacheParticoes(':memory:')
+    # Gravados antes dos rollups existirem
+    for dia, valor in [(3, 1.0), (12, 2.0)]:
+        repos.backend.adicionar('vendas', {'data_venda': f'2024-07-{dia:02d}', 'valor_total': valor,
+                                           'status_recebimento': 'Pago', 'observacoes': 'x'})
+    listagens = contar_listagens(repos.backend)
+
+    vendas = documentos_mes(repos, 'vendas', '2024-07', cache=cache)
+
+    # O recálculo do rollup e a partição usam a mesma leitura
+    assert listagens == ['vendas']
+    assert [v['valor_total'] for v in vendas] == [2.0, 1.0]
+    assert 'observacoes' not in vendas[0] and vendas[0]['id']
+    assert repos.rollups.resumo_vendas('2024-07')['total_recebido'] == 3.0
+    assert documentos_mes(repos, 'vendas', '2024-07', cache=cache) == vendas
+    assert listagens == ['vendas']
+
+
+def test_periodo_junta_meses_e_respeita_limites():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    cache = CacheParticoes(':memory:')
+    for data in ['2023-12-31', '2024-01-10', '2024-02-29', '2024-03-01', '2024-03-20']:
+        repos.custos.adicionar({'data': data, 'tipo_custo': 'Custos Fixos', 'valor': 1.0})
+
+    assert meses_do_intervalo('2023-12-15', '2024-02-01') == ['2023-12', '2024-01', '2024-02']
+
+    custos = documentos_periodo(repos, 'custos_contabeis', '2023-12-31', '2024-03-01', cache=cache)
+    assert [c['data'] for c in custos] == ['2024-03-01', '2024-02-29', '2024-01-10', '2023-12-31']
+    assert cache.obter('custos_contabeis', '2024-02', 'tabela') is not None
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Testes da camada de acesso a dados usando o backend SQLite em memória
+Não precisam de credenciais do Firebase
+"""
+
+import sys
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.repository import (
+    COLECAO_CHAVES_FORNECEDORES,
+    FornecedorDuplicado,
+    Sequencia,
+    SQLiteBackend,
+    agregar_documentos,
+    criar_repositorios,
+    paginar_documentos,
+)
+
+
+def novos_repositorios():
+    return criar_repositorios(SQLiteBackend(':memory:'))
+
+
+def test_custos_listar_mes():
+    """Só retorna custos do mês, mais recentes primeiro"""
+    repos = novos_repositorios()
+    repos.custos.adicionar({'data': '2024-07-30', 'valor': 10.0, 'fornecedor': 'A'})
+    repos.custos.adicionar({'data': '2024-08-02', 'valor': 20.0, 'fornecedor': 'A'})
+    repos.custos.adicionar({'data': '2024-08-15', 'valor': 30.0, 'fornecedor': 'B'})
+
+    custos = repos.custos.listar_mes('2024-08-01')
+
+    assert [c['data'] for c in custos] == ['2024-08-15', '2024-08-02']
+    assert all('id' in c for c in custos)
+
+
+def test_custos_por_fornecedor_com_limite():
+    repos = novos_repositorios()
+    for dia in range(1, 6):
+        repos.custos.adicionar({'data': f'2024-08-0{dia}', 'valor': 1.0, 'fornecedor': 'A'})
+    repos.custos.adicionar({'data': '2024-08-09', 'valor': 1.0, 'fornecedor': 'B'})
+
+    custos = repos.custos.listar_por_fornecedor('A', limite=3)
+
+    assert [c['data'] for c in custos] == ['2024-08-05', '2024-08-04', '2024-08-03']
+
+
+def test_vendas_atualizar():
+    repos = novos_repositorios()
+    repos.vendas.adicionar({'data_venda': '2024-08-10', 'status_recebimento': 'Pendente'})
+
+    venda = repos.vendas.listar_mes('2024-08-01')[0]
+    repos.vendas.atualizar(venda, {'status_recebimento': 'Pago'})
+
+    vendas = repos.vendas.listar_mes('2024-08-01')
+    assert vendas[0]['status_recebimento'] == 'Pago'
+    assert vendas[0]['data_venda'] == '2024-08-10'
+
+
+def test_fornecedores_ativos_e_nome():
+    """Fornecedor sem o campo 'ativo' conta como ativo"""
+    repos = novos_repositorios()
+    repos.fornecedores.adicionar({'nome': 'Casa do Adubo', 'ativo': True})
+    repos.fornecedores.adicionar({'nome': 'Agropecuária São João', 'ativo': False})
+    repos.fornecedores.adicionar({'nome': 'Bom Frete'})
+
+    ativos = {f['nome'] for f in repos.fornecedores.listar_ativos()}
+
+    assert ativos == {'Casa do Adubo', 'Bom Frete'}
+    assert [f['nome'] for f in repos.fornecedores.listar()] == ['Agropecuária São João', 'Bom Frete', 'Casa do Adubo']
+    assert repos.fornecedores.existe_nome('Casa do Adubo')
+    assert repos.fornecedores.existe_nome(' casa do ADUBO ')
+    assert not repos.fornecedores.existe_nome('Casa do Adubo Ltda')
+
+
+def test_rollups_acompanham_escritas():
+    """O rollup mantido nas escritas bate com o recálculo a partir dos documentos"""
+    repos = novos_repositorios()
+    repos.custos.adicionar({'data': '2024-08-02', 'tipo_custo': 'Custos Fixos', 'valor': 100.0})
+    repos.custos.adicionar({'data': '2024-08-03', 'tipo_custo': 'Investimentos', 'valor': 1200.0,
+                            'depreciacao_mensal': 100.0})
+    repos.vendas.adicionar({'data_venda': '2024-08-05', 'status_recebimento': 'Pendente', 'valor_total': 50.0})
+    repos.vendas.adicionar({'data_venda': '2024-08-06', 'status_recebimento': 'Pago', 'valor_total': 30.0})
+
+    # Primeira leitura recalcula e marca o rollup como completo
+    assert repos.rollups.resumo_custos('2024-08')['custos_fixos'] == 100.0
+
+    repos.custos.adicionar({'data': '2024-08-09', 'tipo_custo': 'Custos Fixos', 'valor': 20.0})
+    pendente = [v for v in repos.vendas.listar_mes('2024-08-01') if v['status_recebimento'] == 'Pendente'][0]
+    repos.vendas.atualizar(pendente, {'status_recebimento': 'Pago'})
+
+    custos = repos.rollups.resumo_custos('2024-08')
+    vendas = repos.rollups.resumo_vendas('2024-08')
+    assert custos['custos_fixos'] == 120.0
+    assert custos['investimentos'] == 1200.0
+    assert custos['depreciacao'] == 100.0
+    assert custos['registros'] == 3
+    assert vendas['total_vendas'] == 80.0
+    assert vendas['total_recebido'] == 80.0
+    assert vendas['total_pendente'] == 0.0
+    assert vendas['registros'] == 2
+
+
+def test_recalculo_de_rollup_nao_perde_escrita_concorrente():
+    """Um custo salvo entre a listagem e a gravação do recálculo entra no rollup"""
+    repos = novos_repositorios()
+    repos.custos.adicionar({'data': '2024-08-02', 'tipo_custo': 'Custos Fixos', 'valor': 100.0})
+
+    listar = repos.backend.listar
+    chamadas = []
+
+    def listar_com_escrita_no_meio(*args, **kwargs):
+        documentos = listar(*args, **kwargs)
+        if not chamadas:
+            repos.custos.adicionar({'data': '2024-08-03', 'tipo_custo': 'Custos Fixos', 'valor': 20.0})
+        chamadas.append(args)
+        return documentos
+
+    repos.backend.listar = listar_com_escrita_no_meio
+    repos.rollups.resumo_custos('2024-08')
+    repos.backend.listar = listar
+
+    assert len(chamadas) == 2
+    resumo = repos.rollups.resumo_custos('2024-08')
+    assert resumo['custos_fixos'] == 120.0
+    assert resumo['registros'] == 2
+
+
+def test_agregacoes_sqlite_iguais_ao_calculo_em_memoria():
+    repos = novos_repositorios()
+    for valor in [10.0, 20.0, 'inválido', 30.0]:
+        repos.backend.adicionar('vendas', {'data_venda': '2024-08-05', 'valor_total': valor})
+    repos.backend.adicionar('vendas', {'data_venda': '2024-07-30', 'valor_total': 99.0})
+
+    agregacoes = {'n': ('count', None), 'soma': ('sum', 'valor_total'), 'media': ('avg', 'valor_total')}
+    filtros = [('data_venda', '>=', '2024-08-01')]
+
+    no_banco = repos.backend.agregar('vendas', agregacoes, filtros=filtros)
+    em_memoria = agregar_documentos(repos.backend.listar('vendas', filtros=filtros), agregacoes)
+
+    assert no_banco == em_memoria == {'n': 4, 'soma': 60.0, 'media': 20.0}
+    assert repos.vendas.estatisticas_mes('2024-09-01') == {'total_vendas': 0, 'faturamento': 0, 'ticket_medio': 0.0}
+
+
+def test_projecao_de_campos():
+    """A visão traz só os campos pedidos, sempre com o id"""
+    repos = novos_repositorios()
+    repos.custos.adicionar({'data': '2024-08-02', 'tipo_custo': 'Custos Fixos', 'valor': 10.0,
+                            'fornecedor': 'A', 'observacoes': 'texto longo'})
+
+    historico = repos.custos.listar_por_fornecedor('A')[0]
+    completo = repos.custos.listar_mes('2024-08-01')[0]
+
+    assert set(historico) == {'id', 'data', 'valor'}
+    assert completo['observacoes'] == 'texto longo'
+    assert 'observacoes' not in repos.custos.listar_mes('2024-08-01', visao='resumo')[0]
+
+
+def test_vendas_paginacao_por_cursor():
+    """Páginas seguem data_venda desc com desempate por id, sem repetir vendas"""
+    repos = novos_repositorios()
+    for dia, status in [(3, 'Pago'), (5, 'Pendente'), (5, 'Pago'), (5, 'Pago'), (7, 'Pendente'), (9, 'Pago')]:
+        repos.backend.adicionar('vendas', {'data_venda': f'2024-08-0{dia}', 'status_recebimento': status,
+                                           'tipo_pagamento': 'PIX'})
+
+    vistos = []
+    cursor = None
+    while True:
+        pagina, cursor = repos.vendas.listar_pagina('2024-08-01', 2, apos=cursor)
+        vistos.extend(pagina)
+        if cursor is None:
+            break
+
+    todas = repos.vendas.listar_mes('2024-08-01')
+    assert len(vistos) == len({v['id'] for v in vistos}) == 6
+    assert [v['data_venda'] for v in vistos] == sorted((v['data_venda'] for v in todas), reverse=True)
+
+    pagas, proximo = repos.vendas.listar_pagina('2024-08-01', 10, status='Pago', tipos_pagamento=['PIX'])
+    assert len(pagas) == repos.vendas.contar('2024-08-01', status='Pago') == 4
+    assert proximo is None
+    assert repos.vendas.listar_pagina('2024-08-01', 10, tipos_pagamento=[]) == ([], None)
+
+    # A paginação em memória usa o mesmo cursor
+    em_memoria, cursor_memoria = paginar_documentos(todas, 'data_venda', 2)
+    servidor, cursor_servidor = repos.vendas.listar_pagina('2024-08-01', 2)
+    assert [v['id'] for v in em_memoria] == [v['id'] for v in servidor]
+    assert cursor_memoria == cursor_servidor
+
+
+def test_fornecedor_duplicado_por_nome_normalizado_ou_documento():
+    repos = novos_repositorios()
+    repos.fornecedores.adicionar({'nome': 'Casa do Adubo', 'cnpj_cpf': '12.345.678/0001-90'})
+
+    for duplicado in [{'nome': 'casa do  adubo '}, {'nome': 'Outro', 'cnpj_cpf': '12345678000190'}]:
+        try:
+            repos.fornecedores.adicionar(duplicado)
+            assert False, 'deveria recusar o duplicado'
+        except FornecedorDuplicado:
+            pass
+
+    # O lote recusado não grava nem o fornecedor nem as chaves
+    assert [f['nome'] for f in repos.fornecedores.listar()] == ['Casa do Adubo']
+    assert len(repos.backend.listar(COLECAO_CHAVES_FORNECEDORES)) == 2
+
+
+def test_renomear_fornecedor_troca_chave_e_migracao_de_antigos():
+    repos = novos_repositorios()
+    # Cadastrados antes do índice de chaves, direto no backend
+    repos.backend.adicionar('fornecedores', {'nome': 'Bom Frete', 'data_cadastro': '2024-01-01'})
+    repos.backend.adicionar('fornecedores', {'nome': 'bom frete', 'data_cadastro': '2024-02-01'})
+
+    repos.fornecedores.garantir_chaves()
+    assert repos.fornecedores.existe_nome('Bom Frete')
+
+    novo_id = repos.fornecedores.adicionar({'nome': 'Casa do Adubo'})
+    repos.fornecedores.atualizar(novo_id, {'nome': 'Casa do Adubo Ltda'})
+
+    assert not repos.fornecedores.existe_nome('Casa do Adubo')
+    assert repos.fornecedores.duplicado({'nome': 'casa do adubo ltda'}) == 'nome'
+    assert repos.fornecedores.duplicado({'nome': 'Casa do Adubo Ltda'}, ignorar_id=novo_id) is None
+
+
+def test_numero_venda_unico_e_continua_das_vendas_existentes():
+    repos = novos_repositorios()
+    for _ in range(3):
+        repos.backend.adicionar('vendas', {'data_venda': '2024-08-05'})
+
+    assert repos.vendas.proximo_numero(datetime(2024, 8, 6)) == 'V20240806-0004'
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        numeros = list(executor.map(lambda _: repos.vendas.proximo_numero(), range(40)))
+    assert len(set(numeros)) == 40
+
+
+def test_sequencia_fragmentada_sem_repeticao():
+    repos = novos_repositorios()
+    sequencia = Sequencia(repos.backend, 'teste', fragmentos=4, base=lambda: 100)
+
+    numeros = [sequencia.proximo() for _ in range(200)]
+
+    assert len(set(numeros)) == 200
+    assert min(numeros) > 100
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Testes da sincronização incremental (backend SQLite em memória)
+"""
+
+import sys
+import os
+from datetime import datetime, timedelta
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.repository import SQLiteBackend, criar_repositorios
+from services.sync import SincronizadorMes
+
+
+def test_segunda_leitura_busca_apenas_alterados():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    # Histórico gravado em dias anteriores
+    for dia in range(1, 21):
+        repos.backend.adicionar('vendas', {
+            'data_venda': f'2024-08-{dia:02d}',
+            'status_recebimento': 'Pendente',
+            'ultima_atualizacao': f'2024-08-{dia:02d}T10:00:00'
+        })
+
+    sinc = SincronizadorMes(repos.vendas, 'data_venda')
+    vendas = sinc.documentos('2024-08-01')
+    assert len(vendas) == 20
+    assert vendas[0]['data_venda'] == '2024-08-20'
+
+    # Nova venda e um update: a próxima leitura traz só os documentos recentes
+    sinc.leituras = 0
+    repos.vendas.adicionar({'data_venda': '2024-08-21', 'status_recebimento': 'Pago'})
+    repos.vendas.atualizar(vendas[-1], {'status_recebimento': 'Pago'})
+
+    vendas = sinc.documentos('2024-08-01')
+    assert len(vendas) == 21
+    assert vendas[0]['data_venda'] == '2024-08-21'
+    assert vendas[-1]['status_recebimento'] == 'Pago'
+    assert sinc.leituras == 2
+
+
+def test_troca_de_mes_refaz_carga():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    repos.custos.adicionar({'data': '2024-08-31', 'valor': 1.0})
+    repos.custos.adicionar({'data': '2024-09-01', 'valor': 2.0})
+
+    sinc = SincronizadorMes(repos.custos, 'data')
+    assert len(sinc.documentos('2024-08-01')) == 2
+    assert [c['valor'] for c in sinc.documentos('2024-09-01')] == [2.0]
+
+
+def test_carimbo_em_utc():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    venda_id = repos.vendas.adicionar({'data_venda': '2024-08-01'})
+    carimbo = repos.backend.obter('vendas', venda_id)['ultima_atualizacao']
+
+    assert datetime.fromisoformat(carimbo).utcoffset() == timedelta(0)
+
+
+def test_recarga_completa_periodica_ve_exclusoes():
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    venda_id = repos.vendas.adicionar({'data_venda': '2024-08-02'})
+    repos.vendas.adicionar({'data_venda': '2024-08-03'})
+
+    sinc = SincronizadorMes(repos.vendas, 'data_venda', recarga=timedelta(0))
+    assert len(sinc.documentos('2024-08-01')) == 2
+    # Exclusão feita por outra instância: a consulta incremental não a vê
+    repos.backend.executar_lote([('excluir', 'vendas', venda_id)])
+
+    assert [v['data_venda'] for v in sinc.documentos('2024-08-01')] == ['2024-08-03']
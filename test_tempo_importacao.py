@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Testes do relatório de tempo de importação
+"""
+
+import sys
+import os
+import glob
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.tempo_importacao import RAIZ, importacoes_do_script, medir
+
+# Módulos que não podem ser importados no topo dos scripts (partida a frio)
+PESADOS = {'pandas', 'plotly', 'firebase_admin', 'google.cloud.firestore', 'google.cloud.storage'}
+
+
+def test_scripts_nao_importam_modulos_pesados_no_topo():
+    scripts = [os.path.join(RAIZ, 'main.py')] + glob.glob(os.path.join(RAIZ, 'pages', '*.py'))
+    for script in scripts:
+        modulos = set(importacoes_do_script(script))
+        assert not {m.split('.')[0] for m in modulos} & {p.split('.')[0] for p in PESADOS}, script
+
+
+def test_config_firebase_nao_carrega_firebase_admin():
+    resultado = medir(['config.firebase_config', 'services.repository'])
+    assert 'config.firebase_config' in resultado['importados']
+    assert not any(nome.startswith(('firebase_admin', 'google.cloud')) for nome in resultado['importados'])
+    assert resultado['total_ms'] > 0
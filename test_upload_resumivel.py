@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Testes do upload resumível em partes
+"""
+
+import sys
+import os
+
+import pytest
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.upload_resumivel import PARTE_MINIMA, ErroUpload, enviar_em_partes
+
+
+class Resposta:
+    def __init__(self, status_code, headers=None, text=''):
+        self.status_code = status_code
+        self.headers = headers or {}
+        self.text = text
+
+
+class SessaoFalsa:
+    """Sessão de upload do Storage que perde conexões nas requisições escolhidas"""
+
+    def __init__(self, total, falhas=(), status=None):
+        self.total = total
+        self.recebido = bytearray()
+        self.falhas = set(falhas)  # números das requisições que caem
+        self.status = status
+        self.requisicoes = 0
+
+    def put(self, url, data, headers, timeout):
+        self.requisicoes += 1
+        if self.requisicoes in self.falhas:
+            # Metade da parte chega antes de a conexão cair
+            self._guardar(headers['Content-Range'], data[:len(data) // 2])
+            raise ConnectionError("conexão perdida")
+        if self.status:
+            return Resposta(self.status, text='sessão expirada')
+        self._guardar(headers['Content-Range'], data)
+        if len(self.recebido) == self.total:
+            return Resposta(200)
+        faixa = {'Range': f"bytes=0-{len(self.recebido) - 1}"} if self.recebido else {}
+        return Resposta(308, faixa)
+
+    def _guardar(self, intervalo, data):
+        if data:
+            inicio = int(intervalo.split()[1].split('-')[0])
+            # O servidor só aceita bytes contíguos ao que já guardou
+            assert inicio == len(self.recebido)
+            # e só confirma múltiplos de 256 KiB antes do fim
+            completo = inicio + len(data) == self.total
+            self.recebido += data if completo else data[:len(data) // PARTE_MINIMA * PARTE_MINIMA]
+
+
+def test_partes_perdidas_retomam_do_ultimo_byte_confirmado():
+    dados = os.urandom(5 * PARTE_MINIMA + 1000)
+    sessao = SessaoFalsa(len(dados), falhas={2, 5})
+    progresso = []
+
+    enviar_em_partes(sessao, 'https://sessao', dados, tamanho_parte=2 * PARTE_MINIMA,
+                     espera=0, progresso=lambda enviados, total: progresso.append(enviados))
+
+    assert bytes(sessao.recebido) == dados
+    assert progresso[-1] == len(dados)
+    assert progresso == sorted(progresso)
+    # A parte que caiu não é reenviada inteira: a primeira metade já estava lá
+    assert PARTE_MINIMA * 3 in progresso
+
+
+def test_tentativas_esgotadas_levantam_erro():
+    dados = os.urandom(3 * PARTE_MINIMA)
+    sessao = SessaoFalsa(len(dados), falhas=set(range(1, 100)))
+
+    with pytest.raises(ErroUpload):
+        enviar_em_partes(sessao, 'https://sessao', dados, tamanho_parte=PARTE_MINIMA, tentativas=3, espera=0)
+
+
+def test_sessao_expirada_desiste_sem_repetir():
+    sessao = SessaoFalsa(PARTE_MINIMA * 2, status=410)
+
+    with pytest.raises(ErroUpload, match='410'):
+        enviar_em_partes(sessao, 'https://sessao', os.urandom(PARTE_MINIMA * 2), tamanho_parte=PARTE_MINIMA, espera=0)
+    assert sessao.requisicoes == 1
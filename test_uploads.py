@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Testes da fila de upload das notas fiscais
+"""
+
+import sys
+import os
+
+# Adicionar path para services
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from services.repository import SQLiteBackend, criar_repositorios
+from services.uploads import FilaUploads, hash_conteudo
+
+CUSTO = {
+    'data': '2024-08-05', 'tipo_custo': 'Custos Fixos', 'categoria': 'internet',
+    'descricao_item': 'Internet', 'quantidade': 1.0, 'unidade_medida': 'UN',
+    'valor_unitario': 100.0, 'valor': 100.0, 'fornecedor': 'Provedor',
+    'imagem_nf_url': '', 'tem_nota_fiscal': True, 'imagem_nf_status': 'pending',
+}
+
+
+class EnvioInstavel:
+    """Falha nas primeiras chamadas e depois devolve uma URL"""
+
+    def __init__(self, falhas):
+        self.falhas = falhas
+        self.chamadas = 0
+
+    def __call__(self, dados, content_type, extensao, nome=None, progresso=None):
+        self.chamadas += 1
+        if self.chamadas <= self.falhas:
+            raise ConnectionError("timeout")
+        return {'url': f"https://storage/{nome}.{extensao}", 'miniatura_url': f"https://storage/{nome}_miniatura.jpg"}
+
+
+def custo_salvo(repos):
+    custo_id = repos.custos.adicionar(dict(CUSTO))
+    return custo_id, repos.custos.backend
+
+
+def test_upload_tenta_de_novo_e_completa_o_custo(tmp_path):
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    custo_id, backend = custo_salvo(repos)
+    envio = EnvioInstavel(falhas=2)
+    fila = FilaUploads(repos, envio, str(tmp_path), espera=0)
+
+    status = fila.enfileirar(custo_id, CUSTO['data'], b'foto', 'image/jpeg', 'jpg').result(timeout=10)
+
+    assert status == 'ok' and envio.chamadas == 3
+    custo = backend.obter('custos_contabeis', custo_id)
+    assert custo['imagem_nf_status'] == 'ok'
+    assert custo['imagem_nf_url'] == f"https://storage/{hash_conteudo(b'foto')}.jpg"
+    assert custo['imagem_nf_miniatura_url'] == f"https://storage/{hash_conteudo(b'foto')}_miniatura.jpg"
+    assert os.listdir(tmp_path) == []
+
+
+def test_tentativas_esgotadas_marcam_erro(tmp_path):
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    custo_id, backend = custo_salvo(repos)
+    fila = FilaUploads(repos, EnvioInstavel(falhas=10), str(tmp_path), tentativas=2, espera=0)
+
+    assert fila.enfileirar(custo_id, CUSTO['data'], b'foto', 'image/jpeg', 'jpg').result(timeout=10) == 'erro'
+
+    custo = backend.obter('custos_contabeis', custo_id)
+    assert custo['imagem_nf_status'] == 'erro'
+    assert custo['imagem_nf_erro'] == 'timeout'
+    assert custo['imagem_nf_url'] == ''
+
+
+def test_envios_pendentes_retomados_ao_reiniciar(tmp_path):
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    custo_id, backend = custo_salvo(repos)
+    # Primeira instância termina sem conseguir enviar: o arquivo fica na pasta
+    (tmp_path / f"{custo_id}.bin").write_bytes(b'foto')
+    (tmp_path / f"{custo_id}.json").write_text(
+        '{"custo_id": "%s", "data": "2024-08-05", "content_type": "application/pdf", "extensao": "pdf"}' % custo_id
+    )
+
+    fila = FilaUploads(repos, EnvioInstavel(falhas=0), str(tmp_path), espera=0)
+    fila.aguardar(timeout=10)
+
+    assert backend.obter('custos_contabeis', custo_id)['imagem_nf_url'] == f"https://storage/{hash_conteudo(b'foto')}.pdf"
+    assert fila.pendentes() == 0
+
+
+def test_mesmo_arquivo_enviado_uma_vez(tmp_path):
+    repos = criar_repositorios(SQLiteBackend(':memory:'))
+    envio = EnvioInstavel(falhas=0)
+    fila = FilaUploads(repos, envio, str(tmp_path), espera=0)
+    ids = [custo_salvo(repos)[0] for _ in range(3)]
+
+    for custo_id in ids:
+        fila.enfileirar(custo_id, CUSTO['data'], b'nota com 3 itens', 'application/pdf', 'pdf').result(timeout=10)
+
+    assert envio.chamadas == 1
+    urls = {repos.backend.obter('custos_contabeis', custo_id)['imagem_nf_url'] for custo_id in ids}
+    assert urls == {f"https://storage/{hash_conteudo(b'nota com 3 itens')}.pdf"}
+    assert repos.arquivos_nf.obter(hash_conteudo(b'nota com 3 itens'))['bytes_original'] == 16